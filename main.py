@@ -1,17 +1,147 @@
 import os
+import re
+import atexit
 import csv
+import json
+import time
+import functools
+import threading
 from datetime import datetime
+from typing import Iterator
 
-from flask import Flask, jsonify, request, make_response
+from flask import (
+    Blueprint,
+    Flask,
+    Response,
+    current_app,
+    jsonify,
+    request,
+    make_response,
+    stream_with_context
+)
 from io import StringIO
 from http import HTTPStatus
-from src import Elevator, DataGenerator, ElevatorDatabase, ElevatorColumns
-from tests import TEST_DATABASE_PATH
+from src import (
+    Elevator,
+    DataGenerator,
+    ElevatorDatabase,
+    ElevatorColumns,
+    MemoryElevatorDatabase
+)
+from src.admission import (
+    AdmissionController,
+    PRIORITY_BULK,
+    PRIORITY_CALL
+)
+from src.backends import create_database
+from src.call_broadcaster import CallBroadcaster
+from src.csv_export import (
+    COMPRESSED_FILES,
+    COMPRESSION_WBITS,
+    compress_chunks,
+    iter_csv
+)
+from src.csv_import import import_csv, open_text
+from src.demand_window import DemandWindow
+from src.db_inteface import DatabaseInterface
+from src.elevator import UP, DOWN, IDLE, FLOOR_TRAVEL_SECONDS
+from src.elevator_database import to_epoch
+from src.elevator_models import DATETIME_FORMAT
+from src.group_dispatcher import GroupDispatcher
+from src.maintenance import MaintenanceScheduler
+from src.markov_model import MarkovNextCallModel, TRANSITION_SOURCES
+from src.od_matrix import ODMatrix, HOURS_PER_DAY, DAYS_PER_WEEK
+from src.resting_schedule import RestingScheduler
+from src.sketches import CallSketches
+from src.training import ModelTrainer
 
-# Create a Flask application
-app = Flask(__name__)
-# Initialize the database
-db: ElevatorDatabase
+# Routes of the API, registered on the application by create_app
+api = Blueprint("api", __name__)
+# The database is initialized lazily, on first use (see get_db)
+db: DatabaseInterface | None = None
+_db_lock = threading.Lock()
+# Elevator dispatching the car, shared by all requests (see get_elevator)
+elevator: Elevator | None = None
+# Group controller of the bank of cars, shared by all requests (see
+# get_group)
+group: GroupDispatcher | None = None
+# Number of cars in the bank
+GROUP_CARS = int(os.environ.get("ELEVATOR_CARS", "4"))
+
+# Admission control of the write endpoints (see admit)
+admission_controller = AdmissionController(
+    max_in_flight=int(os.environ.get("ELEVATOR_MAX_IN_FLIGHT", "8")),
+    max_queue=int(os.environ.get("ELEVATOR_MAX_QUEUE", "64")),
+    queue_timeouts={
+        PRIORITY_CALL: float(
+            os.environ.get("ELEVATOR_CALL_QUEUE_TIMEOUT", "1.0")),
+        PRIORITY_BULK: float(
+            os.environ.get("ELEVATOR_BULK_QUEUE_TIMEOUT", "2.0"))
+    },
+    reserved_call_slots=int(
+        os.environ.get("ELEVATOR_RESERVED_CALL_SLOTS", "1"))
+)
+
+# Fan-out of the recorded calls to the /stream-calls subscribers
+broadcaster = CallBroadcaster()
+# Seconds between keep-alive comments on idle /stream-calls streams
+SSE_HEARTBEAT_SECONDS = 15.0
+
+# Next-call model kept up to date by every inserted call
+next_call_model = MarkovNextCallModel()
+# Calls per floor over the last minutes, kept up to date by every inserted
+# call
+demand_window = DemandWindow()
+# Minutes of the window of /demand/recent when not given
+DEFAULT_DEMAND_MINUTES = 15
+
+# Resting floor classifier, trained in the background
+trainer = ModelTrainer(os.environ.get("ELEVATOR_MODEL_DIR", "./models"))
+
+# Streaming sketches of the calls, kept up to date by every inserted call
+call_sketches = CallSketches()
+# File the sketches are saved to, None to always rebuild them
+SKETCH_PATH: str | None = os.environ.get(
+    "ELEVATOR_SKETCH_PATH",
+    os.path.join(os.environ.get("ELEVATOR_MODEL_DIR", "./models"),
+                 "sketches.json"))
+# Inter-arrival quantiles of /analytics/sketches when not given
+DEFAULT_SKETCH_QUANTILES = (0.5, 0.9, 0.99)
+
+# Weekly resting floor profiles, cached by data version
+resting_scheduler = RestingScheduler()
+# Maximum number of slots returned by /predict/resting-schedule
+MAX_SCHEDULE_SLOTS = 600_000
+
+# Origin-destination counts by hour of the week, cached by data version
+od_matrix = ODMatrix()
+
+# Names of the directions of travel in the API responses
+DIRECTION_NAMES = {UP: "up", DOWN: "down", IDLE: "idle"}
+
+# Seconds spent on each startup phase, reported by /startup-report
+STARTUP_TIMINGS: dict[str, float] = {}
+
+# Background maintenance of SQLite databases (see get_maintenance)
+maintenance: MaintenanceScheduler | None = None
+# Seconds between two maintenance checks, 0 to only run it on demand
+MAINTENANCE_INTERVAL = float(
+    os.environ.get("ELEVATOR_MAINTENANCE_INTERVAL", "30"))
+
+# Directory where the admin snapshots are stored
+SNAPSHOT_DIR = os.environ.get("ELEVATOR_SNAPSHOT_DIR", "./snapshots")
+SNAPSHOT_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Maximum number of changes returned by a single /changes request
+MAX_CHANGES_PAGE = 10000
+
+# Columns that can be changed through the update endpoints
+UPDATABLE_COLUMNS = (
+    f"{ElevatorColumns.CURRENT_FLOOR}",
+    f"{ElevatorColumns.DEMAND_FLOOR}",
+    f"{ElevatorColumns.DESTINATION_FLOOR}",
+    f"{ElevatorColumns.CALL_DATETIME}"
+)
 
 
 def setup() -> None:
@@ -24,25 +154,314 @@ def setup() -> None:
 
     :return: [None]
     """
-    global db
+    global db, maintenance
+    started = time.perf_counter()
     db_file_path = "./elevator.db"
+    database_exists = os.path.exists(db_file_path)
+    storage = os.environ.get("ELEVATOR_STORAGE", "sqlite")
+
+    if storage == "memory":
+        # RAM-backed database checkpointed to the database file
+        db = create_database(
+            storage,
+            checkpoint_path=db_file_path,
+            checkpoint_interval=float(
+                os.environ.get("ELEVATOR_CHECKPOINT_INTERVAL", "60"))
+        )
+    elif storage == "log":
+        # Append-only segment files, for write-heavy sites
+        log_directory = os.environ.get("ELEVATOR_LOG_DIR", "./elevator_log")
+        database_exists = os.path.isdir(log_directory)
+        db = create_database(storage, directory=log_directory)
+    elif storage != "sqlite":
+        # Backend registered by a deployment, created with its defaults
+        db = create_database(storage)
+    elif not database_exists:
+        # New databases use the compact schema (epoch integers, STRICT)
+        db = create_database(storage, compact=True)
+    else:
+        db = create_database(storage, database_path=db_file_path)
+        db.detect_schema()
+
+    # Creates whatever is missing, e.g. the change log on older databases
+    db.create_table()
 
-    if not os.path.exists(db_file_path):
-        db = ElevatorDatabase()
-        db.create_table()
+    if not database_exists:
         data_generator = DataGenerator()
         data_generated = data_generator.generate(db)
 
         if not data_generated:
             print("Error while generating data")
-    else:
-        db = ElevatorDatabase(db_file_path)
 
+    attach_models(db)
+    atexit.register(save_sketches)
+
+    # Called under _db_lock, so the scheduler is created here rather than
+    # by get_maintenance
+    if is_file_database(db) and MAINTENANCE_INTERVAL > 0:
+        maintenance = MaintenanceScheduler(db, interval=MAINTENANCE_INTERVAL)
+        maintenance.start()
+    STARTUP_TIMINGS["database_setup"] = time.perf_counter() - started
+
+
+def refresh_models(database: DatabaseInterface) -> None:
+    """
+    The refresh_models function rebuilds the in-memory models from the
+    database, after it was loaded or had rows removed.
+
+    :param database: [DatabaseInterface] The database used by the API
+
+    :return: [None]
+    """
+    next_call_model.rebuild(database)
+    demand_window.rebuild(database)
+    # Reads a snapshot, so the sketches are saved with the data version of
+    # the rows they were built from
+    call_sketches.refresh(database, SKETCH_PATH)
+
+
+def attach_models(database: DatabaseInterface) -> None:
+    """
+    The attach_models function rebuilds the in-memory models from the
+    database and registers them to be updated on every inserted call.
+
+    :param database: [DatabaseInterface] The database used by the API
+
+    :return: [None]
+    """
+    refresh_models(database)
+    database.add_insert_listener(next_call_model.observe)
+    database.add_insert_listener(demand_window.observe)
+    database.add_insert_listener(call_sketches.observe)
+
+
+def save_sketches() -> None:
+    """
+    The save_sketches function saves the call sketches with the data
+    version they match, so the next startup loads them instead of reading
+    the whole table. Sketches missing an update or a delete are not saved,
+    the next startup rebuilds them.
+
+    :return: [None]
+    """
+    if SKETCH_PATH and db is not None:
+        data_version = call_sketches.current_version(db)
+        if data_version is not None:
+            call_sketches.save(SKETCH_PATH, data_version)
+
+
+def get_db() -> DatabaseInterface:
+    """
+    The get_db function returns the database used by the API, running
+    setup on the first call.
+    Keeping the database out of the import path lets workers boot and tests
+    be collected without opening, checking or seeding the database.
+
+    :return: [DatabaseInterface] The database instance
+    """
+    if db is None:
+        with _db_lock:
+            if db is None:
+                setup()
+    return db
+
+
+def get_elevator() -> Elevator:
+    """
+    The get_elevator function returns the elevator shared by all requests,
+    so its dispatcher keeps the queued calls between requests.
+
+    :return: [Elevator] The elevator of the database in use
+    """
+    global elevator
+    database = get_db()
+    with _db_lock:
+        if elevator is None or elevator.db is not database:
+            elevator = Elevator(database, broadcaster=broadcaster)
+    return elevator
+
+
+def get_group() -> GroupDispatcher:
+    """
+    The get_group function returns the group controller shared by all
+    requests, so the cars keep their queued calls between requests.
+
+    :return: [GroupDispatcher] The group controller of the database in use
+    """
+    global group
+    database = get_db()
+    with _db_lock:
+        if group is None or group.db is not database:
+            group = GroupDispatcher(
+                database, cars=GROUP_CARS, broadcaster=broadcaster)
+    return group
+
+
+def is_file_database(database: DatabaseInterface) -> bool:
+    """
+    The is_file_database function tells whether the database is a SQLite
+    file, the only storage that needs maintenance: an in-memory database
+    has no file to analyze, checkpoint or vacuum.
+
+    :param database: [DatabaseInterface] The database
+
+    :return: [bool] True for a file-backed SQLite database
+    """
+    return (isinstance(database, ElevatorDatabase)
+            and not isinstance(database, MemoryElevatorDatabase))
+
+
+def get_maintenance(
+        database: DatabaseInterface | None = None
+) -> MaintenanceScheduler | None:
+    """
+    The get_maintenance function returns the maintenance scheduler of the
+    database in use.
+
+    :param database: [DatabaseInterface | None] The database (default:
+                                                get_db())
+
+    :return: [MaintenanceScheduler | None] The scheduler, None when the
+                                           storage backend is not a SQLite
+                                           file
+    """
+    global maintenance
+    database = database or get_db()
+    if not is_file_database(database):
+        return None
+    with _db_lock:
+        if maintenance is None or maintenance.db is not database:
+            if maintenance is not None:
+                maintenance.stop()
+            maintenance = MaintenanceScheduler(
+                database, interval=MAINTENANCE_INTERVAL or 30.0)
+    return maintenance
+
+
+def validate_call(data: dict) -> str | None:
+    """
+    The validate_call function checks the floors of an elevator call.
+
+    :param data: [dict] The request body
+
+    :return: [str | None] The error message, or None if the call is valid
+    """
+    # Validate presence of required parameters
+    if (
+            ElevatorColumns.DEMAND_FLOOR not in data
+            or ElevatorColumns.DESTINATION_FLOOR not in data):
+        return (
+            f"Both '{ElevatorColumns.DEMAND_FLOOR}' and "
+            f"'{ElevatorColumns.DESTINATION_FLOOR}' are required.")
+
+    # Validate types of parameters
+    if not isinstance(
+            data[ElevatorColumns.DEMAND_FLOOR], int) or not isinstance(
+            data[ElevatorColumns.DESTINATION_FLOOR], int):
+        return (
+            f"'{ElevatorColumns.DEMAND_FLOOR}' and "
+            f"'{ElevatorColumns.DESTINATION_FLOOR}' must be of type int.")
+
+    return None
+
+
+def create_app() -> Flask:
+    """
+    The create_app function is the application factory.
+    It creates the Flask application and registers the API routes, without
+    touching the database.
+
+    :return: [Flask] The Flask application
+    """
+    started = time.perf_counter()
+    flask_app = Flask(__name__)
+    flask_app.register_blueprint(api)
+    STARTUP_TIMINGS["create_app"] = time.perf_counter() - started
+    return flask_app
+
+
+def admit(priority: int):
+    """
+    The admit function decorates a write endpoint with admission control:
+    the request waits for a free slot by priority and is answered with 503
+    Service Unavailable and a Retry-After header when it is shed.
+
+    :param priority: [int] Priority of the endpoint's requests
+
+    :return: The decorator
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            controller = admission_controller
+            if controller.acquire(priority) is None:
+                response = jsonify({
+                    "error": "Server overloaded, retry later"})
+                response.headers["Retry-After"] = str(
+                    controller.retry_after(priority))
+                return response, HTTPStatus.SERVICE_UNAVAILABLE
+            try:
+                return view(*args, **kwargs)
+            finally:
+                controller.release(priority)
+        return wrapper
+    return decorator
+
+
+def sqlite_only(feature: str):
+    """
+    The sqlite_only function decorates an endpoint relying on tables only
+    the SQLite storage has (dispatch and assignment logs, change log,
+    snapshots): on other backends it is answered with 400 Bad Request
+    before anything is written.
+
+    :param feature: [str] Name of the feature, for the error message
+
+    :return: The decorator
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                database = get_db()
+            except Exception as e:
+                return jsonify(
+                    {"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+            if not isinstance(database, ElevatorDatabase):
+                return jsonify({
+                    "error": f"{feature} is only available on SQLite storage"
+                }), HTTPStatus.BAD_REQUEST
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def validate_update_values(update_dict: dict) -> str | None:
+    """
+    The validate_update_values function checks the types of the values
+    sent to the update endpoints.
+
+    :param update_dict: [dict] The new values keyed by column name
 
-setup()
+    :return: [str | None] An error message, or None if every value is valid
+    """
+    for column_name, column_value in update_dict.items():
+        if column_name == ElevatorColumns.CALL_DATETIME:
+            # Ensure the datetime format is correct
+            try:
+                datetime.strptime(column_value, DATETIME_FORMAT)
+            except (TypeError, ValueError):
+                return f"Invalid '{ElevatorColumns.CALL_DATETIME}' format."
+        elif not isinstance(column_value, int):
+            return (
+                f"'{column_name}' must be of type int or "
+                f"'{ElevatorColumns.CALL_DATETIME}' must be "
+                f"in the format 'YYYY-MM-DD HH:MM:SS'."
+            )
+    return None
 
 
-@app.route("/health", methods=["GET"])
+@api.route("/health", methods=["GET"])
 def health():
     """
     The health function is used to check the health of the API.
@@ -56,7 +475,8 @@ def health():
         return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
 
 
-@app.route("/generate-data", methods=["GET"])
+@api.route("/generate-data", methods=["GET"])
+@admit(PRIORITY_BULK)
 def generate_data():
     """
     The generate_data function is used to generate data for the database.
@@ -67,10 +487,10 @@ def generate_data():
              Error INTERNAL_SERVER_ERROR otherwise
     """
     try:
-        with app.app_context():
+        with current_app.app_context():
             # generate data using DataGenerator
             _data_generator = DataGenerator()
-            _data_generated = _data_generator.generate(db)
+            _data_generated = _data_generator.generate(get_db())
 
             if _data_generated:
                 return jsonify({
@@ -84,7 +504,8 @@ def generate_data():
         return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
 
 
-@app.route("/call-elevator", methods=["POST"])
+@api.route("/call-elevator", methods=["POST"])
+@admit(PRIORITY_CALL)
 def call_elevator():
     """
     The call_elevator function is used to call an elevator from a given floor.
@@ -100,31 +521,16 @@ def call_elevator():
     try:
         data = request.get_json()
 
-        # Validate presence of required parameters
-        if (
-                ElevatorColumns.DEMAND_FLOOR not in data
-                or ElevatorColumns.DESTINATION_FLOOR not in data):
-            return jsonify({
-                "error": f"Both '{ElevatorColumns.DEMAND_FLOOR}' and "
-                         f"'{ElevatorColumns.DESTINATION_FLOOR}' are required."
-            }), HTTPStatus.BAD_REQUEST
+        error = validate_call(data)
+        if error:
+            return jsonify({"error": error}), HTTPStatus.BAD_REQUEST
 
-        # Validate types of parameters
         demand_floor = data[ElevatorColumns.DEMAND_FLOOR]
         destination_floor = data[ElevatorColumns.DESTINATION_FLOOR]
 
-        if not isinstance(demand_floor, int) or not isinstance(
-                destination_floor, int):
-            return jsonify({
-                "error": f"'{ElevatorColumns.DEMAND_FLOOR}' and "
-                         f"'{ElevatorColumns.DESTINATION_FLOOR}' must be of "
-                         f"type int."
-            }), HTTPStatus.BAD_REQUEST
-
-        with app.app_context():
-            # Create an Elevator instance and call the elevator
-            elevator = Elevator(db)
-            elevator.call_elevator(demand_floor, destination_floor)
+        with current_app.app_context():
+            # Call the elevator, queueing the call on its dispatcher
+            get_elevator().call_elevator(demand_floor, destination_floor)
 
         return jsonify({
             "message": "Elevator called successfully"}), HTTPStatus.OK
@@ -132,7 +538,205 @@ def call_elevator():
         return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
 
 
-@app.route("/get-all-rows", methods=["GET"])
+@api.route("/dispatch/next-stop", methods=["POST"])
+@sqlite_only("Dispatch")
+def dispatch_next_stop():
+    """
+    The dispatch_next_stop function moves the car to the next stop chosen
+    by the LOOK dispatcher and records the decision.
+
+    :return: The stop with OK code if it's everything working.
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        car = get_elevator()
+        floor = car.next_stop()
+
+        return jsonify({
+            "floor": floor,
+            "direction": DIRECTION_NAMES[car.direction],
+            "pending_stops": car.pending_stops
+        }), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/dispatch/status", methods=["GET"])
+@sqlite_only("Dispatch")
+def dispatch_status():
+    """
+    The dispatch_status function reports the position and direction of the
+    car, the number of queued stops and the latest recorded stops.
+
+    :return: The dispatcher status with OK code if it's everything working.
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        car = get_elevator()
+        stops = get_db().get_dispatch_log(car.car_id, limit=10)
+
+        return jsonify({
+            "position": car.position,
+            "direction": DIRECTION_NAMES[car.direction],
+            "pending_stops": car.pending_stops,
+            "last_stops": [
+                {
+                    "floor": stop[2],
+                    "direction": DIRECTION_NAMES[stop[3]],
+                    "pending_stops": stop[4],
+                    "decided_at": stop[5]
+                }
+                for stop in stops
+            ]
+        }), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/group/call", methods=["POST"])
+@sqlite_only("Group dispatch")
+@admit(PRIORITY_CALL)
+def group_call():
+    """
+    The group_call function assigns a hall call to the car of the bank with
+    the lowest estimated time of arrival. The call and the assignment are
+    recorded.
+    It takes the same parameters as /call-elevator.
+
+    :return: The assigned car with OK code if it's everything working.
+             An Error BAD_REQUEST if there's some problem with the request
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        data = request.get_json()
+
+        error = validate_call(data)
+        if error:
+            return jsonify({"error": error}), HTTPStatus.BAD_REQUEST
+
+        car, eta_seconds = get_group().assign(
+            data[ElevatorColumns.DEMAND_FLOOR],
+            data[ElevatorColumns.DESTINATION_FLOOR]
+        )
+
+        return jsonify({
+            "car_id": car.car_id,
+            "eta_seconds": eta_seconds
+        }), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/group/step", methods=["POST"])
+@sqlite_only("Group dispatch")
+def group_step():
+    """
+    The group_step function moves every car of the bank to its next stop.
+
+    :return: The stop of each car with OK code if it's everything working.
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        stops = get_group().step()
+
+        return jsonify({
+            "stops": {str(car_id): floor for car_id, floor in stops.items()}
+        }), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/group/status", methods=["GET"])
+@sqlite_only("Group dispatch")
+def group_status():
+    """
+    The group_status function reports the position, direction and queued
+    stops of every car of the bank, and the latest assignments.
+
+    :return: The group status with OK code if it's everything working.
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        cars = get_group().cars
+        assignments = get_db().get_assignments(limit=10)
+
+        return jsonify({
+            "cars": [
+                {
+                    "car_id": car.car_id,
+                    "position": car.position,
+                    "direction": DIRECTION_NAMES[car.direction],
+                    "pending_stops": car.pending_stops
+                }
+                for car in cars
+            ],
+            "last_assignments": [
+                {
+                    "call_id": assignment[1],
+                    "car_id": assignment[2],
+                    ElevatorColumns.DEMAND_FLOOR: assignment[3],
+                    ElevatorColumns.DESTINATION_FLOOR: assignment[4],
+                    "eta_seconds": assignment[5],
+                    "assigned_at": assignment[6]
+                }
+                for assignment in assignments
+            ]
+        }), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/stream-calls", methods=["GET"])
+def stream_calls():
+    """
+    The stream_calls function pushes every new elevator call to the client
+    as Server-Sent Events, instead of having dashboards poll /get-all-rows.
+    Each call is sent as a 'call' event with the row id as event id. A
+    client too slow to keep up with its buffer receives a 'dropped' event
+    and the stream ends; it can reconnect and catch up through /changes.
+
+    :return: An event stream with OK code if it's everything working.
+             Error SERVICE_UNAVAILABLE if there are too many subscribers
+    """
+    subscription = broadcaster.subscribe()
+    if subscription is None:
+        return jsonify({
+            "error": "Too many subscribers, try again later"
+        }), HTTPStatus.SERVICE_UNAVAILABLE
+
+    def events():
+        try:
+            yield ": connected\n\n"
+            while True:
+                if subscription.dropped and subscription.events.empty():
+                    yield "event: dropped\ndata: {}\n\n"
+                    return
+
+                event = subscription.get(SSE_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": heartbeat\n\n"
+                    continue
+
+                yield (
+                    f"id: {event[ElevatorColumns.ID]}\n"
+                    f"event: call\n"
+                    f"data: {json.dumps(event)}\n\n"
+                )
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    response = Response(
+        events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    # The generator never runs if the client leaves before the first event,
+    # so its finally block can't be the only place unsubscribing
+    response.call_on_close(lambda: broadcaster.unsubscribe(subscription))
+    return response
+
+
+@api.route("/get-all-rows", methods=["GET"])
 def get_all_rows():
     """
     The get_all_rows function retrieves all rows from the database and
@@ -143,9 +747,10 @@ def get_all_rows():
              Error INTERNAL_SERVER_ERROR otherwise
     """
     try:
-        with app.app_context():
+        with current_app.app_context():
             # Retrieve all rows from the database and format the result
-            rows = db.get_all_rows()
+            with get_db().read_snapshot() as snapshot:
+                rows = snapshot.get_all_rows()
             result = [
                 {
                     f"{ElevatorColumns.ID}": row[0],
@@ -162,7 +767,8 @@ def get_all_rows():
         return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
 
 
-@app.route("/update-row", methods=["PUT"])
+@api.route("/update-row", methods=["PUT"])
+@admit(PRIORITY_BULK)
 def update_row():
     """
     The update_row function is used to update the values of a row
@@ -198,53 +804,26 @@ def update_row():
             )
 
         # Check if the row with the provided 'id' exists
-        if not db.row_exists(row_id):
+        if not get_db().row_exists(row_id):
             return (
                 jsonify({
                     "error": f"Invalid '{ElevatorColumns.ID}': {row_id}"}),
                 HTTPStatus.BAD_REQUEST
             )
 
-        # Set the allowed columns
-        allowed_columns = {
-            f"{ElevatorColumns.CURRENT_FLOOR}",
-            f"{ElevatorColumns.DEMAND_FLOOR}",
-            f"{ElevatorColumns.DESTINATION_FLOOR}",
-            f"{ElevatorColumns.CALL_DATETIME}"
-        }
-
         # Filters the columns caught on the request
         update_dict = {
-            col: data[col] for col in allowed_columns if col in data}
+            col: data[col] for col in UPDATABLE_COLUMNS if col in data}
 
         # Validate the columns types
-        for column_name, column_value in update_dict.items():
-            if column_name == ElevatorColumns.CALL_DATETIME:
-                # Ensure the datetime format is correct
-                try:
-                    datetime.strptime(column_value, "%Y-%m-%d %H:%M:%S")
-                except ValueError:
-                    return (
-                        jsonify({
-                            "error": f"Invalid "
-                                     f"'{ElevatorColumns.CALL_DATETIME}' "
-                                     f"format."
-                        }),
-                        HTTPStatus.BAD_REQUEST
-                    )
-            elif not isinstance(column_value, int):
-                return (
-                    jsonify({
-                        "error": f"'{column_name}' must be of type int or "
-                                 f"'{ElevatorColumns.CALL_DATETIME}' must be "
-                                 f"in the format 'YYYY-MM-DD HH:MM:SS'."}),
-                    HTTPStatus.BAD_REQUEST
-                )
+        error = validate_update_values(update_dict)
+        if error:
+            return jsonify({"error": error}), HTTPStatus.BAD_REQUEST
 
-        # Update the columns on db
+        # Update the columns on db, in a single transaction
         if update_dict:
-            for column_name, column_value in update_dict.items():
-                db.update_column(row_id, column_name, column_value)
+            get_db().update_rows(
+                [{f"{ElevatorColumns.ID}": row_id, **update_dict}])
 
             return (
                 jsonify({
@@ -259,7 +838,89 @@ def update_row():
         return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
 
 
-@app.route("/delete-all-rows", methods=["DELETE"])
+@api.route("/update-rows", methods=["PUT"])
+@admit(PRIORITY_BULK)
+def update_rows():
+    """
+    The update_rows function is used to update many rows at once.
+    It takes a JSON list of objects, each with an 'id' field and one or more
+    fields from:
+        - current_floor:     [int]
+        - demand_floor:      [int]
+        - destination_floor: [int]
+        - call_datetime:     [str] (in the format YYYY-MM-DD HH:MM:SS)
+
+    All the updates are applied in a single transaction, and the ids that
+    do not match any row are reported back.
+
+    :return: A success message with OK code if it's everything working.
+             An Error BAD_REQUEST if there's some problem with the request
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        data = request.get_json()
+
+        if not isinstance(data, list) or not data:
+            return (
+                jsonify({"error": "Expected a non-empty list of rows"}),
+                HTTPStatus.BAD_REQUEST
+            )
+
+        updates = []
+        for index, row in enumerate(data):
+            if not isinstance(row, dict) or ElevatorColumns.ID not in row:
+                return (
+                    jsonify({
+                        "error": f"Missing parameter '{ElevatorColumns.ID}' "
+                                 f"at position {index}"}),
+                    HTTPStatus.BAD_REQUEST
+                )
+
+            row_id = row[ElevatorColumns.ID]
+            if not isinstance(row_id, int):
+                return (
+                    jsonify({
+                        "error": f"'{ElevatorColumns.ID}' must be of type "
+                                 f"int at position {index}"}),
+                    HTTPStatus.BAD_REQUEST
+                )
+
+            update_dict = {
+                col: row[col] for col in UPDATABLE_COLUMNS if col in row}
+            if not update_dict:
+                return (
+                    jsonify({
+                        "error": f"No valid column provided at position "
+                                 f"{index}"}),
+                    HTTPStatus.BAD_REQUEST
+                )
+
+            error = validate_update_values(update_dict)
+            if error:
+                return (
+                    jsonify({"error": f"{error} (position {index})"}),
+                    HTTPStatus.BAD_REQUEST
+                )
+
+            update_dict[ElevatorColumns.ID] = row_id
+            updates.append(update_dict)
+
+        missing_ids = get_db().update_rows(updates)
+
+        return (
+            jsonify({
+                "message": f"{len(updates) - len(missing_ids)} rows "
+                           f"updated successfully",
+                "missing_ids": missing_ids
+            }),
+            HTTPStatus.OK
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/delete-all-rows", methods=["DELETE"])
+@admit(PRIORITY_BULK)
 def delete_all_rows():
     """
     The delete_all_rows function deletes all rows from the database.
@@ -269,16 +930,17 @@ def delete_all_rows():
              Error INTERNAL_SERVER_ERROR otherwise
     """
     try:
-        with app.app_context():
+        with current_app.app_context():
             # Delete all rows from the database
-            db.delete_all_rows()
+            get_db().delete_all_rows()
+            refresh_models(get_db())
         return jsonify(
             {"message": "All rows deleted successfully"}), HTTPStatus.OK
     except Exception as e:
         return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
 
 
-@app.route("/export-csv", methods=["GET"])
+@api.route("/export-csv", methods=["GET"])
 def export_csv():
     """
     The export_csv function is used to export the data from the database
@@ -290,12 +952,39 @@ def export_csv():
     each row of data to it. The header row is written first,
     followed by all other rows of elevator information.
 
+    The CSV can be compressed with gzip or deflate, negotiated through the
+    Accept-Encoding header or requested with the 'compression' query
+    parameter ('gzip', 'deflate' or 'identity'), with an optional 'level'
+    from 1 (fastest) to 9 (smallest). Compressed exports are streamed: rows
+    are read in batches and compressed chunk by chunk.
+
     :return: A CSV file with the data from the database
+             An Error BAD_REQUEST if the compression options are invalid
     """
     try:
-        with app.app_context():
+        compression = request.args.get("compression")
+        if compression not in (None, "identity", *COMPRESSION_WBITS):
+            return jsonify({
+                "error": f"'compression' must be one of: identity, "
+                         f"{', '.join(COMPRESSION_WBITS)}"
+            }), HTTPStatus.BAD_REQUEST
+
+        level = request.args.get("level", 6, type=int)
+        if not 1 <= level <= 9:
+            return jsonify({
+                "error": "'level' must be an int between 1 and 9"
+            }), HTTPStatus.BAD_REQUEST
+
+        encoding = compression or request.accept_encodings.best_match(
+            list(COMPRESSION_WBITS))
+        if encoding in COMPRESSION_WBITS:
+            return _compressed_csv_response(
+                encoding, level, as_file=compression is not None)
+
+        with current_app.app_context():
             # Retrieve all rows and create a CSV file
-            rows = db.get_all_rows()
+            with get_db().read_snapshot() as snapshot:
+                rows = snapshot.get_all_rows()
             csv_data = StringIO()
             csv_writer = csv.writer(csv_data)
 
@@ -325,19 +1014,927 @@ def export_csv():
         return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
 
 
-def configure_test() -> None:
+@api.route("/import-csv", methods=["POST"])
+@admit(PRIORITY_BULK)
+def import_csv_rows():
     """
-    The configure_test function is used to configure the database for testing
-    purposes.
-    It sets up a new database with the name elevator_test.db in the tests
-    directory, and then sets that as our global db variable so that we can
-    use it throughout our test suite.
+    The import_csv_rows function loads a CSV file sent as the request body,
+    in the format of /export-csv, appending its rows with new ids.
+    The body is read and inserted incrementally, one transaction per chunk
+    of rows, so memory stays constant. It can be gzip or deflate compressed,
+    as told by the Content-Encoding header.
+    If a row is invalid, the rows before its chunk stay imported and the
+    error tells how many.
 
-    :return: [None]
+    :return: The number of imported rows with OK code if it's everything
+             working.
+             An Error BAD_REQUEST if the file is invalid
+             Error INTERNAL_SERVER_ERROR otherwise
     """
-    global db
-    db = ElevatorDatabase(TEST_DATABASE_PATH)
+    try:
+        encoding = request.headers.get("Content-Encoding")
+        try:
+            lines = open_text(request.stream, encoding)
+            imported = import_csv(get_db(), lines)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), HTTPStatus.BAD_REQUEST
+
+        return jsonify({
+            "message": "CSV imported successfully",
+            "rows": imported
+        }), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/changes", methods=["GET"])
+@sqlite_only("The change log")
+def get_changes():
+    """
+    The get_changes function returns the changes made to the elevator table
+    after a given sequence number, so consumers can sync only the deltas.
+    Query parameters:
+        - since: [int] Last sequence number already seen (default 0)
+        - limit: [int] Maximum number of changes, up to MAX_CHANGES_PAGE
+                       (default 1000)
+
+    Operations are 'insert', 'update', 'delete' and 'truncate'; a
+    'truncate' means the whole table was reset. Use 'next_since' as the
+    'since' of the next request while 'has_more' is true. Old changes are
+    pruned by the maintenance; a 'since' before them cannot be caught up.
+
+    :return: A page of changes with OK code if it's everything working.
+             An Error BAD_REQUEST if there's some problem with the request
+             An Error GONE if changes after 'since' were pruned
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        since = request.args.get("since", 0, type=int)
+        limit = request.args.get("limit", 1000, type=int)
+
+        if since < 0 or not 1 <= limit <= MAX_CHANGES_PAGE:
+            return jsonify({
+                "error": f"'since' must be a non-negative int and 'limit' "
+                         f"an int between 1 and {MAX_CHANGES_PAGE}"
+            }), HTTPStatus.BAD_REQUEST
+
+        database = get_db()
+        pruned_version = database.get_pruned_version()
+        if since < pruned_version:
+            return jsonify({
+                "error": f"Changes up to {pruned_version} were pruned; "
+                         f"resync from /get-all-rows",
+                "pruned_version": pruned_version
+            }), HTTPStatus.GONE
+
+        # Fetch one extra change to know if there are more pages
+        changes = database.get_changes(since, limit + 1)
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        result = [
+            {
+                "seq": change[0],
+                "operation": change[1],
+                f"{ElevatorColumns.ID}": change[2],
+                f"{ElevatorColumns.CURRENT_FLOOR}": change[3],
+                f"{ElevatorColumns.DEMAND_FLOOR}": change[4],
+                f"{ElevatorColumns.DESTINATION_FLOOR}": change[5],
+                f"{ElevatorColumns.CALL_DATETIME}": change[6]
+            }
+            for change in changes
+        ]
+
+        return jsonify({
+            "changes": result,
+            "next_since": changes[-1][0] if changes else since,
+            "has_more": has_more
+        }), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/demand/recent", methods=["GET"])
+def demand_recent():
+    """
+    The demand_recent function returns the calls of each demand floor in
+    the last minutes, read from the in-memory sliding-window counters (no
+    database query).
+    Query parameters:
+        - minutes: [float] Length of the window (default: 15, at most 60)
+
+    :return: The calls by floor with OK code if it's everything working.
+             An Error BAD_REQUEST if there's some problem with the request
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        get_db()
+
+        minutes = request.args.get(
+            "minutes", DEFAULT_DEMAND_MINUTES, type=float)
+        if not 0 < minutes <= demand_window.max_minutes:
+            return jsonify({
+                "error": f"'minutes' must be a number greater than 0 and at "
+                         f"most {demand_window.max_minutes:g}"
+            }), HTTPStatus.BAD_REQUEST
+
+        counts = demand_window.counts(minutes)
+
+        return jsonify({
+            "minutes": minutes,
+            "total": sum(counts.values()),
+            "busiest_floor": max(counts, key=counts.get, default=None),
+            "floors": {str(floor): count for floor, count in counts.items()}
+        }), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/analytics/sketches", methods=["GET"])
+def analytics_sketches():
+    """
+    The analytics_sketches function returns approximate analytics of all
+    the calls from the in-memory streaming sketches (no database query),
+    with the error bound of each figure.
+    Query parameters:
+        - top:               [int] Number of busiest (demand, destination)
+                                   pairs (default: 10, at most 64)
+        - quantiles:         [str] Comma separated fractions of the
+                                   inter-arrival times (default:
+                                   0.5,0.9,0.99)
+        - demand_floor:      [int] With destination_floor, estimate the
+                                   calls of that pair
+        - destination_floor: [int] See demand_floor
+
+    :return: The analytics with OK code if it's everything working.
+             An Error BAD_REQUEST if there's some problem with the request
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        get_db()
+
+        top = request.args.get("top", 10, type=int)
+        if not 1 <= top <= call_sketches.busiest_pairs.capacity:
+            return jsonify({
+                "error": f"'top' must be an int between 1 and "
+                         f"{call_sketches.busiest_pairs.capacity}"
+            }), HTTPStatus.BAD_REQUEST
+
+        try:
+            quantiles = [
+                float(fraction) for fraction in request.args.get(
+                    "quantiles", "").split(",") if fraction
+            ] or list(DEFAULT_SKETCH_QUANTILES)
+        except ValueError:
+            quantiles = [-1.0]
+        if not all(0 <= fraction <= 1 for fraction in quantiles):
+            return jsonify({
+                "error": "'quantiles' must be comma separated numbers "
+                         "between 0 and 1"
+            }), HTTPStatus.BAD_REQUEST
+
+        demand_floor = request.args.get(
+            f"{ElevatorColumns.DEMAND_FLOOR}", type=int)
+        destination_floor = request.args.get(
+            f"{ElevatorColumns.DESTINATION_FLOOR}", type=int)
+        if (demand_floor is None) != (destination_floor is None):
+            return jsonify({
+                "error": f"'{ElevatorColumns.DEMAND_FLOOR}' and "
+                         f"'{ElevatorColumns.DESTINATION_FLOOR}' must be "
+                         f"given together"
+            }), HTTPStatus.BAD_REQUEST
+
+        summary = call_sketches.summary(top, quantiles)
+        if demand_floor is not None:
+            summary["pair_count"] = call_sketches.pair_count(
+                demand_floor, destination_floor)
+
+        return jsonify(summary), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/predict/next-floor", methods=["GET"])
+def predict_next_floor():
+    """
+    The predict_next_floor function returns the probability of each floor
+    being the next one the elevator is called from, using the in-memory
+    next-call model (no database query).
+    Query parameters:
+        - floor:  [int] Floor of the last call (default: destination floor
+                        of the last recorded call)
+        - hour:   [int] Hour of the day, 0 to 23 (default: current hour)
+        - source: [str] 'destination' (default) or 'demand', which floor of
+                        the last call 'floor' is
+
+    :return: The probabilities with OK code if it's everything working.
+             An Error BAD_REQUEST if there's some problem with the request
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        get_db()
+
+        floor = request.args.get(
+            "floor", next_call_model.last_destination_floor, type=int)
+        hour = request.args.get("hour", datetime.now().hour, type=int)
+        source = request.args.get("source", "destination")
+
+        if floor is None:
+            return jsonify({
+                "error": "Missing parameter 'floor', no call recorded yet"
+            }), HTTPStatus.BAD_REQUEST
+        if not 0 <= hour <= 23:
+            return jsonify({
+                "error": "'hour' must be an int between 0 and 23"
+            }), HTTPStatus.BAD_REQUEST
+        if source not in TRANSITION_SOURCES:
+            return jsonify({
+                "error": f"'source' must be one of: "
+                         f"{', '.join(TRANSITION_SOURCES)}"
+            }), HTTPStatus.BAD_REQUEST
+
+        probabilities, observations = next_call_model.probabilities(
+            hour, floor, source)
+
+        return jsonify({
+            "floor": floor,
+            "hour": hour,
+            "source": source,
+            "observations": observations,
+            "most_likely_floor": max(
+                probabilities, key=probabilities.get, default=None),
+            "probabilities": {
+                str(next_floor): probability
+                for next_floor, probability in probabilities.items()
+            }
+        }), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/train", methods=["POST"])
+def train():
+    """
+    The train function starts the training of the resting floor classifier
+    in the background and returns immediately.
+    When a model was already trained on the current data, it is served
+    without training again.
+
+    :return: The training status with ACCEPTED code if a training is
+             running, OK code if the current data was already trained on.
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        status = trainer.train_async(get_db())
+        status_code = (
+            HTTPStatus.OK if status == "cached" else HTTPStatus.ACCEPTED)
+        return jsonify({"status": status}), status_code
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/train/status", methods=["GET"])
+def train_status():
+    """
+    The train_status function reports whether a training is running, the
+    error of the last training, if any, and the served model.
+
+    :return: The training status with OK code if it's everything working.
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        artifact = trainer.current()
+        model = None
+        if artifact:
+            model = {
+                key: value for key, value in artifact.items()
+                if key != "model"
+            }
+
+        return jsonify({
+            "training": trainer.is_training,
+            "last_error": trainer.last_error,
+            "model": model
+        }), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/predict/resting-floor", methods=["GET"])
+def predict_resting_floor():
+    """
+    The predict_resting_floor function returns the floor the elevator
+    should rest on, according to the trained classifier.
+    Query parameters:
+        - call_datetime: [str] Moment of the prediction, in the format
+                               YYYY-MM-DD HH:MM:SS (default: now)
+        - floor:         [int] Floor the elevator is on (default:
+                               destination floor of the last call)
+
+    :return: The recommended floor with OK code if it's everything working.
+             An Error BAD_REQUEST if there's some problem with the request
+             Error SERVICE_UNAVAILABLE if no model was trained yet
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        get_db()
+
+        call_datetime = request.args.get(
+            ElevatorColumns.CALL_DATETIME,
+            datetime.now().strftime(DATETIME_FORMAT)
+        )
+        floor = request.args.get(
+            "floor", next_call_model.last_destination_floor, type=int)
+
+        try:
+            datetime.strptime(call_datetime, DATETIME_FORMAT)
+        except ValueError:
+            return jsonify({
+                "error": f"Invalid '{ElevatorColumns.CALL_DATETIME}' format."
+            }), HTTPStatus.BAD_REQUEST
+        if floor is None:
+            return jsonify({
+                "error": "Missing parameter 'floor', no call recorded yet"
+            }), HTTPStatus.BAD_REQUEST
+
+        resting_floor = trainer.predict(call_datetime, floor)
+        if resting_floor is None:
+            return jsonify({
+                "error": "No model trained yet, use /train"
+            }), HTTPStatus.SERVICE_UNAVAILABLE
+
+        return jsonify({
+            f"{ElevatorColumns.CALL_DATETIME}": call_datetime,
+            "floor": floor,
+            "resting_floor": resting_floor,
+            "data_version": trainer.current()["data_version"]
+        }), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/predict/resting-schedule", methods=["GET"])
+def predict_resting_schedule():
+    """
+    The predict_resting_schedule function returns the recommended resting
+    floor for every slot of a time range, e.g. a whole week at 15-minute
+    granularity, in a single request.
+    The floor of a slot is the floor most calls came from in the same slot
+    of the week.
+    Query parameters:
+        - start: [str] Start of the range, in the format YYYY-MM-DD HH:MM:SS
+        - end:   [str] End of the range (exclusive), same format
+        - step:  [int] Length of the slots in minutes, 1 to 1440
+                       (default 15)
+
+    The floors are returned in slot order; slot i starts at
+    start + i * step minutes.
+
+    :return: The schedule with OK code if it's everything working.
+             An Error BAD_REQUEST if there's some problem with the request
+             Error SERVICE_UNAVAILABLE if there are no calls to learn from
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        step = request.args.get("step", 15, type=int)
+        try:
+            start = to_epoch(request.args.get("start", ""))
+            end = to_epoch(request.args.get("end", ""))
+        except ValueError:
+            return jsonify({
+                "error": "'start' and 'end' are required, in the format "
+                         "'YYYY-MM-DD HH:MM:SS'."
+            }), HTTPStatus.BAD_REQUEST
+
+        if not 1 <= step <= 1440:
+            return jsonify({
+                "error": "'step' must be an int between 1 and 1440"
+            }), HTTPStatus.BAD_REQUEST
+        if end <= start:
+            return jsonify({
+                "error": "'end' must be after 'start'"
+            }), HTTPStatus.BAD_REQUEST
+        if -(-(end - start) // (step * 60)) > MAX_SCHEDULE_SLOTS:
+            return jsonify({
+                "error": f"The range can't have more than "
+                         f"{MAX_SCHEDULE_SLOTS} slots"
+            }), HTTPStatus.BAD_REQUEST
+
+        floors = resting_scheduler.schedule(get_db(), start, end, step)
+        if floors is None:
+            return jsonify({
+                "error": "No calls recorded to build a schedule from"
+            }), HTTPStatus.SERVICE_UNAVAILABLE
+
+        return jsonify({
+            "start": request.args["start"],
+            "end": request.args["end"],
+            "step": step,
+            "floors": floors
+        }), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def _travel_costs(
+        resting_floor: int | None = None
+) -> list[tuple] | tuple[Response, HTTPStatus]:
+    """
+    The _travel_costs function reads the per-hour travel costs of the calls
+    in the optional 'start' and 'end' query parameters.
+
+    :param resting_floor: [int | None] Floor of the counterfactual costs
+
+    :return: [list[tuple] | tuple[Response, HTTPStatus]] The rows of
+             get_travel_costs_by_hour, or an error response
+    """
+    database = get_db()
+    if not isinstance(database, ElevatorDatabase):
+        return jsonify({
+            "error": "Travel analytics are only available on SQLite storage"
+        }), HTTPStatus.BAD_REQUEST
+
+    try:
+        start, end = (
+            to_epoch(request.args[name]) if name in request.args else None
+            for name in ("start", "end"))
+    except ValueError:
+        return jsonify({
+            "error": "'start' and 'end' must be in the format "
+                     "'YYYY-MM-DD HH:MM:SS'."
+        }), HTTPStatus.BAD_REQUEST
+
+    with database.read_snapshot() as snapshot:
+        return snapshot.get_travel_costs_by_hour(start, end, resting_floor)
+
+
+@api.route("/analytics/empty-travel", methods=["GET"])
+def analytics_empty_travel():
+    """
+    The analytics_empty_travel function reports the floors the car
+    travelled empty to reach the demand floor of the calls, per hour of the
+    day. It is computed by SQLite aggregates, without loading the rows.
+    Query parameters:
+        - start: [str] Start of the range, in the format YYYY-MM-DD HH:MM:SS
+                       (default: first call)
+        - end:   [str] End of the range (exclusive), same format (default:
+                       last call)
+
+    :return: The empty travel with OK code if it's everything working.
+             An Error BAD_REQUEST if there's some problem with the request
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        rows = _travel_costs()
+        if isinstance(rows, tuple):
+            return rows
+
+        calls = sum(row[1] for row in rows)
+        floors = sum(row[3] for row in rows)
+        return jsonify({
+            "calls": calls,
+            "empty_calls": sum(row[2] for row in rows),
+            "floors": floors,
+            "seconds": floors * FLOOR_TRAVEL_SECONDS,
+            "average_floors": round(floors / calls, 4) if calls else None,
+            "by_hour": [{
+                "hour": row[0],
+                "calls": row[1],
+                "empty_calls": row[2],
+                "floors": row[3],
+                "max_floors": row[4],
+                "average_floors": round(row[3] / row[1], 4)
+            } for row in rows]
+        }), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/analytics/repositioning", methods=["GET"])
+def analytics_repositioning():
+    """
+    The analytics_repositioning function reports the floors the idle car
+    moved between the destination of a call and the floor it was on at the
+    next call, per hour of the day. It is computed by SQLite window
+    functions, without loading the rows.
+    Query parameters:
+        - start: [str] Start of the range, in the format YYYY-MM-DD HH:MM:SS
+                       (default: first call)
+        - end:   [str] End of the range (exclusive), same format (default:
+                       last call)
+
+    :return: The repositioning costs with OK code if it's everything
+             working.
+             An Error BAD_REQUEST if there's some problem with the request
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        rows = _travel_costs()
+        if isinstance(rows, tuple):
+            return rows
+
+        floors = sum(row[6] for row in rows)
+        return jsonify({
+            "repositionings": sum(row[5] for row in rows),
+            "floors": floors,
+            "seconds": floors * FLOOR_TRAVEL_SECONDS,
+            "by_hour": [{
+                "hour": row[0],
+                "repositionings": row[5],
+                "floors": row[6],
+                "seconds": row[6] * FLOOR_TRAVEL_SECONDS
+            } for row in rows]
+        }), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/analytics/resting-floor-cost", methods=["GET"])
+def analytics_resting_floor_cost():
+    """
+    The analytics_resting_floor_cost function compares the empty travel and
+    repositioning of the recorded calls with what they would have been if
+    the idle car had always returned to a given resting floor.
+    Query parameters:
+        - floor: [int] The resting floor
+        - start: [str] Start of the range, in the format YYYY-MM-DD HH:MM:SS
+                       (default: first call)
+        - end:   [str] End of the range (exclusive), same format (default:
+                       last call)
+
+    :return: The actual and counterfactual costs with OK code if it's
+             everything working.
+             An Error BAD_REQUEST if there's some problem with the request
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        floor = request.args.get("floor", type=int)
+        if floor is None:
+            return jsonify({
+                "error": "Missing parameter 'floor', it must be an int"
+            }), HTTPStatus.BAD_REQUEST
+
+        rows = _travel_costs(floor)
+        if isinstance(rows, tuple):
+            return rows
+
+        by_hour = []
+        for row in rows:
+            actual = row[3] + row[6]
+            counterfactual = row[7] + (row[8] or 0)
+            by_hour.append({
+                "hour": row[0],
+                "calls": row[1],
+                "actual_floors": actual,
+                "counterfactual_floors": counterfactual,
+                "saved_seconds": (
+                    (actual - counterfactual) * FLOOR_TRAVEL_SECONDS)
+            })
+
+        actual = sum(hour["actual_floors"] for hour in by_hour)
+        counterfactual = sum(
+            hour["counterfactual_floors"] for hour in by_hour)
+        return jsonify({
+            "floor": floor,
+            "calls": sum(row[1] for row in rows),
+            "actual": {
+                "empty_travel_floors": sum(row[3] for row in rows),
+                "repositioning_floors": sum(row[6] for row in rows),
+                "seconds": actual * FLOOR_TRAVEL_SECONDS
+            },
+            "counterfactual": {
+                "empty_travel_floors": sum(row[7] for row in rows),
+                "repositioning_floors": sum(row[8] or 0 for row in rows),
+                "seconds": counterfactual * FLOOR_TRAVEL_SECONDS
+            },
+            "saved_seconds": (actual - counterfactual) * FLOOR_TRAVEL_SECONDS,
+            "by_hour": by_hour
+        }), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def _int_list(name: str, limit: int) -> list[int] | None:
+    """
+    The _int_list function reads a query parameter of comma separated ints
+    between 0 and limit (exclusive).
+
+    :param name:  [str] Name of the query parameter
+    :param limit: [int] Upper bound of the values (exclusive)
+
+    :return: [list[int] | None] The values, None if the parameter is not
+                                given
+    :raises ValueError: If a value is not an int in the range
+    """
+    if name not in request.args:
+        return None
+    values = [int(value) for value in request.args[name].split(",")]
+    if not all(0 <= value < limit for value in values):
+        raise ValueError
+    return values
+
+
+@api.route("/analytics/od-matrix", methods=["GET"])
+def analytics_od_matrix():
+    """
+    The analytics_od_matrix function returns the origin-destination matrix:
+    the calls from every demand floor to every destination floor, optionally
+    only those made in some hours of the day or days of the week. The
+    counts by hour of the week are cached until the data changes, so a
+    slice is computed without reading the calls again.
+    Query parameters:
+        - hour:    [str] Comma separated hours of the day, 0 to 23
+                         (default: all)
+        - weekday: [str] Comma separated days of the week, 0 (Monday) to 6
+                         (default: all)
+
+    :return: The matrix with OK code if it's everything working.
+             An Error BAD_REQUEST if there's some problem with the request
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        database = get_db()
+        if not isinstance(database, ElevatorDatabase):
+            return jsonify({
+                "error": "The origin-destination matrix is only available "
+                         "on SQLite storage"
+            }), HTTPStatus.BAD_REQUEST
+
+        try:
+            hours = _int_list("hour", HOURS_PER_DAY)
+        except ValueError:
+            return jsonify({
+                "error": "'hour' must be comma separated ints between 0 "
+                         "and 23"
+            }), HTTPStatus.BAD_REQUEST
+        try:
+            weekdays = _int_list("weekday", DAYS_PER_WEEK)
+        except ValueError:
+            return jsonify({
+                "error": "'weekday' must be comma separated ints between 0 "
+                         "(Monday) and 6"
+            }), HTTPStatus.BAD_REQUEST
+
+        with database.read_snapshot() as snapshot:
+            result = od_matrix.matrix(snapshot, hours, weekdays)
+        return jsonify({
+            "hours": sorted(set(hours)) if hours is not None else None,
+            "weekdays": (
+                sorted(set(weekdays)) if weekdays is not None else None),
+            **result
+        }), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def _snapshot_rows(database: DatabaseInterface) -> Iterator[tuple]:
+    """
+    The _snapshot_rows function yields all rows from a read snapshot, so a
+    streamed export is consistent however long it takes to send.
+
+    :param database: [DatabaseInterface] The database
+
+    :return: [Iterator[tuple]] The rows of the table
+    """
+    with database.read_snapshot() as snapshot:
+        yield from snapshot.iter_rows()
+
+
+def _compressed_csv_response(
+        encoding: str, level: int, as_file: bool) -> Response:
+    """
+    The _compressed_csv_response function builds a streamed response with
+    the compressed CSV export.
+
+    :param encoding: [str] 'gzip' or 'deflate'
+    :param level:    [int] Compression level
+    :param as_file:  [bool] Send a compressed file (.gz/.zz) instead of a
+                            CSV file with a Content-Encoding
+
+    :return: [Response] The streamed response
+    """
+    chunks = compress_chunks(
+        iter_csv(_snapshot_rows(get_db())), encoding, level)
+
+    filename = "elevator_data.csv"
+    headers = {"Vary": "Accept-Encoding"}
+    if as_file:
+        extension, mimetype = COMPRESSED_FILES[encoding]
+        filename += extension
+    else:
+        mimetype = "text/csv"
+        headers["Content-Encoding"] = encoding
+    headers["Content-Disposition"] = f"attachment; filename={filename}"
+
+    return Response(
+        stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
+
+def _snapshot_path(name: str) -> str | None:
+    """
+    The _snapshot_path function builds the file path of a snapshot,
+    refusing names that could escape the snapshot directory.
+
+    :param name: [str] Name of the snapshot
+
+    :return: [str | None] The snapshot path, or None if the name is invalid
+    """
+    if not isinstance(name, str) or not SNAPSHOT_NAME_PATTERN.match(name):
+        return None
+    return os.path.join(SNAPSHOT_DIR, f"{name}.db")
+
+
+@api.route("/admin/snapshots", methods=["GET"])
+def list_snapshots():
+    """
+    The list_snapshots function lists the snapshots available to restore.
+
+    :return: A list of snapshots with OK code if it's everything working.
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        snapshots = []
+        if os.path.isdir(SNAPSHOT_DIR):
+            snapshots = sorted(
+                file_name[:-3] for file_name in os.listdir(SNAPSHOT_DIR)
+                if file_name.endswith(".db")
+            )
+        return jsonify({"snapshots": snapshots}), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/admin/snapshot", methods=["POST"])
+@sqlite_only("Snapshot")
+def create_snapshot():
+    """
+    The create_snapshot function takes an online snapshot of the database.
+    It takes an optional JSON object with a 'name' field; when omitted the
+    snapshot is named after the current date and time.
+
+    :return: A success message with OK code if it's everything working.
+             An Error BAD_REQUEST if there's some problem with the request
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        name = data.get(
+            "name", datetime.now().strftime("elevator-%Y%m%d-%H%M%S"))
+
+        snapshot_path = _snapshot_path(name)
+        if snapshot_path is None:
+            return jsonify({
+                "error": "'name' must contain only letters, digits, '_' "
+                         "and '-'"
+            }), HTTPStatus.BAD_REQUEST
+
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        get_db().snapshot(snapshot_path)
+
+        return jsonify({
+            "message": f"Snapshot {name} created successfully",
+            "name": name,
+            "size": os.path.getsize(snapshot_path)
+        }), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/admin/restore", methods=["POST"])
+@sqlite_only("Restore")
+def restore_snapshot():
+    """
+    The restore_snapshot function replaces the database with a snapshot.
+    It takes a JSON object with the 'name' of the snapshot.
+
+    :return: A success message with OK code if it's everything working.
+             An Error BAD_REQUEST if there's some problem with the request
+             An Error NOT_FOUND if the snapshot doesn't exist
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if "name" not in data:
+            return jsonify(
+                {"error": "Missing parameter 'name'"}), HTTPStatus.BAD_REQUEST
+
+        snapshot_path = _snapshot_path(data["name"])
+        if snapshot_path is None:
+            return jsonify(
+                {"error": "Invalid snapshot name"}), HTTPStatus.BAD_REQUEST
+        if not os.path.exists(snapshot_path):
+            return jsonify({
+                "error": f"Snapshot {data['name']} not found"
+            }), HTTPStatus.NOT_FOUND
+
+        get_db().restore(snapshot_path)
+        refresh_models(get_db())
+
+        return jsonify({
+            "message": f"Snapshot {data['name']} restored successfully"
+        }), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/admin/maintenance", methods=["GET"])
+def maintenance_status():
+    """
+    The maintenance_status function reports the size and fragmentation of
+    the database and the last maintenance actions, with their durations.
+
+    :return: The maintenance status with OK code if it's everything working.
+             An Error BAD_REQUEST if the storage backend is not SQLite
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        scheduler = get_maintenance()
+        if scheduler is None:
+            return jsonify({
+                "error": "Maintenance is only available on SQLite file "
+                         "storage"
+            }), HTTPStatus.BAD_REQUEST
+        return jsonify(scheduler.status()), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/admin/maintenance/run", methods=["POST"])
+def run_maintenance():
+    """
+    The run_maintenance function runs the maintenance tasks now, without
+    waiting for a quiet period. With the query parameter force=true, every
+    task runs whatever its threshold.
+
+    :return: The actions taken with OK code if it's everything working.
+             An Error BAD_REQUEST if the storage backend is not SQLite
+             Error INTERNAL_SERVER_ERROR otherwise
+    """
+    try:
+        scheduler = get_maintenance()
+        if scheduler is None:
+            return jsonify({
+                "error": "Maintenance is only available on SQLite file "
+                         "storage"
+            }), HTTPStatus.BAD_REQUEST
+        force = request.args.get("force", "false").lower() == "true"
+        return jsonify({
+            "actions": scheduler.run_once(force=force)
+        }), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@api.route("/admission/status", methods=["GET"])
+def admission_status():
+    """
+    The admission_status function reports the requests admitted and shed by
+    the write endpoints, by priority, and their queue times.
+
+    :return: The admission statistics with OK code
+    """
+    return jsonify(admission_controller.stats()), HTTPStatus.OK
+
+
+@api.route("/startup-report", methods=["GET"])
+def startup_report():
+    """
+    The startup_report function reports how long each startup phase took,
+    in seconds. The database_setup phase only appears once the database
+    has been initialized.
+
+    :return: The startup timings with OK code
+    """
+    return jsonify(STARTUP_TIMINGS), HTTPStatus.OK
+
+
+def configure_test() -> None:
+    """
+    The configure_test function is used to configure the database for testing
+    purposes.
+    It sets up a new database with the name elevator_test.db in the tests
+    directory, and then sets that as our global db variable so that we can
+    use it throughout our test suite.
+
+    :return: [None]
+    """
+    from tests import TEST_DATABASE_PATH
+
+    global db, SKETCH_PATH
+    db = ElevatorDatabase(TEST_DATABASE_PATH)
+    SKETCH_PATH = None
+    attach_models(db)
+
+
+# Create the Flask application
+app = create_app()
+# CPU time spent by the process up to here (interpreter start and imports)
+STARTUP_TIMINGS["boot_cpu"] = time.process_time()
 
 
 if __name__ == "__main__":
+    # Initialize the database before serving the first request
+    get_db()
+    for phase, seconds in STARTUP_TIMINGS.items():
+        print(f"Startup {phase}: {seconds * 1000:.1f} ms")
     app.run(debug=True, host="0.0.0.0", port=5000)
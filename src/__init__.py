@@ -1,5 +1,34 @@
-from .elevator_database import db  # noqa: F401
-from .elevator_database import ElevatorDatabase  # noqa: F401
-from .elevator import Elevator  # noqa: F401
-from .data_generator import DataGenerator  # noqa: F401
-from .elevator_models import ElevatorColumns   # noqa: F401
+import importlib
+from typing import Any
+
+# Public names of the package and the submodules defining them.
+# Submodules are only imported when one of their names is first accessed,
+# so importing the package stays cheap and heavy dependencies are only
+# loaded by the code paths that need them.
+_EXPORTS = {
+    "db": ".elevator_database",
+    "ElevatorDatabase": ".elevator_database",
+    "MemoryElevatorDatabase": ".memory_database",
+    "LogElevatorDatabase": ".log_database",
+    "Elevator": ".elevator",
+    "DataGenerator": ".data_generator",
+    "ElevatorColumns": ".elevator_models",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Resolves the public names of the package on first access.
+
+    :param name: [str] The name being accessed
+
+    :return: [Any] The object exported under that name
+    """
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,222 @@
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import deque
+
+from .stats import percentile
+
+# Priorities of the write requests, lower is served first
+PRIORITY_CALL = 0
+PRIORITY_BULK = 1
+PRIORITY_NAMES = {PRIORITY_CALL: "call", PRIORITY_BULK: "bulk"}
+
+# Seconds a request of each priority may wait for a slot before being shed
+DEFAULT_QUEUE_TIMEOUTS = {PRIORITY_CALL: 1.0, PRIORITY_BULK: 2.0}
+# Number of recent queue times kept for the percentiles
+QUEUE_TIME_SAMPLES = 1000
+# In-flight slots only elevator calls may use, so bulk writes holding the
+# others never starve them
+RESERVED_CALL_SLOTS = 1
+
+
+class AdmissionController:
+    def __init__(
+            self,
+            max_in_flight: int = 8,
+            max_queue: int = 64,
+            queue_timeouts: dict[int, float] | None = None,
+            reserved_call_slots: int = RESERVED_CALL_SLOTS
+    ) -> None:
+        """
+        The __init__ function sets up admission control for the write path.
+        At most max_in_flight requests run at once; the others wait in a
+        priority queue, elevator calls ahead of bulk writes, and are shed
+        when their queue deadline passes or the queue is full. A full queue
+        makes room for a call by shedding the newest bulk request waiting.
+        Bulk requests never hold the reserved_call_slots last slots, so
+        calls always find one.
+
+        :param max_in_flight:       [int] Requests allowed to run at once
+        :param max_queue:           [int] Requests allowed to wait
+        :param queue_timeouts:      [dict[int, float] | None] Seconds each
+                                                              priority may
+                                                              wait
+        :param reserved_call_slots: [int] Slots bulk requests may not use
+
+        :return: [None]
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeouts = dict(queue_timeouts or DEFAULT_QUEUE_TIMEOUTS)
+        self.max_bulk_in_flight = max(max_in_flight - reserved_call_slots, 0)
+
+        self.in_flight = 0
+        self.bulk_in_flight = 0
+        # (priority, arrival order) of the waiting requests
+        self._waiting: list[tuple[int, int]] = []
+        self._evicted: set[int] = set()
+        self._arrivals = itertools.count()
+        self._condition = threading.Condition()
+
+        self.admitted = {priority: 0 for priority in PRIORITY_NAMES}
+        self.shed = {priority: 0 for priority in PRIORITY_NAMES}
+        self._queue_times: deque[float] = deque(maxlen=QUEUE_TIME_SAMPLES)
+        self.max_queue_seconds = 0.0
+
+    def retry_after(self, priority: int) -> int:
+        """
+        The retry_after function suggests how many seconds a shed request
+        should wait before being retried.
+
+        :param priority: [int] Priority of the request
+
+        :return: [int] The seconds, at least 1
+        """
+        return max(math.ceil(self.queue_timeouts[priority]), 1)
+
+    def _can_run(self, priority: int) -> bool:
+        """
+        Whether a request of the given priority may take a free slot.
+
+        :param priority: [int] Priority of the request
+
+        :return: [bool] True if a slot it may use is free
+        """
+        if self.in_flight >= self.max_in_flight:
+            return False
+        return (priority == PRIORITY_CALL
+                or self.bulk_in_flight < self.max_bulk_in_flight)
+
+    def _admit(self, priority: int) -> None:
+        """
+        Takes a slot for a request.
+
+        :param priority: [int] Priority of the request
+
+        :return: [None]
+        """
+        self.in_flight += 1
+        if priority != PRIORITY_CALL:
+            self.bulk_in_flight += 1
+        self.admitted[priority] += 1
+
+    def _make_room(self, priority: int) -> bool:
+        """
+        Sheds the newest waiting request of a lower priority, if any, so a
+        request of the given priority can wait in the full queue.
+
+        :param priority: [int] Priority of the arriving request
+
+        :return: [bool] True if a waiting request was shed
+        """
+        victim = max(self._waiting, default=None)
+        if victim is None or victim[0] <= priority:
+            return False
+
+        self._waiting.remove(victim)
+        heapq.heapify(self._waiting)
+        self._evicted.add(victim[1])
+        self._condition.notify_all()
+        return True
+
+    def acquire(self, priority: int = PRIORITY_CALL) -> float | None:
+        """
+        The acquire function waits for a slot to run a request.
+
+        :param priority: [int] Priority of the request
+
+        :return: [float | None] Seconds the request waited, or None if it
+                                was shed
+        """
+        arrived = time.perf_counter()
+        deadline = arrived + self.queue_timeouts[priority]
+
+        with self._condition:
+            if self._can_run(priority) and not self._waiting:
+                self._admit(priority)
+                self._queue_times.append(0.0)
+                return 0.0
+
+            if (len(self._waiting) >= self.max_queue
+                    and not self._make_room(priority)):
+                self.shed[priority] += 1
+                return None
+
+            entry = (priority, next(self._arrivals))
+            heapq.heappush(self._waiting, entry)
+
+            while True:
+                if entry[1] in self._evicted:
+                    self._evicted.discard(entry[1])
+                    self.shed[priority] += 1
+                    return None
+                if self._can_run(priority) and self._waiting[0] == entry:
+                    heapq.heappop(self._waiting)
+                    break
+
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    self.shed[priority] += 1
+                    # The head may have changed
+                    self._condition.notify_all()
+                    return None
+                self._condition.wait(remaining)
+
+            self._admit(priority)
+            queued = time.perf_counter() - arrived
+            self._queue_times.append(queued)
+            self.max_queue_seconds = max(self.max_queue_seconds, queued)
+            # Another slot may still be free for the next waiter
+            self._condition.notify_all()
+            return queued
+
+    def release(self, priority: int = PRIORITY_CALL) -> None:
+        """
+        The release function frees the slot of a finished request.
+
+        :param priority: [int] Priority the request was admitted with
+
+        :return: [None]
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if priority != PRIORITY_CALL:
+                self.bulk_in_flight -= 1
+            self._condition.notify_all()
+
+    def stats(self) -> dict:
+        """
+        The stats function reports the admitted and shed requests by
+        priority and the queue times of the recent requests.
+
+        :return: [dict] The statistics
+        """
+        with self._condition:
+            queue_times = sorted(self._queue_times)
+            stats = {
+                "in_flight": self.in_flight,
+                "bulk_in_flight": self.bulk_in_flight,
+                "queued": len(self._waiting),
+                "max_in_flight": self.max_in_flight,
+                "max_bulk_in_flight": self.max_bulk_in_flight,
+                "max_queue": self.max_queue,
+                "admitted": {
+                    name: self.admitted[priority]
+                    for priority, name in PRIORITY_NAMES.items()
+                },
+                "shed": {
+                    name: self.shed[priority]
+                    for priority, name in PRIORITY_NAMES.items()
+                },
+                "max_queue_ms": round(self.max_queue_seconds * 1000, 3)
+            }
+
+        for name, fraction in (("p50", 0.50), ("p99", 0.99)):
+            value = percentile(queue_times, fraction)
+            stats[f"queue_{name}_ms"] = (
+                None if value is None else round(value * 1000, 3))
+        return stats
@@ -0,0 +1,73 @@
+import importlib
+from typing import Any, Callable
+
+from .db_inteface import DatabaseInterface
+
+# Storage backends by name. Built-in backends are given as the submodule and
+# class implementing them, so their modules are only imported when used
+_BACKENDS: dict[str, Callable[..., DatabaseInterface] | tuple[str, str]] = {
+    "sqlite": (".elevator_database", "ElevatorDatabase"),
+    "memory": (".memory_database", "MemoryElevatorDatabase"),
+    "log": (".log_database", "LogElevatorDatabase"),
+}
+
+
+def register_backend(
+        name: str,
+        factory: Callable[..., DatabaseInterface]
+) -> None:
+    """
+    The register_backend function makes a storage backend available by
+    name, replacing any backend registered under the same name.
+
+    :param name:    [str] Name of the backend, e.g. in ELEVATOR_STORAGE
+    :param factory: [Callable[..., DatabaseInterface]] Creates the store,
+                                                       usually its class
+
+    :return: [None]
+    """
+    _BACKENDS[name] = factory
+
+
+def available_backends() -> list[str]:
+    """
+    The available_backends function lists the registered backend names.
+
+    :return: [list[str]] The names, sorted
+    """
+    return sorted(_BACKENDS)
+
+
+def get_backend(name: str) -> Callable[..., DatabaseInterface]:
+    """
+    The get_backend function returns the factory of a storage backend.
+
+    :param name: [str] Name of the backend
+
+    :return: [Callable[..., DatabaseInterface]] The factory
+    """
+    if name not in _BACKENDS:
+        raise ValueError(
+            f"Unknown storage backend '{name}', expected one of: "
+            f"{', '.join(available_backends())}")
+
+    factory = _BACKENDS[name]
+    if isinstance(factory, tuple):
+        module_name, class_name = factory
+        factory = getattr(
+            importlib.import_module(module_name, __package__), class_name)
+        _BACKENDS[name] = factory
+    return factory
+
+
+def create_database(name: str, **options: Any) -> DatabaseInterface:
+    """
+    The create_database function creates a call store with a registered
+    backend.
+
+    :param name:    [str] Name of the backend
+    :param options: [Any] Keyword arguments of the backend
+
+    :return: [DatabaseInterface] The call store
+    """
+    return get_backend(name)(**options)
@@ -0,0 +1,112 @@
+import queue
+import threading
+
+
+class Subscription:
+    def __init__(self, buffer_size: int) -> None:
+        """
+        The __init__ function creates the bounded buffer of a subscriber.
+
+        :param buffer_size: [int] Maximum number of events waiting to be
+                                  consumed before the subscriber is dropped
+
+        :return: [None]
+        """
+        self.events: queue.Queue = queue.Queue(maxsize=buffer_size)
+        self.dropped = False
+
+    def get(self, timeout: float) -> dict | None:
+        """
+        The get function waits for the next event.
+
+        :param timeout: [float] Seconds to wait for an event
+
+        :return: [dict | None] The event, or None if none arrived in time
+        """
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class CallBroadcaster:
+    def __init__(
+            self,
+            buffer_size: int = 256,
+            max_subscribers: int = 1000
+    ) -> None:
+        """
+        The __init__ function sets up an in-process fan-out of events.
+        Publishing never blocks: each subscriber has its own bounded buffer
+        and a subscriber whose buffer is full is dropped, so a slow consumer
+        can't hold back the write path or the other subscribers.
+
+        :param buffer_size:     [int] Size of the buffer of each subscriber
+        :param max_subscribers: [int] Maximum number of subscribers
+
+        :return: [None]
+        """
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.published = 0
+        self.dropped = 0
+        self._subscribers: set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def subscriber_count(self) -> int:
+        """Number of active subscribers"""
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscription | None:
+        """
+        The subscribe function registers a new subscriber.
+
+        :return: [Subscription | None] The subscription, or None if the
+                                       subscriber limit was reached
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscription = Subscription(self.buffer_size)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        The unsubscribe function removes a subscriber, if still registered.
+
+        :param subscription: [Subscription] The subscription to remove
+
+        :return: [None]
+        """
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event: dict) -> int:
+        """
+        The publish function hands an event to every subscriber.
+
+        :param event: [dict] The event
+
+        :return: [int] Number of subscribers that received the event
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.published += 1
+
+        delivered = 0
+        for subscription in subscribers:
+            try:
+                subscription.events.put_nowait(event)
+                delivered += 1
+            except queue.Full:
+                subscription.dropped = True
+                with self._lock:
+                    # Concurrent publishers may find the same full buffer,
+                    # only the first one drops it
+                    if subscription in self._subscribers:
+                        self._subscribers.discard(subscription)
+                        self.dropped += 1
+
+        return delivered
@@ -0,0 +1,479 @@
+import os
+import sys
+import json
+import gzip
+import time
+import argparse
+import tempfile
+from typing import Any, Iterable, Iterator, TextIO
+
+from .csv_export import COMPRESSION_WBITS, compress_chunks, iter_csv
+from .csv_import import IMPORT_CHUNK_ROWS, import_csv
+from .data_generator import INGEST_BATCH_SIZE, DataGenerator
+from .elevator_database import SNAPSHOT_PAGES, ElevatorDatabase, to_epoch
+from .elevator_models import ElevatorColumns
+
+# Rows between two progress updates of the exports
+EXPORT_PROGRESS_ROWS = 50_000
+# Calls written by the benchmark when not given
+BENCHMARK_ROWS = 200_000
+# Upper bound of the exported calls when only --start is given
+EXPORT_END = "9999-12-31 23:59:59"
+
+
+def is_csv(source: str) -> bool:
+    """
+    Tells a CSV source of the ingest command from travel logs.
+
+    :param source: [str] The source given on the command line
+
+    :return: [bool] True for a CSV file or stdin
+    """
+    return source == "-" or source.endswith((".csv", ".csv.gz"))
+
+
+class Progress:
+    def __init__(self, label: str, stream: TextIO | None = None) -> None:
+        """
+        The __init__ function creates a progress line, rewritten in place
+        on terminals and printed once per update otherwise.
+
+        :param label:  [str] What is progressing
+        :param stream: [TextIO | None] Where to write (default: stderr)
+
+        :return: [None]
+        """
+        self.label = label
+        self.stream = stream or sys.stderr
+        self.started = time.perf_counter()
+        self.done = 0
+        self._in_place = self.stream.isatty()
+
+    def update(self, done: int, total: int | None = None) -> None:
+        """
+        The update function shows how much was done, with the rate.
+
+        :param done:  [int] Units done so far
+        :param total: [int | None] Units to do, if known
+
+        :return: [None]
+        """
+        self.done = done
+        elapsed = time.perf_counter() - self.started
+        line = f"{self.label}: {done:,}"
+        if total:
+            line += f"/{total:,} ({done / total:.0%})"
+        if elapsed > 0:
+            line += f", {done / elapsed:,.0f}/s"
+
+        if self._in_place:
+            self.stream.write(f"\r{line}")
+        else:
+            self.stream.write(f"{line}\n")
+        self.stream.flush()
+
+    def finish(self) -> float:
+        """
+        The finish function ends the progress line.
+
+        :return: [float] Seconds since the progress started
+        """
+        if self._in_place:
+            self.stream.write("\n")
+            self.stream.flush()
+        return time.perf_counter() - self.started
+
+
+def counted(rows: Iterable[tuple], progress: Progress) -> Iterator[tuple]:
+    """
+    The counted function passes rows through, updating the progress every
+    EXPORT_PROGRESS_ROWS rows.
+
+    :param rows:     [Iterable[tuple]] The rows
+    :param progress: [Progress] The progress line
+
+    :return: [Iterator[tuple]] The same rows
+    """
+    count = 0
+    for count, row in enumerate(rows, start=1):
+        yield row
+        if count % EXPORT_PROGRESS_ROWS == 0:
+            progress.update(count)
+    progress.update(count)
+
+
+def ingest(db: ElevatorDatabase, options: argparse.Namespace) -> dict:
+    """
+    The ingest function loads a CSV export, gzipped or not, or a directory
+    or glob of travel logs, one transaction per chunk so the API keeps
+    writing in between.
+
+    :param db:      [ElevatorDatabase] The database
+    :param options: [argparse.Namespace] The command line options
+
+    :return: [dict] What was ingested
+    """
+    source = options.source
+    if is_csv(source):
+        progress = Progress("Imported rows")
+        if source == "-":
+            rows = import_csv(
+                db, sys.stdin, options.batch_size, progress.update)
+        else:
+            opener = gzip.open if source.endswith(".gz") else open
+            with opener(source, "rt", newline="") as file:
+                rows = import_csv(
+                    db, file, options.batch_size, progress.update)
+        return {"rows": rows, "seconds": round(progress.finish(), 3)}
+
+    progress = Progress("Ingested files")
+    summary = DataGenerator.ingest(
+        db, source,
+        progress_path=options.progress,
+        workers=options.workers,
+        batch_size=options.batch_size,
+        progress=lambda done, total: progress.update(done["files"], total)
+    )
+    summary["seconds"] = round(progress.finish(), 3)
+    return summary
+
+
+def export(db: ElevatorDatabase, options: argparse.Namespace) -> dict:
+    """
+    The export function writes the calls to a CSV file, like /export-csv,
+    streaming them in keyset-paginated batches from a read snapshot, so
+    the file is consistent and writers are never blocked.
+
+    :param db:      [ElevatorDatabase] The database
+    :param options: [argparse.Namespace] The command line options
+
+    :return: [dict] The rows and bytes written
+    """
+    progress = Progress("Exported rows")
+    # Every batch is read from the same snapshot, however long it takes
+    with db.read_snapshot() as snapshot:
+        if options.start or options.end:
+            rows = snapshot.iter_rows_between(
+                options.start or 0, options.end or to_epoch(EXPORT_END))
+        else:
+            rows = snapshot.iter_rows()
+
+        chunks = iter_csv(counted(rows, progress))
+        written = 0
+        temp_path = f"{options.path}.tmp"
+        if options.compression:
+            with open(temp_path, "wb") as file:
+                for data in compress_chunks(
+                        chunks, options.compression, options.level):
+                    written += file.write(data)
+        else:
+            with open(temp_path, "w", newline="") as file:
+                for chunk in chunks:
+                    written += file.write(chunk)
+    os.replace(temp_path, options.path)
+
+    return {
+        "path": options.path,
+        "rows": progress.done,
+        "bytes": written,
+        "seconds": round(progress.finish(), 3)
+    }
+
+
+def snapshot(db: ElevatorDatabase, options: argparse.Namespace) -> dict:
+    """
+    The snapshot function copies the database with the online backup API,
+    a few pages per step, while the API keeps serving.
+
+    :param db:      [ElevatorDatabase] The database
+    :param options: [argparse.Namespace] The command line options
+
+    :return: [dict] The snapshot path and size
+    """
+    progress = Progress("Copied pages")
+    db.snapshot(
+        options.path,
+        pages=options.pages,
+        progress=lambda status, remaining, total: progress.update(
+            total - remaining, total)
+    )
+    return {
+        "path": options.path,
+        "bytes": os.path.getsize(options.path),
+        "seconds": round(progress.finish(), 3)
+    }
+
+
+def reindex(db: ElevatorDatabase, options: argparse.Namespace) -> dict:
+    """
+    The reindex function rebuilds the indexes one at a time and refreshes
+    the planner statistics.
+
+    :param db:      [ElevatorDatabase] The database
+    :param options: [argparse.Namespace] The command line options
+
+    :return: [dict] The rebuilt indexes
+    """
+    started = time.perf_counter()
+    indexes = db.reindex()
+    db.analyze()
+    return {
+        "indexes": indexes,
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+def migrate(db: ElevatorDatabase, options: argparse.Namespace) -> dict:
+    """
+    The migrate function converts a database from the DATETIME text schema
+    to the compact schema in place. The copy runs in a single transaction
+    and writers wait for it: run it while the API is stopped.
+
+    :param db:      [ElevatorDatabase] The database
+    :param options: [argparse.Namespace] The command line options
+
+    :return: [dict] Whether it was migrated and the file size before and
+                    after
+    """
+    started = time.perf_counter()
+    size_before = os.path.getsize(options.database)
+    migrated = db.migrate_to_compact()
+    return {
+        "migrated": migrated,
+        "bytes_before": size_before,
+        "bytes_after": os.path.getsize(options.database),
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+def vacuum(db: ElevatorDatabase, options: argparse.Namespace) -> dict:
+    """
+    The vacuum function rebuilds the database file, releasing its free pages
+    and enabling incremental auto_vacuum on databases created without it,
+    so the background maintenance can release them from then on. Writers
+    wait for the whole rewrite: run it when the API is stopped or idle.
+
+    :param db:      [ElevatorDatabase] The database
+    :param options: [argparse.Namespace] The command line options
+
+    :return: [dict] The pages released and the auto_vacuum mode
+    """
+    started = time.perf_counter()
+    before = db.get_storage_stats()
+    db.vacuum()
+    after = db.get_storage_stats()
+    return {
+        "pages_released": before["page_count"] - after["page_count"],
+        "auto_vacuum": after["auto_vacuum"],
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+def train(db: ElevatorDatabase, options: argparse.Namespace) -> dict:
+    """
+    The train function trains the resting floor classifier in this process
+    and saves its artifact where the API loads it from.
+
+    :param db:      [ElevatorDatabase] The database
+    :param options: [argparse.Namespace] The command line options
+
+    :return: [dict] The artifact path
+    """
+    from .training import artifact_path, train_model
+
+    started = time.perf_counter()
+    data_version = db.get_data_version()
+    path = artifact_path(options.model_dir, data_version)
+    if os.path.exists(path) and not options.force:
+        return {"path": path, "status": "cached"}
+
+    history = db.get_call_history()
+    if len(history) < 2:
+        raise ValueError("Not enough calls to train a model")
+    print(f"Training on {len(history):,} calls", file=sys.stderr)
+
+    return {
+        "path": train_model(history, data_version, options.model_dir),
+        "status": "trained",
+        "samples": len(history) - 1,
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+def benchmark(db: ElevatorDatabase, options: argparse.Namespace) -> dict:
+    """
+    The benchmark function measures the bulk paths on a scratch copy of the
+    schema: bulk insert, keyset scan, call history, CSV export and the
+    travel cost aggregates. The database given is only read for its
+    schema, never written.
+
+    :param db:      [ElevatorDatabase] The database
+    :param options: [argparse.Namespace] The command line options
+
+    :return: [dict] Seconds and rows per second of each path
+    """
+    from .load_test import synthetic_travels
+
+    calls = []
+    current_floor = 1
+    for travel in synthetic_travels(options.rows, seed=0):
+        calls.append((
+            current_floor,
+            travel[ElevatorColumns.DEMAND_FLOOR],
+            travel[ElevatorColumns.DESTINATION_FLOOR],
+            travel[ElevatorColumns.CALL_DATETIME]
+        ))
+        current_floor = travel[ElevatorColumns.DESTINATION_FLOOR]
+    results = {}
+
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        scratch = ElevatorDatabase(
+            os.path.join(scratch_dir, "benchmark.db"), compact=db.compact)
+        scratch.create_table()
+
+        def timed(name: str, function: Any) -> None:
+            started = time.perf_counter()
+            function()
+            seconds = time.perf_counter() - started
+            results[name] = {
+                "seconds": round(seconds, 3),
+                "rows_per_second": round(len(calls) / seconds)
+            }
+            print(f"{name}: {seconds:.3f}s", file=sys.stderr)
+
+        def insert() -> None:
+            for start in range(0, len(calls), options.batch_size):
+                scratch.insert_calls(
+                    calls[start:start + options.batch_size])
+
+        timed("insert_calls", insert)
+        timed("iter_rows", lambda: sum(1 for _ in scratch.iter_rows()))
+        timed("get_call_history", scratch.get_call_history)
+        timed("export_csv", lambda: sum(
+            len(chunk) for chunk in iter_csv(scratch.iter_rows())))
+        timed("travel_costs", scratch.get_travel_costs_by_hour)
+
+    return {"rows": len(calls), "compact": db.compact, "paths": results}
+
+
+COMMANDS = {
+    "ingest": ingest,
+    "export": export,
+    "snapshot": snapshot,
+    "reindex": reindex,
+    "migrate": migrate,
+    "vacuum": vacuum,
+    "train": train,
+    "benchmark": benchmark
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    The build_parser function describes the commands and their options.
+
+    :return: [argparse.ArgumentParser] The parser
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m src.cli",
+        description="Batch operations on the elevator database, without "
+                    "going through the API"
+    )
+    parser.add_argument(
+        "--database", default="elevator.db",
+        help="Database to work on (default: elevator.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser(
+        "ingest", help="Load a CSV export or travel logs")
+    command.add_argument(
+        "source", help="CSV file (.csv, .csv.gz or - for stdin), or a "
+                       "directory or glob of travel logs")
+    command.add_argument(
+        "--batch-size", type=int, default=None,
+        help=f"Rows per transaction (default: {IMPORT_CHUNK_ROWS} for CSV, "
+             f"{INGEST_BATCH_SIZE} for travel logs)")
+    command.add_argument(
+        "--progress", help="File tracking the ingested travel logs, to "
+                           "resume an interrupted ingestion")
+    command.add_argument(
+        "--workers", type=int, help="Processes parsing travel logs "
+                                    "(default: number of CPUs)")
+
+    command = commands.add_parser("export", help="Write the calls to CSV")
+    command.add_argument("path", help="CSV file to write")
+    command.add_argument(
+        "--compression", choices=sorted(COMPRESSION_WBITS),
+        help="Compress the file")
+    command.add_argument(
+        "--level", type=int, default=6, help="Compression level, 1 to 9")
+    command.add_argument(
+        "--start", type=to_epoch,
+        help="Only calls from YYYY-MM-DD HH:MM:SS")
+    command.add_argument(
+        "--end", type=to_epoch,
+        help="Only calls before YYYY-MM-DD HH:MM:SS")
+
+    command = commands.add_parser(
+        "snapshot", help="Copy the database online")
+    command.add_argument("path", help="Snapshot file to write")
+    command.add_argument(
+        "--pages", type=int, default=SNAPSHOT_PAGES,
+        help=f"Pages copied per step (default: {SNAPSHOT_PAGES})")
+
+    commands.add_parser(
+        "reindex", help="Rebuild the indexes and refresh the statistics")
+
+    commands.add_parser(
+        "migrate", help="Convert the database to the compact schema")
+
+    commands.add_parser(
+        "vacuum", help="Rebuild the database file and enable incremental "
+                       "auto_vacuum, blocking writers meanwhile")
+
+    command = commands.add_parser(
+        "train", help="Train the resting floor classifier")
+    command.add_argument(
+        "--model-dir",
+        default=os.environ.get("ELEVATOR_MODEL_DIR", "./models"),
+        help="Directory of the model artifacts (default: ./models)")
+    command.add_argument(
+        "--force", action="store_true",
+        help="Train even if the current data was already trained on")
+
+    command = commands.add_parser(
+        "benchmark", help="Measure the bulk paths on a scratch database")
+    command.add_argument(
+        "--rows", type=int, default=BENCHMARK_ROWS,
+        help=f"Calls to write (default: {BENCHMARK_ROWS})")
+    command.add_argument(
+        "--batch-size", type=int, default=IMPORT_CHUNK_ROWS,
+        help=f"Rows per transaction (default: {IMPORT_CHUNK_ROWS})")
+
+    return parser
+
+
+def main(arguments: list[str] | None = None) -> dict:
+    """
+    The main function runs a batch command from the command line and prints
+    its result as JSON. Writes are split in short transactions, so the
+    commands can run while the API serves the same database.
+
+    :param arguments: [list[str] | None] Command line arguments
+
+    :return: [dict] The result of the command
+    """
+    options = build_parser().parse_args(arguments)
+    if options.command == "ingest" and options.batch_size is None:
+        options.batch_size = (
+            IMPORT_CHUNK_ROWS if is_csv(options.source)
+            else INGEST_BATCH_SIZE)
+
+    db = ElevatorDatabase.open(options.database)
+    result = COMMANDS[options.command](db, options)
+    print(json.dumps(result, indent=4))
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import csv
+import zlib
+
+from io import StringIO
+from typing import Iterable, Iterator
+
+from .elevator_models import ElevatorColumns
+
+# Header of the exported CSV files
+CSV_HEADER = (
+    ElevatorColumns.ID,
+    ElevatorColumns.CURRENT_FLOOR,
+    ElevatorColumns.DEMAND_FLOOR,
+    ElevatorColumns.DESTINATION_FLOOR,
+    ElevatorColumns.CALL_DATETIME
+)
+# Size in characters of each CSV chunk handed to the compressor
+CSV_CHUNK_SIZE = 64 * 1024
+# zlib window bits for each supported encoding
+COMPRESSION_WBITS = {
+    "gzip": 16 + zlib.MAX_WBITS,
+    "deflate": zlib.MAX_WBITS
+}
+# File extension and media type used when compression is requested through
+# the query string, so the download is saved as a compressed file
+COMPRESSED_FILES = {
+    "gzip": (".gz", "application/gzip"),
+    "deflate": (".zz", "application/zlib")
+}
+
+
+def iter_csv(rows: Iterable[tuple]) -> Iterator[str]:
+    """
+    The iter_csv function writes the header and the rows as CSV, yielding
+    chunks of about CSV_CHUNK_SIZE characters while the rows are read.
+
+    :param rows: [Iterable[tuple]] The rows to be written
+
+    :return: [Iterator[str]] The CSV chunks
+    """
+    buffer = StringIO()
+    csv_writer = csv.writer(buffer)
+    csv_writer.writerow(CSV_HEADER)
+
+    for row in rows:
+        csv_writer.writerow(row)
+        if buffer.tell() >= CSV_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def compress_chunks(
+        chunks: Iterable[str],
+        encoding: str,
+        level: int = 6
+) -> Iterator[bytes]:
+    """
+    The compress_chunks function compresses the chunks one by one with a
+    single streaming compressor, so the whole file is never buffered.
+
+    :param chunks:   [Iterable[str]] The text chunks
+    :param encoding: [str] 'gzip' or 'deflate'
+    :param level:    [int] Compression level, from 1 (fastest) to 9
+                           (smallest)
+
+    :return: [Iterator[bytes]] The compressed stream
+    """
+    compressor = zlib.compressobj(
+        level, zlib.DEFLATED, COMPRESSION_WBITS[encoding])
+
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+
+    yield compressor.flush()
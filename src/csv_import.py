@@ -0,0 +1,245 @@
+import io
+import re
+import csv
+import sys
+import gzip
+import zlib
+import argparse
+from datetime import datetime
+from typing import IO, Callable, Iterable, Iterator
+
+from .csv_export import COMPRESSION_WBITS
+from .db_inteface import DatabaseInterface
+from .elevator_models import ElevatorColumns, DATETIME_FORMAT
+
+# Rows inserted per transaction
+IMPORT_CHUNK_ROWS = 10_000
+# Bytes read from the source at a time
+IMPORT_READ_SIZE = 64 * 1024
+
+# Columns an imported file must have. The id column of exported files is
+# accepted and ignored: imported rows get new ids
+IMPORT_COLUMNS = (
+    ElevatorColumns.CURRENT_FLOOR,
+    ElevatorColumns.DEMAND_FLOOR,
+    ElevatorColumns.DESTINATION_FLOOR,
+    ElevatorColumns.CALL_DATETIME
+)
+DATETIME_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}")
+
+
+class DecompressingReader(io.RawIOBase):
+    def __init__(self, source: IO[bytes], encoding: str) -> None:
+        """
+        The __init__ function wraps a gzip or deflate compressed binary
+        stream, decompressing it as it is read.
+
+        :param source:   [IO[bytes]] The compressed stream
+        :param encoding: [str] 'gzip' or 'deflate'
+
+        :return: [None]
+        """
+        self.source = source
+        self._decompressor = zlib.decompressobj(COMPRESSION_WBITS[encoding])
+        self._pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        """The stream can be read"""
+        return True
+
+    def readinto(self, buffer) -> int:
+        """
+        Fills the buffer with decompressed bytes.
+
+        :param buffer: The buffer to fill
+
+        :raises zlib.error: If the stream is not validly compressed
+        :raises EOFError:   If the stream ends before the compressed data
+
+        :return: [int] The number of bytes, 0 at the end of the stream
+        """
+        while not self._pending:
+            data = self.source.read(IMPORT_READ_SIZE)
+            if not data:
+                self._pending = memoryview(self._decompressor.flush())
+                if not self._pending:
+                    if not self._decompressor.eof:
+                        raise EOFError(
+                            "Compressed data ended before the end-of-stream "
+                            "marker was reached")
+                    return 0
+                break
+            self._pending = memoryview(self._decompressor.decompress(data))
+
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def open_text(source: IO[bytes], encoding: str | None = None) -> IO[str]:
+    """
+    The open_text function decodes a binary CSV stream, decompressing it
+    first when it is gzip or deflate encoded.
+
+    :param source:   [IO[bytes]] The binary stream
+    :param encoding: [str | None] 'gzip', 'deflate' or None
+
+    :return: [IO[str]] The text stream
+    """
+    if encoding:
+        if encoding not in COMPRESSION_WBITS:
+            raise ValueError(
+                f"Unsupported encoding '{encoding}', expected one of: "
+                f"{', '.join(COMPRESSION_WBITS)}")
+        source = io.BufferedReader(DecompressingReader(source, encoding))
+    return io.TextIOWrapper(source, encoding="utf-8", newline="")
+
+
+def read_csv_chunks(
+        lines: Iterable[str],
+        chunk_rows: int = IMPORT_CHUNK_ROWS
+) -> Iterator[list[tuple[int, int, int, str]]]:
+    """
+    The read_csv_chunks function parses and validates CSV rows, yielding
+    them in chunks as they are read.
+    The header must hold the IMPORT_COLUMNS, in any order, and may hold the
+    id column of exported files.
+
+    :param lines:      [Iterable[str]] The CSV lines
+    :param chunk_rows: [int] Rows per chunk
+
+    :return: [Iterator[list[tuple]]] The current, demand and destination
+                                     floors and call_datetime of each row
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        raise ValueError("The CSV file is empty")
+
+    header = [column.strip() for column in header]
+    unknown_columns = set(header) - set(IMPORT_COLUMNS) - {ElevatorColumns.ID}
+    missing_columns = set(IMPORT_COLUMNS) - set(header)
+    if unknown_columns or missing_columns:
+        raise ValueError(
+            f"Invalid columns, expected {', '.join(IMPORT_COLUMNS)}: "
+            f"unknown {sorted(unknown_columns)}, "
+            f"missing {sorted(missing_columns)}")
+
+    current, demand, destination, call_datetime = (
+        header.index(column) for column in IMPORT_COLUMNS)
+    chunk = []
+
+    for row in reader:
+        if not row:
+            continue
+        try:
+            values = (
+                int(row[current]),
+                int(row[demand]),
+                int(row[destination]),
+                row[call_datetime]
+            )
+        except (IndexError, ValueError):
+            raise ValueError(
+                f"Line {reader.line_num}: expected int floors") from None
+        try:
+            # The pattern enforces zero padding, strptime the field ranges
+            if not DATETIME_PATTERN.fullmatch(values[3]):
+                raise ValueError
+            datetime.strptime(values[3], DATETIME_FORMAT)
+        except ValueError:
+            raise ValueError(
+                f"Line {reader.line_num}: '{ElevatorColumns.CALL_DATETIME}' "
+                f"must be a valid date in the format YYYY-MM-DD HH:MM:SS"
+            ) from None
+
+        chunk.append(values)
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def import_csv(
+        db: DatabaseInterface,
+        lines: Iterable[str],
+        chunk_rows: int = IMPORT_CHUNK_ROWS,
+        progress: Callable[[int], object] | None = None
+) -> int:
+    """
+    The import_csv function loads CSV rows into the database, one
+    transaction per chunk, so memory stays constant whatever the size of
+    the file. If a row is invalid, or compressed lines turn out to be
+    corrupted or truncated, the chunks before it stay imported and the error
+    tells how many rows were imported.
+
+    :param db:         [DatabaseInterface] The database to write to
+    :param lines:      [Iterable[str]] The CSV lines
+    :param chunk_rows: [int] Rows per transaction
+    :param progress:   [Callable[[int], object] | None] Called after every
+                                                        transaction with the
+                                                        rows imported so far
+
+    :raises ValueError: If a row or the compressed data is invalid
+
+    :return: [int] The number of imported rows
+    """
+    imported = 0
+    try:
+        for chunk in read_csv_chunks(lines, chunk_rows):
+            imported += db.insert_calls(chunk)
+            if progress:
+                progress(imported)
+    except ValueError as e:
+        raise ValueError(f"{e} ({imported} rows imported)") from None
+    except (zlib.error, gzip.BadGzipFile, EOFError) as e:
+        raise ValueError(
+            f"Invalid compressed data: {e} ({imported} rows imported)"
+        ) from None
+    return imported
+
+
+def main(arguments: list[str] | None = None) -> int:
+    """
+    The main function imports a CSV file from the command line, like the
+    ones downloaded from /export-csv. Files ending in .gz are decompressed.
+
+    :param arguments: [list[str] | None] Command line arguments
+
+    :return: [int] The number of imported rows
+    """
+    from .elevator_database import ElevatorDatabase
+
+    parser = argparse.ArgumentParser(
+        prog="python -m src.csv_import",
+        description="Import a CSV file of elevator calls"
+    )
+    parser.add_argument("path", help="CSV file, or - for stdin")
+    parser.add_argument(
+        "--database", default="elevator.db",
+        help="Database to import into (default: elevator.db)")
+    parser.add_argument(
+        "--chunk-rows", type=int, default=IMPORT_CHUNK_ROWS,
+        help=f"Rows per transaction (default: {IMPORT_CHUNK_ROWS})")
+    options = parser.parse_args(arguments)
+
+    db = ElevatorDatabase.open(options.database)
+
+    if options.path == "-":
+        imported = import_csv(db, sys.stdin, options.chunk_rows)
+    elif options.path.endswith(".gz"):
+        with gzip.open(options.path, "rt", newline="") as file:
+            imported = import_csv(db, file, options.chunk_rows)
+    else:
+        with open(options.path, "r", newline="") as file:
+            imported = import_csv(db, file, options.chunk_rows)
+
+    print(f"Imported {imported} rows")
+    return imported
+
+
+if __name__ == "__main__":
+    main()
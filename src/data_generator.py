@@ -1,12 +1,72 @@
 import os
+import glob
 import json
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable
 
-from .elevator_database import ElevatorDatabase
+from .db_inteface import DatabaseInterface
+from .elevator_models import ElevatorColumns, DATETIME_FORMAT
+
+# Rows inserted per transaction while ingesting many files
+INGEST_BATCH_SIZE = 50_000
+# Errors reported per rejected file
+MAX_FILE_ERRORS = 10
+
+
+def parse_travel_file(
+        path: str
+) -> tuple[list[tuple[int, int, int, str]], list[str]]:
+    """
+    The parse_travel_file function reads and validates a travel log: a
+    JSON list of travels with int floors and a call_datetime in the format
+    YYYY-MM-DD HH:MM:SS. It runs in the worker processes of
+    DataGenerator.ingest.
+
+    :param path: [str] Path of the JSON file
+
+    :return: [tuple[list[tuple], list[str]]] The current, demand and
+                                              destination floors and
+                                              call_datetime of each travel,
+                                              and the validation errors
+    """
+    try:
+        with open(path, "r") as file:
+            travels = json.load(file)
+    except (OSError, ValueError) as e:
+        return [], [str(e)]
+    if not isinstance(travels, list):
+        return [], ["Expected a list of travels"]
+
+    floor_columns = (
+        ElevatorColumns.CURRENT_FLOOR,
+        ElevatorColumns.DEMAND_FLOOR,
+        ElevatorColumns.DESTINATION_FLOOR
+    )
+    calls = []
+    errors = []
+
+    for position, travel in enumerate(travels):
+        try:
+            floors = tuple(travel[column] for column in floor_columns)
+            if not all(
+                    isinstance(floor, int) and not isinstance(floor, bool)
+                    for floor in floors):
+                raise ValueError("floors must be of type int")
+            call_datetime = travel[ElevatorColumns.CALL_DATETIME]
+            datetime.strptime(call_datetime, DATETIME_FORMAT)
+            calls.append(floors + (call_datetime,))
+        except (KeyError, TypeError, ValueError) as e:
+            if len(errors) < MAX_FILE_ERRORS:
+                errors.append(f"Travel {position}: {e!r}")
+
+    return calls, errors
 
 
 class DataGenerator:
     @staticmethod
-    def generate(db: ElevatorDatabase) -> bool:
+    def generate(db: DatabaseInterface) -> bool:
         """
         The generate function will load data from the JSON file and insert it
         into the database.
@@ -26,20 +86,149 @@ class DataGenerator:
             with open(json_path, "r") as file:
                 data = json.load(file)
 
-            # Iterate over the data and insert into the database
-            for travel in data:
-                current_floor = travel["current_floor"]
-                demand_floor = travel["demand_floor"]
-                destination_floor = travel["destination_floor"]
-                call_datetime = travel["call_datetime"]
-
-                db.insert_call(
-                    current_floor,
-                    demand_floor,
-                    destination_floor,
-                    call_datetime
+            # Insert all the travels at once
+            db.insert_calls(
+                (
+                    travel["current_floor"],
+                    travel["demand_floor"],
+                    travel["destination_floor"],
+                    travel["call_datetime"]
                 )
+                for travel in data
+            )
 
             return True
         else:
             return False
+
+    @staticmethod
+    def _load_progress(progress_path: str | None) -> set[str]:
+        """
+        Reads the files already ingested from the progress file.
+
+        :param progress_path: [str | None] Path of the progress file
+
+        :return: [set[str]] The absolute paths of the ingested files
+        """
+        if not progress_path or not os.path.exists(progress_path):
+            return set()
+        with open(progress_path, "r") as file:
+            return set(json.load(file)["done"])
+
+    @staticmethod
+    def _save_progress(progress_path: str | None, done: set[str]) -> None:
+        """
+        Writes the files already ingested to the progress file, replacing
+        it atomically.
+
+        :param progress_path: [str | None] Path of the progress file
+        :param done:          [set[str]] The absolute paths of the ingested
+                                         files
+
+        :return: [None]
+        """
+        if not progress_path:
+            return
+        temp_path = f"{progress_path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump({"done": sorted(done)}, file)
+        os.replace(temp_path, progress_path)
+
+    @staticmethod
+    def ingest(
+            db: DatabaseInterface,
+            source: str,
+            progress_path: str | None = None,
+            workers: int | None = None,
+            batch_size: int = INGEST_BATCH_SIZE,
+            executor: Executor | None = None,
+            progress: Callable[[dict, int], object] | None = None
+    ) -> dict:
+        """
+        The ingest function loads many travel logs, like one file per day.
+        Files are parsed and validated in a process pool and written by the
+        calling thread, in file name order, several files per transaction
+        up to batch_size rows. After each transaction the ingested files
+        are recorded in the progress file, so an interrupted ingestion
+        resumes with the first file not written yet. Files with invalid
+        travels are rejected as a whole and reported.
+
+        :param db:            [DatabaseInterface] The database to write to
+        :param source:        [str] A directory of .json files or a glob
+                                    pattern
+        :param progress_path: [str | None] JSON file tracking the ingested
+                                           files
+        :param workers:       [int | None] Worker processes. Defaults to
+                                           the number of CPUs
+        :param batch_size:    [int] Rows written per transaction
+        :param executor:      [Executor | None] Parses the files instead of
+                                                a new process pool
+        :param progress:      [Callable | None] Called after every
+                                                transaction with the summary
+                                                so far and the number of
+                                                files to ingest
+
+        :return: [dict] The number of files ingested and skipped, the rows
+                        inserted and the errors of the rejected files
+        """
+        if os.path.isdir(source):
+            source = os.path.join(source, "*.json")
+        paths = sorted(
+            os.path.abspath(path) for path in glob.glob(source)
+            if os.path.isfile(path)
+        )
+
+        done = DataGenerator._load_progress(progress_path)
+        pending = [path for path in paths if path not in done]
+        summary = {
+            "files": 0,
+            "skipped": len(paths) - len(pending),
+            "rows": 0,
+            "rejected": {}
+        }
+        if not pending:
+            return summary
+
+        own_executor = executor is None
+        if own_executor:
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+
+        batch: list[tuple] = []
+        batch_paths: list[str] = []
+
+        def write_batch() -> None:
+            summary["rows"] += db.insert_calls(batch)
+            summary["files"] += len(batch_paths)
+            done.update(batch_paths)
+            DataGenerator._save_progress(progress_path, done)
+            batch.clear()
+            batch_paths.clear()
+            if progress:
+                progress(summary, len(pending))
+
+        # Files parsed ahead of the writer, bounding the memory used
+        window = (workers or os.cpu_count() or 1) * 4
+
+        try:
+            for start in range(0, len(pending), window):
+                paths = pending[start:start + window]
+                # map keeps the file order while the workers run ahead
+                for path, (calls, errors) in zip(
+                        paths, executor.map(parse_travel_file, paths)):
+                    if errors:
+                        summary["rejected"][path] = errors
+                        continue
+                    batch.extend(calls)
+                    batch_paths.append(path)
+                    if len(batch) >= batch_size:
+                        write_batch()
+            if batch_paths:
+                write_batch()
+        finally:
+            if own_executor:
+                executor.shutdown(cancel_futures=True)
+
+        return summary
@@ -1,7 +1,17 @@
 from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Callable, ContextManager, Iterable, Iterator
 
 
 class DatabaseInterface(ABC):
+    """
+    Contract of the call stores: everything Elevator, DataGenerator and the
+    API need to record and read elevator calls. Rows are tuples with the
+    id, current floor, demand floor, destination floor and call_datetime in
+    the format YYYY-MM-DD HH:MM:SS.
+    """
+
     @abstractmethod
     def connect(self) -> None:
         """Connect to the database"""
@@ -11,3 +21,105 @@ class DatabaseInterface(ABC):
     def close_connection(self) -> None:
         """Close connection with the database"""
         pass
+
+    @abstractmethod
+    def create_table(self) -> None:
+        """Create the storage of the calls if it does not exist"""
+        pass
+
+    @abstractmethod
+    def recreate_table(self) -> None:
+        """Drop every call and start an empty storage"""
+        pass
+
+    @abstractmethod
+    def insert_call(
+            self,
+            current_floor: int,
+            demand_floor: int,
+            destination_floor: int,
+            call_datetime: datetime | str | None = None
+    ) -> int:
+        """Record a call and return its id"""
+        pass
+
+    @abstractmethod
+    def insert_calls(
+            self, calls: Iterable[tuple[int, int, int, datetime | str]]
+    ) -> int:
+        """Record many (current, demand, destination, call_datetime) calls
+        at once and return how many were recorded"""
+        pass
+
+    @abstractmethod
+    def add_insert_listener(self, listener: Callable[..., object]) -> None:
+        """Call listener(row_id, current, demand, destination,
+        call_datetime) after every recorded call"""
+        pass
+
+    @abstractmethod
+    def get_last_floor(self) -> int | None:
+        """Destination floor of the latest call, None without calls"""
+        pass
+
+    @abstractmethod
+    def get_all_rows(self) -> list[tuple]:
+        """All the rows, ordered by id"""
+        pass
+
+    @abstractmethod
+    def iter_rows(self, batch_size: int = 5000) -> Iterator[tuple]:
+        """Yield all the rows, ordered by id"""
+        pass
+
+    @abstractmethod
+    def get_call_history(self) -> list[tuple[int, int, int]]:
+        """Demand floor, destination floor and epoch seconds of every call,
+        ordered by id"""
+        pass
+
+    @abstractmethod
+    def get_rows_between(
+            self,
+            start: datetime | str,
+            end: datetime | str
+    ) -> list[tuple]:
+        """Rows called in [start, end), ordered by call_datetime"""
+        pass
+
+    @abstractmethod
+    def update_column(
+            self,
+            row_id: int,
+            column_name: str,
+            column_value: int | datetime | str
+    ) -> None:
+        """Change one column of a row"""
+        pass
+
+    @abstractmethod
+    def update_rows(self, updates: list[dict]) -> list[int]:
+        """Apply many row updates at once and return the missing ids"""
+        pass
+
+    @abstractmethod
+    def row_exists(self, row_id: int) -> bool:
+        """Whether a row with that id exists"""
+        pass
+
+    @abstractmethod
+    def delete_all_rows(self) -> None:
+        """Delete every call"""
+        pass
+
+    @abstractmethod
+    def get_data_version(self) -> int:
+        """Number that grows with every change made to the calls"""
+        pass
+
+    def read_snapshot(self) -> ContextManager["DatabaseInterface"]:
+        """
+        View of the calls for long reads, to be used in a with block. Stores
+        without snapshots read from themselves
+        """
+        return nullcontext(self)
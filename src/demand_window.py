@@ -0,0 +1,180 @@
+import threading
+from datetime import datetime, timedelta
+
+from .db_inteface import DatabaseInterface
+from .elevator_database import to_epoch
+from .elevator_models import DATETIME_FORMAT
+
+# Width of a time bucket, in seconds
+BUCKET_SECONDS = 60
+# Number of buckets kept, the longest window that can be queried
+WINDOW_BUCKETS = 60
+# Upper bound of the calls read on rebuild, any future-dated call included
+REBUILD_END = "9999-12-31 23:59:59"
+
+
+class DemandWindow:
+    def __init__(
+            self,
+            bucket_seconds: int = BUCKET_SECONDS,
+            buckets: int = WINDOW_BUCKETS
+    ) -> None:
+        """
+        The __init__ function creates empty sliding-window demand counters.
+        Calls are counted by demand floor in time buckets kept in a ring.
+        Each slot holds the running count of every floor at the end of its
+        bucket, so the calls of the last N buckets are the difference of
+        two slots, whatever N is.
+
+        :param bucket_seconds: [int] Width of a bucket, in seconds
+        :param buckets:        [int] Number of buckets of the longest window
+
+        :return: [None]
+        """
+        if bucket_seconds < 1 or buckets < 1:
+            raise ValueError("'bucket_seconds' and 'buckets' must be >= 1")
+
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        # One more slot than buckets, to hold the counts before the window
+        self._ring: list[dict[int, int]] = [{} for _ in range(buckets + 1)]
+        self._totals: dict[int, int] = {}
+        self._head: int | None = None
+        self._lock = threading.Lock()
+        self.observations = 0
+
+    @property
+    def max_minutes(self) -> float:
+        """Longest window that can be queried, in minutes"""
+        return self.buckets * self.bucket_seconds / 60
+
+    def _advance(self, bucket: int) -> None:
+        """
+        Moves the head of the ring to a newer bucket, the buckets skipped
+        over holding no calls.
+
+        :param bucket: [int] The new head bucket
+
+        :return: [None]
+        """
+        first = bucket - len(self._ring) + 1
+        if self._head is not None:
+            first = max(first, self._head + 1)
+        for skipped in range(first, bucket + 1):
+            self._ring[skipped % len(self._ring)] = dict(self._totals)
+        self._head = bucket
+
+    def _record(self, demand_floor: int, epoch: int) -> None:
+        """
+        Counts a call. Calls older than the ring are dropped, late calls
+        still in it update the buckets from theirs to the head.
+
+        :param demand_floor: [int] Floor the elevator was called from
+        :param epoch:        [int] Epoch seconds of the call
+
+        :return: [None]
+        """
+        bucket = epoch // self.bucket_seconds
+        if self._head is None or bucket > self._head:
+            self._advance(bucket)
+        elif bucket <= self._head - self.buckets:
+            return
+
+        self._totals[demand_floor] = self._totals.get(demand_floor, 0) + 1
+        for late in range(bucket, self._head + 1):
+            counts = self._ring[late % len(self._ring)]
+            counts[demand_floor] = counts.get(demand_floor, 0) + 1
+        self.observations += 1
+
+    def observe(
+            self,
+            row_id: int,
+            current_floor: int,
+            demand_floor: int,
+            destination_floor: int,
+            call_datetime: str
+    ) -> None:
+        """
+        The observe function counts a new call, in constant time when it is
+        the latest one.
+        Its signature matches ElevatorDatabase insert listeners.
+
+        :param row_id:            [int] Id of the inserted row
+        :param current_floor:     [int] Floor the elevator was on
+        :param demand_floor:      [int] Floor the elevator was called from
+        :param destination_floor: [int] Floor the elevator was sent to
+        :param call_datetime:     [str] Date of the call, in the format
+                                        YYYY-MM-DD HH:MM:SS
+
+        :return: [None]
+        """
+        epoch = to_epoch(call_datetime)
+        with self._lock:
+            self._record(demand_floor, epoch)
+
+    def rebuild(
+            self,
+            db: DatabaseInterface,
+            now: datetime | None = None
+    ) -> None:
+        """
+        The rebuild function recomputes the counters from the calls of the
+        longest window, read from the tail of the table.
+
+        :param db:  [DatabaseInterface] The database to read the calls from
+        :param now: [datetime | None] End of the window (default: now)
+
+        :return: [None]
+        """
+        now = now or datetime.now()
+        start = now - timedelta(seconds=self.buckets * self.bucket_seconds)
+        rows = db.get_rows_between(
+            start.strftime(DATETIME_FORMAT), REBUILD_END)
+
+        with self._lock:
+            self._ring = [{} for _ in range(self.buckets + 1)]
+            self._totals = {}
+            self._head = None
+            self.observations = 0
+            for row in rows:
+                self._record(row[2], to_epoch(row[4]))
+
+    def counts(
+            self,
+            minutes: float,
+            now: datetime | None = None
+    ) -> dict[int, int]:
+        """
+        The counts function returns the calls of each demand floor in the
+        last minutes, in constant time per floor. The window ends at now,
+        or at the latest call if it is in the future.
+
+        :param minutes: [float] Length of the window, rounded up to whole
+                                buckets and at most max_minutes
+        :param now:     [datetime | None] End of the window (default: now)
+
+        :return: [dict[int, int]] The calls by demand floor, sorted, floors
+                                  without calls left out
+        """
+        if not 0 < minutes <= self.max_minutes:
+            raise ValueError(
+                f"'minutes' must be greater than 0 and at most "
+                f"{self.max_minutes:g}")
+
+        window = -(-int(minutes * 60) // self.bucket_seconds)
+        end = to_epoch(now or datetime.now()) // self.bucket_seconds
+
+        with self._lock:
+            if self._head is None:
+                return {}
+            end = max(end, self._head)
+            start = end - window
+            if start >= self._head:
+                return {}
+
+            before = self._ring[start % len(self._ring)]
+            return {
+                floor: total - before.get(floor, 0)
+                for floor, total in sorted(self._totals.items())
+                if total > before.get(floor, 0)
+            }
@@ -1,23 +1,79 @@
-from .elevator_database import ElevatorDatabase
+import heapq
+import threading
+from datetime import datetime
+
+from .call_broadcaster import CallBroadcaster
+from .db_inteface import DatabaseInterface
+from .elevator_models import ElevatorColumns, DATETIME_FORMAT
+
+# Directions of travel of the car
+UP = 1
+DOWN = -1
+IDLE = 0
+
+# Estimated seconds to travel one floor and to serve a stop
+FLOOR_TRAVEL_SECONDS = 2.0
+STOP_SECONDS = 10.0
 
 
 class Elevator:
-    def __init__(self, db: ElevatorDatabase, floors: int = 6) -> None:
+    def __init__(
+            self,
+            db: DatabaseInterface,
+            floors: int = 6,
+            broadcaster: CallBroadcaster | None = None,
+            car_id: int = 1
+    ) -> None:
         """
         The __init__ function initializes the Elevator instance with a
         database connection and the number of floors.
+        The elevator also dispatches its car with the LOOK algorithm: it
+        keeps travelling in one direction while there are stops ahead, then
+        reverses. Stops ahead going up are kept in a min-heap and stops
+        ahead going down in a max-heap, so queueing a stop costs O(log n)
+        even with thousands of pending stops.
 
-        :param db:     [ElevatorDatabase] Connect to the database
-        :param floors: [int] Set the number of floors in the building
+        :param db:          [DatabaseInterface] Connect to the database.
+                                                Recording the dispatch
+                                                decisions of next_stop needs
+                                                an ElevatorDatabase
+        :param floors:      [int] Set the number of floors in the building
+        :param broadcaster: [CallBroadcaster | None] Receives every recorded
+                                                     call, for live streams
+        :param car_id:      [int] Identify the car in the dispatch records
 
         :return: [None]
         """
         self.db = db
         self.floors = floors
+        self.broadcaster = broadcaster
+        self.car_id = car_id
+
+        self.position: int | None = None
+        self.direction = IDLE
+        self._up_stops: list[int] = []
+        self._down_stops: list[int] = []
+        # Highest stop going up and lowest going down. Only the nearest
+        # stop is ever removed from a heap, so they stay valid until the
+        # heap is empty
+        self._highest_stop: int | None = None
+        self._lowest_stop: int | None = None
+        self._scheduled: set[int] = set()
+        # Demand floor -> destinations of the calls waiting there, a set so
+        # repeated calls keep it bounded by the number of floors
+        self._pickups: dict[int, set[int]] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def pending_stops(self) -> int:
+        """Number of stops queued"""
+        return len(self._scheduled)
 
     def call_elevator(self, demand_floor: int, destination_floor: int) -> None:
         """
         The call_elevator function is used to call an elevator from a floor.
+        The call is recorded and the demand floor is queued as a stop; the
+        destination floor is queued once the car picks the call up.
 
         :param demand_floor:      [int] Determine where the elevator is called
                                         from
@@ -32,6 +88,185 @@ class Elevator:
         if current_floor is None:
             current_floor = demand_floor
 
+        call_datetime = datetime.now().strftime(DATETIME_FORMAT)
+
         # Insert a call into the database with the
         # current, demand, and destination floors
-        self.db.insert_call(current_floor, demand_floor, destination_floor)
+        row_id = self.db.insert_call(
+            current_floor, demand_floor, destination_floor, call_datetime)
+
+        # Push the recorded call to the live subscribers
+        if self.broadcaster:
+            self.broadcaster.publish({
+                ElevatorColumns.ID: row_id,
+                ElevatorColumns.CURRENT_FLOOR: current_floor,
+                ElevatorColumns.DEMAND_FLOOR: demand_floor,
+                ElevatorColumns.DESTINATION_FLOOR: destination_floor,
+                ElevatorColumns.CALL_DATETIME: call_datetime
+            })
+
+        # Queue the pickup for the dispatcher
+        with self._lock:
+            if self.position is None:
+                self.position = current_floor
+            self.queue_call(demand_floor, destination_floor)
+
+    def queue_call(self, demand_floor: int, destination_floor: int) -> None:
+        """
+        The queue_call function queues a call on the dispatcher without
+        recording it: the demand floor is queued as a stop and the
+        destination floor is queued once the car picks the call up.
+
+        :param demand_floor:      [int] Floor the car is called from
+        :param destination_floor: [int] Floor the passenger goes to
+
+        :return: [None]
+        """
+        with self._lock:
+            self._pickups.setdefault(demand_floor, set()).add(
+                destination_floor)
+            self.request_stop(demand_floor)
+
+    def request_stop(self, floor: int) -> None:
+        """
+        The request_stop function queues a stop, in O(log n).
+        A floor that is already queued is not queued again.
+
+        :param floor: [int] Floor where the car must stop
+
+        :return: [None]
+        """
+        with self._lock:
+            if floor in self._scheduled:
+                return
+            if self.position is None:
+                self.position = floor
+
+            self._scheduled.add(floor)
+            if floor > self.position or (
+                    floor == self.position and self.direction != DOWN):
+                heapq.heappush(self._up_stops, floor)
+                if self._highest_stop is None or floor > self._highest_stop:
+                    self._highest_stop = floor
+            else:
+                heapq.heappush(self._down_stops, -floor)
+                if self._lowest_stop is None or floor < self._lowest_stop:
+                    self._lowest_stop = floor
+
+    def estimate_arrival(self, floor: int) -> float:
+        """
+        The estimate_arrival function estimates the seconds the car needs
+        to reach a floor, following its LOOK route.
+        It runs in constant time from the route summary kept up to date as
+        stops are queued and served (position, direction, farthest stops
+        and number of stops), counting every queued stop of the sweeps
+        travelled as an upper bound.
+
+        :param floor: [int] Floor to reach
+
+        :return: [float] The estimated seconds
+        """
+        with self._lock:
+            position = floor if self.position is None else self.position
+            up_stops = len(self._up_stops)
+            down_stops = len(self._down_stops)
+            highest = position if self._highest_stop is None else max(
+                self._highest_stop, position)
+            lowest = position if self._lowest_stop is None else min(
+                self._lowest_stop, position)
+            direction = self.direction
+
+            if direction == IDLE:
+                distance = abs(floor - position)
+                stops = 0
+            elif direction == UP and floor >= position:
+                distance = floor - position
+                stops = up_stops
+            elif direction == DOWN and floor <= position:
+                distance = position - floor
+                stops = down_stops
+            elif direction == UP:
+                # Finish the sweep up, then come down
+                distance = (highest - position) + (highest - floor)
+                stops = up_stops + down_stops
+            else:
+                # Finish the sweep down, then go up
+                distance = (position - lowest) + (floor - lowest)
+                stops = up_stops + down_stops
+
+        return distance * FLOOR_TRAVEL_SECONDS + stops * STOP_SECONDS
+
+    def _pop_stop(self) -> int | None:
+        """
+        Chooses the next stop with LOOK ordering and removes it from the
+        queue.
+
+        :return: [int | None] The floor, or None if nothing is queued
+        """
+        if self.direction == IDLE and self._up_stops and self._down_stops:
+            # Idle car: start towards the closest stop
+            up_distance = self._up_stops[0] - self.position
+            down_distance = self.position + self._down_stops[0]
+            self.direction = UP if up_distance <= down_distance else DOWN
+
+        if self.direction != DOWN and self._up_stops:
+            return self._pop_up_stop()
+        if self._down_stops:
+            return self._pop_down_stop()
+        if self._up_stops:
+            return self._pop_up_stop()
+
+        self.direction = IDLE
+        return None
+
+    def _pop_up_stop(self) -> int:
+        """
+        Removes the nearest stop going up.
+
+        :return: [int] The floor
+        """
+        self.direction = UP
+        floor = heapq.heappop(self._up_stops)
+        if not self._up_stops:
+            self._highest_stop = None
+        return floor
+
+    def _pop_down_stop(self) -> int:
+        """
+        Removes the nearest stop going down.
+
+        :return: [int] The floor
+        """
+        self.direction = DOWN
+        floor = -heapq.heappop(self._down_stops)
+        if not self._down_stops:
+            self._lowest_stop = None
+        return floor
+
+    def next_stop(self) -> int | None:
+        """
+        The next_stop function moves the car to its next stop and records
+        the decision in the database.
+        Calls waiting on that floor are picked up and their destinations
+        are queued.
+
+        :return: [int | None] The floor of the stop, or None if the car has
+                              nothing to do
+        """
+        with self._lock:
+            floor = self._pop_stop()
+            if floor is None:
+                return None
+
+            self._scheduled.discard(floor)
+            self.position = floor
+            for destination_floor in sorted(self._pickups.pop(floor, ())):
+                if destination_floor != floor:
+                    self.request_stop(destination_floor)
+
+            direction = self.direction
+            pending_stops = self.pending_stops
+
+        self.db.insert_dispatch(
+            self.car_id, floor, direction, pending_stops)
+        return floor
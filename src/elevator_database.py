@@ -1,25 +1,128 @@
+import os
 import sqlite3
-from datetime import datetime
+import calendar
+import threading
+from contextlib import nullcontext
+from datetime import datetime, timezone
 
-from typing import Any
+from typing import Any, Callable, ContextManager, Iterable, Iterator
 from .db_inteface import DatabaseInterface
 from .db_context import DatabaseContext
-from .elevator_models import ElevatorColumns
+from .elevator_models import ElevatorColumns, DATETIME_FORMAT
+
+
+# Number of pages copied per step while taking an online snapshot
+SNAPSHOT_PAGES: int = 256
+# Rows sampled per index by ANALYZE, keeping it fast on large tables
+ANALYSIS_LIMIT: int = 1000
+# auto_vacuum mode that lets free pages be released a few at a time
+AUTO_VACUUM_INCREMENTAL = 2
+# Number of rows fetched per query while iterating over the table
+ITER_BATCH_SIZE: int = 5000
+# Proleptic Gregorian ordinal of 1970-01-01
+EPOCH_ORDINAL: int = datetime(1970, 1, 1).toordinal()
+
+
+def to_epoch(value: datetime | str | int) -> int:
+    """
+    Converts a call_datetime value into integer epoch seconds.
+    Naive datetimes are stored as-is (no timezone shift), so the conversion
+    round-trips exactly with from_epoch.
+
+    :param value: [datetime | str | int] A datetime, a string in the format
+                                         YYYY-MM-DD HH:MM:SS or epoch seconds
+
+    :return: [int] The epoch seconds
+    """
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        if (len(value) == 19 and value[4] == value[7] == "-"
+                and value[10] == " " and value[13] == value[16] == ":"):
+            # Fast path for the API format, used by bulk imports. The
+            # datetime constructor still rejects out of range fields
+            value = datetime(
+                int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                int(value[11:13]), int(value[14:16]), int(value[17:19]))
+            return (
+                (value.toordinal() - EPOCH_ORDINAL) * 86400
+                + value.hour * 3600 + value.minute * 60 + value.second)
+        value = datetime.strptime(value, DATETIME_FORMAT)
+    return calendar.timegm(value.timetuple())
+
+
+def from_epoch(value: int) -> str:
+    """
+    Converts integer epoch seconds back into the API string format.
+
+    :param value: [int] The epoch seconds
+
+    :return: [str] The date in the format YYYY-MM-DD HH:MM:SS
+    """
+    return datetime.fromtimestamp(value, timezone.utc).strftime(
+        DATETIME_FORMAT)
 
 
 class ElevatorDatabase(DatabaseInterface):
-    def __init__(self, database_path: str = "elevator.db") -> None:
+    def __init__(
+            self,
+            database_path: str = "elevator.db",
+            compact: bool = False
+    ) -> None:
         """
         The __init__ function is called when the class is instantiated.
         It sets up the database connection and creates a cursor object to
         execute SQL commands.
 
         :param database_path: [str] Set the path to the database
+        :param compact:       [bool] Use the compact STRICT schema, storing
+                                     call_datetime as integer epoch seconds
         :return: [None]
         """
         self.database_path = database_path
+        self.compact = compact
+        # Each thread opens its own connection, so concurrent requests
+        # never share (or close) each other's connection
+        self._local = threading.local()
         self.connection = None
         self.cursor = None
+        self._insert_listeners: list[Callable[..., object]] = []
+
+    @property
+    def connection(self) -> sqlite3.Connection | None:
+        """Connection of the calling thread"""
+        return getattr(self._local, "connection", None)
+
+    @connection.setter
+    def connection(self, connection: sqlite3.Connection | None) -> None:
+        self._local.connection = connection
+
+    @property
+    def cursor(self) -> sqlite3.Cursor | None:
+        """Cursor of the calling thread"""
+        return getattr(self._local, "cursor", None)
+
+    @cursor.setter
+    def cursor(self, cursor: sqlite3.Cursor | None) -> None:
+        self._local.cursor = cursor
+
+    @classmethod
+    def open(cls, database_path: str) -> "ElevatorDatabase":
+        """
+        The open function opens a database file for offline tools, with the
+        tables ready. New databases use the compact schema, like the API
+        does; the schema of existing ones is detected.
+
+        :param database_path: [str] Path of the database
+
+        :return: [ElevatorDatabase] The database
+        """
+        database_exists = os.path.exists(database_path)
+        db = cls(database_path, compact=not database_exists)
+        if database_exists:
+            db.detect_schema()
+        db.create_table()
+        return db
 
     def connect(self) -> None:
         """Connect to the database"""
@@ -33,19 +136,30 @@ class ElevatorDatabase(DatabaseInterface):
             self.connection = None
             self.cursor = None
 
+    def read_snapshot(self) -> "ElevatorSnapshot":
+        """
+        The read_snapshot function opens a read-only view of the database
+        as it is now, to be used in a with block. Every query made through
+        it sees the same committed data, while writers keep committing.
+
+        :return: [ElevatorSnapshot] The snapshot
+        """
+        return ElevatorSnapshot(self.database_path, self.compact)
+
     def _execute_query(
-            self, query: str, parameters: tuple = ()) -> None:
+            self, query: str, parameters: tuple = ()) -> int | None:
         """
         Executes a SQL query on the database.
 
         :param query:      [str] The SQL query to be executed
         :param parameters: [tuple | None] Optional parameters to be used in
                                           the query
-        :return: [None]
+        :return: [int | None] The id of the last inserted row, if any
         """
         with DatabaseContext(self):
             self.cursor.execute(query, parameters)
             self.connection.commit()
+            return self.cursor.lastrowid
 
     def _fetch_one(
             self, query: str, parameters: tuple = ()) -> Any:
@@ -79,37 +193,221 @@ class ElevatorDatabase(DatabaseInterface):
             self.cursor.execute(query, parameters)
             return self.cursor.fetchall()
 
-    def create_table(self) -> None:
+    def _datetime_column(self) -> str:
         """
-        The create_table function creates a table in the database if it does
-        not already exist.
+        Returns the SQL expression that selects call_datetime in the API
+        string format, whatever the storage schema is.
 
-        :return: [None]
+        :return: [str] The SQL expression
         """
-        query = (
+        if self.compact:
+            return (
+                f"strftime('%Y-%m-%d %H:%M:%S', "
+                f"{ElevatorColumns.CALL_DATETIME}, 'unixepoch')"
+            )
+        return ElevatorColumns.CALL_DATETIME
+
+    def _epoch_column(self) -> str:
+        """
+        Returns the SQL expression that selects call_datetime as epoch
+        seconds, whatever the storage schema is.
+
+        :return: [str] The SQL expression
+        """
+        if self.compact:
+            return ElevatorColumns.CALL_DATETIME
+        return (
+            f"CAST(strftime('%s', {ElevatorColumns.CALL_DATETIME}) "
+            f"AS INTEGER)"
+        )
+
+    def _datetime_value(self, value: datetime | str) -> datetime | str | int:
+        """
+        Converts a call_datetime value into its storage representation.
+
+        :param value: [datetime | str] The date of the call
+
+        :return: [datetime | str | int] Epoch seconds on the compact schema,
+                                        the value unchanged otherwise
+        """
+        if self.compact:
+            return to_epoch(value)
+        return value
+
+    @staticmethod
+    def _compact_table_query(table_name: str) -> str:
+        """
+        Builds the CREATE TABLE statement of the compact schema.
+
+        :param table_name: [str] Name of the table to be created
+
+        :return: [str] The SQL statement
+        """
+        return (
             f"""
-                CREATE TABLE IF NOT EXISTS elevator (
+                CREATE TABLE IF NOT EXISTS {table_name} (
                     {ElevatorColumns.ID} INTEGER PRIMARY KEY AUTOINCREMENT,
                     {ElevatorColumns.CURRENT_FLOOR} INTEGER,
                     {ElevatorColumns.DEMAND_FLOOR} INTEGER,
                     {ElevatorColumns.DESTINATION_FLOOR} INTEGER,
-                    {ElevatorColumns.CALL_DATETIME} DATETIME DEFAULT
-                        CURRENT_TIMESTAMP
-                )
+                    {ElevatorColumns.CALL_DATETIME} INTEGER DEFAULT
+                        (CAST(strftime('%s', 'now') AS INTEGER))
+                ) STRICT
             """
-        )  # noqa: W291
+        )
+
+    def create_table(self) -> None:
+        """
+        The create_table function creates a table in the database if it does
+        not already exist, along with the change log that records every
+        insert, update and delete on it.
+
+        :return: [None]
+        """
+        # Only takes effect on new databases, before the first table
+        self._execute_query("PRAGMA auto_vacuum = INCREMENTAL")
+        # Persistent: readers see a snapshot and never block the writers
+        self._execute_query("PRAGMA journal_mode = WAL")
+
+        if self.compact:
+            self._execute_query(self._compact_table_query("elevator"))
+            self._execute_query(
+                f"""
+                CREATE INDEX IF NOT EXISTS elevator_call_datetime_idx
+                ON elevator ({ElevatorColumns.CALL_DATETIME})
+                """
+            )
+        else:
+            query = (
+                f"""
+                    CREATE TABLE IF NOT EXISTS elevator (
+                        {ElevatorColumns.ID}
+                            INTEGER PRIMARY KEY AUTOINCREMENT,
+                        {ElevatorColumns.CURRENT_FLOOR} INTEGER,
+                        {ElevatorColumns.DEMAND_FLOOR} INTEGER,
+                        {ElevatorColumns.DESTINATION_FLOOR} INTEGER,
+                        {ElevatorColumns.CALL_DATETIME} DATETIME DEFAULT
+                            CURRENT_TIMESTAMP
+                    )
+                """
+            )  # noqa: W291
+            self._execute_query(query)
+
+        self._create_change_log()
+        self._create_dispatch_log()
+        self._create_assignment_log()
+
+    def _create_change_log(self) -> None:
+        """
+        The _create_change_log function creates the elevator_changes table
+        and the triggers that fill it.
+        Each change gets an increasing sequence number, so consumers can
+        ask for the changes since the last one they have seen.
+        call_datetime is copied in its storage format (text or epoch).
+
+        :return: [None]
+        """
+        columns = (
+            f"{ElevatorColumns.CURRENT_FLOOR}, "
+            f"{ElevatorColumns.DEMAND_FLOOR}, "
+            f"{ElevatorColumns.DESTINATION_FLOOR}, "
+            f"{ElevatorColumns.CALL_DATETIME}"
+        )
+        new_values = ", ".join(
+            f"NEW.{column}" for column in columns.split(", "))
+
+        script = (
+            f"""
+            CREATE TABLE IF NOT EXISTS elevator_changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                operation TEXT NOT NULL,
+                row_id INTEGER,
+                {ElevatorColumns.CURRENT_FLOOR} INTEGER,
+                {ElevatorColumns.DEMAND_FLOOR} INTEGER,
+                {ElevatorColumns.DESTINATION_FLOOR} INTEGER,
+                {ElevatorColumns.CALL_DATETIME}
+            );
+            CREATE TRIGGER IF NOT EXISTS elevator_changes_insert
+            AFTER INSERT ON elevator
+            BEGIN
+                INSERT INTO elevator_changes (operation, row_id, {columns})
+                VALUES ('insert', NEW.{ElevatorColumns.ID}, {new_values});
+            END;
+            CREATE TRIGGER IF NOT EXISTS elevator_changes_update
+            AFTER UPDATE ON elevator
+            BEGIN
+                INSERT INTO elevator_changes (operation, row_id, {columns})
+                VALUES ('update', NEW.{ElevatorColumns.ID}, {new_values});
+            END;
+            CREATE TRIGGER IF NOT EXISTS elevator_changes_delete
+            AFTER DELETE ON elevator
+            BEGIN
+                INSERT INTO elevator_changes (operation, row_id)
+                VALUES ('delete', OLD.{ElevatorColumns.ID});
+            END;
+            """
+        )
+        with DatabaseContext(self):
+            self.connection.executescript(script)
+
+    def _create_dispatch_log(self) -> None:
+        """
+        The _create_dispatch_log function creates the elevator_dispatch
+        table, where the stops chosen by the dispatchers are recorded.
+
+        :return: [None]
+        """
+        query = (
+            """
+            CREATE TABLE IF NOT EXISTS elevator_dispatch (
+                id INTEGER PRIMARY KEY,
+                car_id INTEGER NOT NULL,
+                stop_floor INTEGER NOT NULL,
+                direction INTEGER NOT NULL,
+                pending_stops INTEGER NOT NULL,
+                decided_at INTEGER NOT NULL
+            )
+            """
+        )
+        self._execute_query(query)
+
+    def _create_assignment_log(self) -> None:
+        """
+        The _create_assignment_log function creates the elevator_assignments
+        table, where the car chosen for each hall call of a group of cars is
+        recorded.
+
+        :return: [None]
+        """
+        query = (
+            """
+            CREATE TABLE IF NOT EXISTS elevator_assignments (
+                id INTEGER PRIMARY KEY,
+                call_id INTEGER,
+                car_id INTEGER NOT NULL,
+                demand_floor INTEGER NOT NULL,
+                destination_floor INTEGER NOT NULL,
+                eta_seconds REAL NOT NULL,
+                assigned_at INTEGER NOT NULL
+            )
+            """
+        )
         self._execute_query(query)
 
     def recreate_table(self) -> None:
         """
         The recreate_table function drops the elevator table if it exists,
         and then creates a new one.
+        The change log is kept, and a 'truncate' change tells its consumers
+        to discard their copy of the table.
 
         :return: [None]
         """
         query = "DROP TABLE IF EXISTS elevator"
         self._execute_query(query)
         self.create_table()
+        self._execute_query(
+            "INSERT INTO elevator_changes (operation) VALUES ('truncate')")
 
     def insert_call(
         self,
@@ -117,7 +415,7 @@ class ElevatorDatabase(DatabaseInterface):
         demand_floor: int,
         destination_floor: int,
         call_datetime: datetime = None
-    ) -> None:
+    ) -> int:
         """
         The insert_call function inserts a new row into the elevator table.
         It then uses an SQL query to insert these values into the database.
@@ -130,10 +428,10 @@ class ElevatorDatabase(DatabaseInterface):
                                                     current date and time will
                                                     be used.
 
-        :return: [None]
+        :return: [int] The id of the inserted row
         """
         if call_datetime is None:
-            call_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            call_datetime = datetime.now().strftime(DATETIME_FORMAT)
 
         query = (
             f"""
@@ -146,8 +444,128 @@ class ElevatorDatabase(DatabaseInterface):
             """
         )
         parameters = (
-            current_floor, demand_floor, destination_floor, call_datetime)
-        self._execute_query(query, parameters)
+            current_floor,
+            demand_floor,
+            destination_floor,
+            self._datetime_value(call_datetime)
+        )
+        row_id = self._execute_query(query, parameters)
+
+        self._notify_insert(
+            row_id, current_floor, demand_floor, destination_floor,
+            call_datetime)
+
+        return row_id
+
+    def insert_calls(
+            self, calls: Iterable[tuple[int, int, int, datetime | str]]
+    ) -> int:
+        """
+        The insert_calls function inserts many calls in a single
+        transaction, with one executemany.
+        The write lock is taken up front, so the ids of the new rows follow
+        the largest id ever used in the table and the insert listeners are
+        notified with them after the commit.
+
+        :param calls: [Iterable[tuple]] The current floor, demand floor,
+                                        destination floor and call_datetime
+                                        of each call
+
+        :return: [int] The number of inserted rows
+        """
+        calls = list(calls)
+        if not calls:
+            return 0
+
+        query = (
+            f"""
+                INSERT INTO elevator (
+                    {ElevatorColumns.CURRENT_FLOOR},
+                    {ElevatorColumns.DEMAND_FLOOR},
+                    {ElevatorColumns.DESTINATION_FLOOR},
+                    {ElevatorColumns.CALL_DATETIME})
+                VALUES (?, ?, ?, ?)
+            """
+        )
+
+        with DatabaseContext(self):
+            try:
+                self.cursor.execute("BEGIN IMMEDIATE")
+                # AUTOINCREMENT ids follow the largest id ever used, kept
+                # in sqlite_sequence, not the largest id left in the table
+                self.cursor.execute(
+                    f"""
+                    SELECT MAX(
+                        COALESCE((SELECT seq FROM sqlite_sequence
+                                  WHERE name = 'elevator'), 0),
+                        COALESCE(MAX({ElevatorColumns.ID}), 0))
+                    FROM elevator
+                    """
+                )
+                last_id = self.cursor.fetchone()[0]
+                self.cursor.executemany(query, (
+                    (current, demand, destination,
+                     self._datetime_value(call_datetime))
+                    for current, demand, destination, call_datetime in calls
+                ))
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                raise
+
+        if self._insert_listeners:
+            for row_id, call in enumerate(calls, start=last_id + 1):
+                self._notify_insert(row_id, *call)
+
+        return len(calls)
+
+    def _notify_insert(
+            self,
+            row_id: int,
+            current_floor: int,
+            demand_floor: int,
+            destination_floor: int,
+            call_datetime: datetime | str
+    ) -> None:
+        """
+        Notifies the insert listeners of a new row.
+
+        :param row_id:            [int] Id of the inserted row
+        :param current_floor:     [int] Floor the elevator was on
+        :param demand_floor:      [int] Floor the elevator was called from
+        :param destination_floor: [int] Floor the elevator was sent to
+        :param call_datetime:     [datetime | str] Date of the call
+
+        :return: [None]
+        """
+        if isinstance(call_datetime, datetime):
+            call_datetime = call_datetime.strftime(DATETIME_FORMAT)
+        for listener in self._insert_listeners:
+            try:
+                listener(
+                    row_id,
+                    current_floor,
+                    demand_floor,
+                    destination_floor,
+                    call_datetime
+                )
+            except Exception as e:
+                print(f"Error while notifying an insert listener: {e}")
+
+    def add_insert_listener(self, listener: Callable[..., object]) -> None:
+        """
+        The add_insert_listener function registers a callback notified after
+        every recorded call, so in-memory structures can be kept up to date
+        without querying the table.
+        It is called with the row id, the current, demand and destination
+        floors and the call_datetime in the format YYYY-MM-DD HH:MM:SS.
+        Errors raised by listeners are reported and never fail the insert.
+
+        :param listener: [Callable] The callback
+
+        :return: [None]
+        """
+        self._insert_listeners.append(listener)
 
     def get_last_floor(self) -> int | None:
         """
@@ -185,7 +603,7 @@ class ElevatorDatabase(DatabaseInterface):
                     {ElevatorColumns.CURRENT_FLOOR},
                     {ElevatorColumns.DEMAND_FLOOR},
                     {ElevatorColumns.DESTINATION_FLOOR},
-                    {ElevatorColumns.CALL_DATETIME}
+                    {self._datetime_column()}
             FROM elevator
         """
         )
@@ -193,6 +611,266 @@ class ElevatorDatabase(DatabaseInterface):
         result = self._fetch_all(query)
         return result
 
+    def iter_rows(
+            self, batch_size: int = ITER_BATCH_SIZE) -> Iterator[tuple]:
+        """
+        The iter_rows function yields all rows of the elevator table ordered
+        by id, in the same format as get_all_rows.
+        Rows are fetched in batches using the id index, each batch in its
+        own short query, so no connection or lock is held while the caller
+        consumes the rows.
+
+        :param batch_size: [int] Number of rows fetched per query
+
+        :return: [Iterator[tuple]] The rows of the table
+        """
+        query = (
+            f"""
+            SELECT {ElevatorColumns.ID},
+                    {ElevatorColumns.CURRENT_FLOOR},
+                    {ElevatorColumns.DEMAND_FLOOR},
+                    {ElevatorColumns.DESTINATION_FLOOR},
+                    {self._datetime_column()}
+            FROM elevator
+            WHERE {ElevatorColumns.ID} > ?
+            ORDER BY {ElevatorColumns.ID}
+            LIMIT ?
+        """
+        )
+
+        last_id = 0
+        while True:
+            rows = self._fetch_all(query, (last_id, batch_size))
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1][0]
+
+    def get_call_history(self) -> list[tuple[int, int, int]]:
+        """
+        The get_call_history function returns the demand floor, destination
+        floor and call_datetime (as epoch seconds) of every call, ordered
+        by id.
+        It only reads the columns needed to rebuild demand models, which
+        are then processed in bulk.
+
+        :return: [list[tuple[int, int, int]]] A list of tuples with the
+                                              demand floor, the destination
+                                              floor and the epoch seconds
+        """
+        query = (
+            f"""
+            SELECT {ElevatorColumns.DEMAND_FLOOR},
+                    {ElevatorColumns.DESTINATION_FLOOR},
+                    {self._epoch_column()}
+            FROM elevator
+            ORDER BY {ElevatorColumns.ID}
+        """
+        )
+
+        return self._fetch_all(query)
+
+    def get_od_counts(self) -> list[tuple[int, int, int, int, int]]:
+        """
+        The get_od_counts function counts the calls of every (weekday, hour,
+        demand floor, destination floor) combination. The grouping runs in
+        SQLite, so only one row per combination is returned whatever the
+        number of calls.
+
+        :return: [list[tuple[int, int, int, int, int]]] The weekday (0 is
+                                                        Monday), hour,
+                                                        demand floor,
+                                                        destination floor
+                                                        and number of calls
+        """
+        query = (
+            f"""
+            SELECT ({self._epoch_column()} / 86400 + 3) % 7 AS weekday,
+                    ({self._epoch_column()} / 3600) % 24 AS hour,
+                    {ElevatorColumns.DEMAND_FLOOR},
+                    {ElevatorColumns.DESTINATION_FLOOR},
+                    COUNT(*)
+            FROM elevator
+            GROUP BY weekday, hour,
+                    {ElevatorColumns.DEMAND_FLOOR},
+                    {ElevatorColumns.DESTINATION_FLOOR}
+        """
+        )
+
+        return self._fetch_all(query)
+
+    def get_rows_between(
+            self,
+            start: datetime | str,
+            end: datetime | str
+    ) -> list[tuple]:
+        """
+        The get_rows_between function returns the rows whose call_datetime
+        falls in the [start, end) interval, ordered by call_datetime.
+        On the compact schema the comparison is an integer range scan over
+        the call_datetime index.
+
+        :param start: [datetime | str] Start of the interval (inclusive)
+        :param end:   [datetime | str] End of the interval (exclusive)
+
+        :return: [list[tuple]] A list of tuples with the rows
+        """
+        parameters = (self._stored_datetime(start), self._stored_datetime(end))
+
+        query = (
+            f"""
+            SELECT {ElevatorColumns.ID},
+                    {ElevatorColumns.CURRENT_FLOOR},
+                    {ElevatorColumns.DEMAND_FLOOR},
+                    {ElevatorColumns.DESTINATION_FLOOR},
+                    {self._datetime_column()}
+            FROM elevator
+            WHERE {ElevatorColumns.CALL_DATETIME} >= ?
+                AND {ElevatorColumns.CALL_DATETIME} < ?
+            ORDER BY {ElevatorColumns.CALL_DATETIME}, {ElevatorColumns.ID}
+        """
+        )
+
+        return self._fetch_all(query, parameters)
+
+    def iter_rows_between(
+            self,
+            start: datetime | str | int,
+            end: datetime | str | int,
+            batch_size: int = ITER_BATCH_SIZE
+    ) -> Iterator[tuple]:
+        """
+        The iter_rows_between function yields the rows whose call_datetime
+        falls in the [start, end) interval, in the same order as
+        get_rows_between.
+        Like iter_rows, rows are fetched in batches, each resuming after the
+        last (call_datetime, id) seen, so memory stays constant however
+        large the interval.
+
+        :param start:      [datetime | str | int] Start of the interval
+                                                  (inclusive)
+        :param end:        [datetime | str | int] End of the interval
+                                                  (exclusive)
+        :param batch_size: [int] Number of rows fetched per query
+
+        :return: [Iterator[tuple]] The rows in the interval
+        """
+        query = (
+            f"""
+            SELECT {ElevatorColumns.ID},
+                    {ElevatorColumns.CURRENT_FLOOR},
+                    {ElevatorColumns.DEMAND_FLOOR},
+                    {ElevatorColumns.DESTINATION_FLOOR},
+                    {self._datetime_column()}
+            FROM elevator
+            WHERE {ElevatorColumns.CALL_DATETIME} >= ?
+                AND {ElevatorColumns.CALL_DATETIME} < ?
+                AND ({ElevatorColumns.CALL_DATETIME} > ?
+                     OR {ElevatorColumns.ID} > ?)
+            ORDER BY {ElevatorColumns.CALL_DATETIME}, {ElevatorColumns.ID}
+            LIMIT ?
+        """
+        )
+
+        last_datetime = self._stored_datetime(start)
+        end = self._stored_datetime(end)
+        last_id = 0
+        while True:
+            rows = self._fetch_all(query, (
+                last_datetime, end, last_datetime, last_id, batch_size))
+            if not rows:
+                return
+            yield from rows
+            last_datetime = self._stored_datetime(rows[-1][4])
+            last_id = rows[-1][0]
+
+    def _stored_datetime(self, value: datetime | str | int) -> int | str:
+        """
+        Converts a call_datetime value into the form stored by the schema.
+
+        :param value: [datetime | str | int] A datetime, a string in the
+                                             format YYYY-MM-DD HH:MM:SS or
+                                             epoch seconds
+
+        :return: [int | str] Epoch seconds on the compact schema, the
+                             string otherwise
+        """
+        if self.compact:
+            return to_epoch(value)
+        return from_epoch(to_epoch(value))
+
+    def get_travel_costs_by_hour(
+            self,
+            start: datetime | str | None = None,
+            end: datetime | str | None = None,
+            resting_floor: int | None = None
+    ) -> list[tuple]:
+        """
+        The get_travel_costs_by_hour function aggregates, per hour of the
+        day, the floors travelled by the car without passengers.
+        Empty travel is the distance from the floor the car was on to the
+        demand floor of the call. Repositioning is the distance the idle
+        car moved between the destination of a call and the floor it was on
+        at the next call, found with the LAG window function. The whole
+        computation runs in SQLite, without loading the rows.
+
+        :param start:         [datetime | str | None] Start of the interval
+                                                      (inclusive)
+        :param end:           [datetime | str | None] End of the interval
+                                                      (exclusive)
+        :param resting_floor: [int | None] Floor the idle car would always
+                                           return to, for the counterfactual
+                                           costs
+
+        :return: [list[tuple]] Per hour, ordered: the hour, the calls, the
+                               calls with empty travel, the empty travel
+                               floors and its maximum, the repositionings
+                               and their floors, and the counterfactual
+                               empty travel and repositioning floors (None
+                               without a resting_floor)
+        """
+        conditions = []
+        parameters = []
+        for value, operator in ((start, ">="), (end, "<")):
+            if value is None:
+                continue
+            conditions.append(f"{ElevatorColumns.CALL_DATETIME} {operator} ?")
+            parameters.append(
+                to_epoch(value) if self.compact
+                else from_epoch(to_epoch(value)))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        parameters += [resting_floor, resting_floor]
+
+        query = (
+            f"""
+            WITH calls AS (
+                SELECT ({self._epoch_column()} / 3600) % 24 AS hour,
+                        {ElevatorColumns.CURRENT_FLOOR} AS current_floor,
+                        {ElevatorColumns.DEMAND_FLOOR} AS demand_floor,
+                        LAG({ElevatorColumns.DESTINATION_FLOOR}) OVER (
+                            ORDER BY {ElevatorColumns.ID}
+                        ) AS previous_destination
+                FROM elevator
+                {where}
+            )
+            SELECT hour,
+                    COUNT(*),
+                    SUM(current_floor != demand_floor),
+                    SUM(ABS(current_floor - demand_floor)),
+                    MAX(ABS(current_floor - demand_floor)),
+                    COALESCE(SUM(current_floor != previous_destination), 0),
+                    COALESCE(
+                        SUM(ABS(current_floor - previous_destination)), 0),
+                    SUM(ABS(? - demand_floor)),
+                    SUM(ABS(? - previous_destination))
+            FROM calls
+            GROUP BY hour
+            ORDER BY hour
+        """
+        )
+
+        return self._fetch_all(query, tuple(parameters))
+
     def update_column(
             self,
             row_id: int,
@@ -217,10 +895,304 @@ class ElevatorDatabase(DatabaseInterface):
             WHERE id = ?
             """
         )
+        if column_name == ElevatorColumns.CALL_DATETIME:
+            column_value = self._datetime_value(column_value)
         parameters = (column_value, row_id)
 
         self._execute_query(query, parameters)
 
+    def update_rows(self, updates: list[dict]) -> list[int]:
+        """
+        The update_rows function applies many row updates in a single
+        transaction, with one UPDATE statement per row covering all of its
+        changed columns.
+
+        :param updates: [list[dict]] Each dict holds the 'id' of the row and
+                                     the new values keyed by column name
+
+        :return: [list[int]] The ids that did not match any row
+        """
+        allowed_columns = {
+            ElevatorColumns.CURRENT_FLOOR,
+            ElevatorColumns.DEMAND_FLOOR,
+            ElevatorColumns.DESTINATION_FLOOR,
+            ElevatorColumns.CALL_DATETIME
+        }
+        missing_ids = []
+
+        with DatabaseContext(self):
+            try:
+                for update in updates:
+                    row_id = update[ElevatorColumns.ID]
+                    columns = [
+                        column for column in update
+                        if column != ElevatorColumns.ID
+                    ]
+                    invalid_columns = set(columns) - allowed_columns
+                    if invalid_columns:
+                        raise ValueError(
+                            f"Invalid columns: {sorted(invalid_columns)}")
+                    if not columns:
+                        continue
+
+                    assignments = ", ".join(
+                        f"{column} = ?" for column in columns)
+                    parameters = tuple(
+                        self._datetime_value(update[column])
+                        if column == ElevatorColumns.CALL_DATETIME
+                        else update[column]
+                        for column in columns
+                    ) + (row_id,)
+
+                    self.cursor.execute(
+                        f"UPDATE elevator SET {assignments} WHERE id = ?",
+                        parameters
+                    )
+                    if self.cursor.rowcount == 0:
+                        missing_ids.append(row_id)
+
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                raise
+
+        return missing_ids
+
+    def get_changes(self, since: int = 0, limit: int = 1000) -> list[tuple]:
+        """
+        The get_changes function returns the changes recorded after a
+        sequence number, oldest first.
+        Each change is a tuple with the sequence number, the operation
+        ('insert', 'update', 'delete' or 'truncate'), the row id and the row
+        values after the change (None for deletes and truncates).
+
+        :param since: [int] Last sequence number already seen
+        :param limit: [int] Maximum number of changes returned
+
+        :return: [list[tuple]] The changes
+        """
+        query = (
+            f"""
+            SELECT seq,
+                    operation,
+                    row_id,
+                    {ElevatorColumns.CURRENT_FLOOR},
+                    {ElevatorColumns.DEMAND_FLOOR},
+                    {ElevatorColumns.DESTINATION_FLOOR},
+                    CASE
+                        WHEN typeof({ElevatorColumns.CALL_DATETIME})
+                            = 'integer'
+                        THEN strftime('%Y-%m-%d %H:%M:%S',
+                            {ElevatorColumns.CALL_DATETIME}, 'unixepoch')
+                        ELSE {ElevatorColumns.CALL_DATETIME}
+                    END
+            FROM elevator_changes
+            WHERE seq > ?
+            ORDER BY seq
+            LIMIT ?
+        """
+        )
+        parameters = (since, limit)
+
+        return self._fetch_all(query, parameters)
+
+    def insert_dispatch(
+            self,
+            car_id: int,
+            stop_floor: int,
+            direction: int,
+            pending_stops: int
+    ) -> None:
+        """
+        The insert_dispatch function records a stop chosen by a dispatcher.
+
+        :param car_id:        [int] Car that will stop
+        :param stop_floor:    [int] Floor of the stop
+        :param direction:     [int] Direction of travel: 1 up, -1 down
+        :param pending_stops: [int] Stops still queued after this one
+
+        :return: [None]
+        """
+        query = (
+            """
+            INSERT INTO elevator_dispatch (
+                car_id, stop_floor, direction, pending_stops, decided_at)
+            VALUES (?, ?, ?, ?, ?)
+            """
+        )
+        parameters = (
+            car_id,
+            stop_floor,
+            direction,
+            pending_stops,
+            to_epoch(datetime.now())
+        )
+        self._execute_query(query, parameters)
+
+    def get_dispatch_log(
+            self,
+            car_id: int | None = None,
+            limit: int = 100
+    ) -> list[tuple]:
+        """
+        The get_dispatch_log function returns the latest recorded stops,
+        newest first, with the decision time in the format
+        YYYY-MM-DD HH:MM:SS.
+
+        :param car_id: [int | None] Only return the stops of this car
+        :param limit:  [int] Maximum number of stops returned
+
+        :return: [list[tuple]] The id, car id, stop floor, direction,
+                               pending stops and decision time of each stop
+        """
+        query = (
+            """
+            SELECT id,
+                    car_id,
+                    stop_floor,
+                    direction,
+                    pending_stops,
+                    strftime('%Y-%m-%d %H:%M:%S', decided_at, 'unixepoch')
+            FROM elevator_dispatch
+            WHERE ? IS NULL OR car_id = ?
+            ORDER BY id DESC
+            LIMIT ?
+            """
+        )
+        parameters = (car_id, car_id, limit)
+
+        return self._fetch_all(query, parameters)
+
+    def insert_assignment(
+            self,
+            call_id: int | None,
+            car_id: int,
+            demand_floor: int,
+            destination_floor: int,
+            eta_seconds: float
+    ) -> None:
+        """
+        The insert_assignment function records the car assigned to a hall
+        call.
+
+        :param call_id:           [int | None] Id of the recorded call
+        :param car_id:            [int] Car assigned to the call
+        :param demand_floor:      [int] Floor the car is called from
+        :param destination_floor: [int] Floor the passenger goes to
+        :param eta_seconds:       [float] Estimated seconds until the car
+                                          arrives
+
+        :return: [None]
+        """
+        query = (
+            """
+            INSERT INTO elevator_assignments (
+                call_id,
+                car_id,
+                demand_floor,
+                destination_floor,
+                eta_seconds,
+                assigned_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """
+        )
+        parameters = (
+            call_id,
+            car_id,
+            demand_floor,
+            destination_floor,
+            eta_seconds,
+            to_epoch(datetime.now())
+        )
+        self._execute_query(query, parameters)
+
+    def get_assignments(
+            self,
+            car_id: int | None = None,
+            limit: int = 100
+    ) -> list[tuple]:
+        """
+        The get_assignments function returns the latest hall call
+        assignments, newest first, with the assignment time in the format
+        YYYY-MM-DD HH:MM:SS.
+
+        :param car_id: [int | None] Only return the assignments of this car
+        :param limit:  [int] Maximum number of assignments returned
+
+        :return: [list[tuple]] The id, call id, car id, demand floor,
+                               destination floor, estimated seconds of
+                               arrival and assignment time of each
+                               assignment
+        """
+        query = (
+            """
+            SELECT id,
+                    call_id,
+                    car_id,
+                    demand_floor,
+                    destination_floor,
+                    eta_seconds,
+                    strftime('%Y-%m-%d %H:%M:%S', assigned_at, 'unixepoch')
+            FROM elevator_assignments
+            WHERE ? IS NULL OR car_id = ?
+            ORDER BY id DESC
+            LIMIT ?
+            """
+        )
+        parameters = (car_id, car_id, limit)
+
+        return self._fetch_all(query, parameters)
+
+    def get_data_version(self) -> int:
+        """
+        The get_data_version function returns the sequence number of the
+        last change made to the elevator table.
+        It grows with every insert, update and delete, so anything derived
+        from the table can be cached by it.
+
+        :return: [int] The data version, 0 if nothing changed yet
+        """
+        query = "SELECT COALESCE(MAX(seq), 0) FROM elevator_changes"
+        return self._fetch_one(query)[0]
+
+    def get_pruned_version(self) -> int:
+        """
+        The get_pruned_version function returns the sequence number up to
+        which the change log was pruned: changes at or below it are no longer
+        available through get_changes.
+
+        :return: [int] The pruned version, 0 if nothing was pruned
+        """
+        query = "SELECT COALESCE(MIN(seq), 1) - 1 FROM elevator_changes"
+        return self._fetch_one(query)[0]
+
+    def prune_changes(self, keep: int, max_rows: int) -> int:
+        """
+        The prune_changes function deletes the oldest changes of the change
+        log, keeping at least the last 'keep' ones. At most max_rows are
+        deleted, so the write lock is only held briefly; the last change is
+        always kept, so the data version never goes back.
+
+        :param keep:     [int] Number of recent changes kept, at least 1
+        :param max_rows: [int] Largest number of changes deleted
+
+        :return: [int] The number of changes deleted
+        """
+        query = (
+            """
+            DELETE FROM elevator_changes
+            WHERE seq <= MIN(
+                (SELECT MAX(seq) FROM elevator_changes) - ?,
+                (SELECT MIN(seq) FROM elevator_changes) + ? - 1)
+        """
+        )
+        parameters = (max(keep, 1), max_rows)
+
+        with DatabaseContext(self):
+            self.cursor.execute(query, parameters)
+            self.connection.commit()
+            return self.cursor.rowcount
+
     def row_exists(self, row_id: int) -> bool:
         """
         The row_exists function checks whether a row with the specified 'id'
@@ -252,5 +1224,351 @@ class ElevatorDatabase(DatabaseInterface):
         query = "DELETE FROM elevator"
         self._execute_query(query)
 
+    def snapshot(
+            self,
+            target_path: str,
+            pages: int = SNAPSHOT_PAGES,
+            progress: Callable[[int, int, int], object] | None = None
+    ) -> None:
+        """
+        The snapshot function copies the database into target_path using
+        the SQLite online backup API.
+        The copy runs incrementally, a few pages per step, from a read
+        snapshot: in WAL mode its single read transaction never blocks the
+        writers, and their writes are not seen by the copy, which would
+        otherwise restart from the first page after every write and might
+        never finish on a busy database.
+        It is written to a temporary file first and then moved into place,
+        so a partially written snapshot is never visible.
+
+        :param target_path: [str] Path of the snapshot file
+        :param pages:       [int] Number of pages copied per step. -1 copies
+                                  everything in a single step
+        :param progress:    [Callable | None] Called after every step with
+                                              the status, the remaining and
+                                              the total number of pages
+
+        :return: [None]
+        """
+        temp_path = f"{target_path}.tmp"
+        target = sqlite3.connect(temp_path)
+        try:
+            with self.read_snapshot() as source, DatabaseContext(source):
+                source.connection.backup(
+                    target, pages=pages, progress=progress)
+            # The copy keeps the WAL mode of the source, a snapshot is a
+            # single file
+            target.execute("PRAGMA journal_mode = DELETE")
+        except Exception:
+            target.close()
+            os.remove(temp_path)
+            raise
+        target.close()
+        os.replace(temp_path, target_path)
+
+    def restore(self, source_path: str) -> None:
+        """
+        The restore function replaces the whole database with the content of
+        a snapshot, in a single backup step. The data version keeps growing
+        across the restore.
+
+        :param source_path: [str] Path of the snapshot file
+
+        :return: [None]
+        """
+        if not os.path.exists(source_path):
+            raise FileNotFoundError(f"Snapshot not found: {source_path}")
+
+        try:
+            version = self.get_data_version()
+        except sqlite3.OperationalError:
+            # No change log yet, e.g. a new in-memory database
+            version = 0
+
+        source = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+        try:
+            with DatabaseContext(self):
+                source.backup(self.connection)
+        finally:
+            source.close()
+
+        self.detect_schema()
+        # The backup replaced the change log: a 'truncate' change numbered
+        # after every change made before the restore keeps the data version
+        # growing, so consumers resynchronise instead of missing changes
+        self._create_change_log()
+        self._execute_query(
+            """
+            INSERT INTO elevator_changes (seq, operation)
+            VALUES (MAX(?, (SELECT COALESCE(MAX(seq), 0)
+                            FROM elevator_changes)) + 1, 'truncate')
+            """,
+            (version,)
+        )
+
+    def get_storage_stats(self) -> dict:
+        """
+        The get_storage_stats function reports the size and fragmentation of
+        the database file and its journal modes.
+
+        :return: [dict] The page size, page count, free pages, WAL pages,
+                        journal mode and auto_vacuum mode
+        """
+        with DatabaseContext(self):
+            stats = {
+                pragma: self.cursor.execute(f"PRAGMA {pragma}").fetchone()[0]
+                for pragma in ("page_size", "page_count", "freelist_count",
+                               "journal_mode", "auto_vacuum")
+            }
+
+        wal_path = f"{self.database_path}-wal"
+        stats["wal_pages"] = (
+            os.path.getsize(wal_path) // stats["page_size"]
+            if os.path.exists(wal_path) else 0)
+        return stats
+
+    def analyze(self, analysis_limit: int = ANALYSIS_LIMIT) -> None:
+        """
+        The analyze function refreshes the statistics of the query planner.
+        Each index is sampled on at most analysis_limit rows, so the write
+        lock is only held briefly whatever the size of the table.
+
+        :param analysis_limit: [int] Rows sampled per index, 0 for all
+
+        :return: [None]
+        """
+        with DatabaseContext(self):
+            self.cursor.execute(
+                f"PRAGMA analysis_limit = {int(analysis_limit)}")
+            self.cursor.execute("ANALYZE")
+            self.connection.commit()
+
+    def optimize(self) -> None:
+        """
+        The optimize function lets SQLite run the optimizations it deems
+        useful, such as analyzing the tables whose statistics are stale.
+
+        :return: [None]
+        """
+        with DatabaseContext(self):
+            self.cursor.execute(
+                f"PRAGMA analysis_limit = {int(ANALYSIS_LIMIT)}")
+            self.cursor.execute("PRAGMA optimize")
+            self.connection.commit()
+
+    def wal_checkpoint(self) -> tuple[int, int, int]:
+        """
+        The wal_checkpoint function copies the write-ahead log back into the
+        database file, without waiting for readers or writers.
+
+        :return: [tuple[int, int, int]] Whether the checkpoint was blocked,
+                                        the frames in the log and the frames
+                                        checkpointed
+        """
+        return tuple(self._fetch_one("PRAGMA wal_checkpoint(PASSIVE)"))
+
+    def incremental_vacuum(self, pages: int) -> int:
+        """
+        The incremental_vacuum function releases free pages at the end of the
+        file back to the file system, on databases with incremental
+        auto_vacuum.
+
+        :param pages: [int] Largest number of pages released
+
+        :return: [int] The number of pages released
+        """
+        with DatabaseContext(self):
+            before = self.cursor.execute(
+                "PRAGMA freelist_count").fetchone()[0]
+            # Every page is released by one step of the statement, which
+            # executescript runs to completion
+            self.cursor.executescript(
+                f"PRAGMA incremental_vacuum({int(pages)})")
+            after = self.cursor.execute(
+                "PRAGMA freelist_count").fetchone()[0]
+        return before - after
+
+    def vacuum(self) -> None:
+        """
+        The vacuum function rebuilds the database file, releasing every free
+        page, and switches it to incremental auto_vacuum, which databases
+        created by older versions lack. Writers wait until it finishes.
+
+        :return: [None]
+        """
+        with DatabaseContext(self):
+            self.cursor.executescript(
+                "PRAGMA auto_vacuum = INCREMENTAL; VACUUM;")
+
+    def reindex(self) -> list[str]:
+        """
+        The reindex function rebuilds the indexes of the elevator tables one
+        at a time, so the write lock is released between them.
+
+        :return: [list[str]] The names of the rebuilt indexes
+        """
+        query = (
+            """
+            SELECT name
+            FROM sqlite_master
+            WHERE type = 'index' AND tbl_name LIKE 'elevator%'
+            ORDER BY tbl_name, name
+            """
+        )
+        names = [row[0] for row in self._fetch_all(query)]
+        for name in names:
+            self._execute_query(f'REINDEX "{name}"')
+        return names
+
+    def is_compact_schema(self) -> bool:
+        """
+        The is_compact_schema function checks whether the elevator table on
+        disk uses the compact STRICT schema.
+
+        :return: [bool] True if the table is STRICT, False otherwise
+        """
+        result = self._fetch_one("PRAGMA table_list('elevator')")
+        return bool(result and result[5])
+
+    def detect_schema(self) -> bool:
+        """
+        The detect_schema function aligns the instance with the schema of the
+        table on disk, so an existing database can be opened without knowing
+        how it was created.
+
+        :return: [bool] True if the compact schema is in use
+        """
+        self.compact = self.is_compact_schema()
+        return self.compact
+
+    def migrate_to_compact(self) -> bool:
+        """
+        The migrate_to_compact function converts the elevator table from the
+        DATETIME text schema to the compact STRICT schema in place.
+        Rows keep their ids, call_datetime text is converted into epoch
+        seconds, and the whole copy runs in a single transaction, followed
+        by a VACUUM that gives the freed pages back to the filesystem.
+
+        :return: [bool] True if the table was migrated, False if it was
+                        already compact
+        """
+        if self.is_compact_schema():
+            self.compact = True
+            return False
+
+        script = (
+            f"""
+            BEGIN;
+            DROP TABLE IF EXISTS elevator_compact;
+            {self._compact_table_query("elevator_compact")};
+            INSERT INTO elevator_compact
+            SELECT {ElevatorColumns.ID},
+                    {ElevatorColumns.CURRENT_FLOOR},
+                    {ElevatorColumns.DEMAND_FLOOR},
+                    {ElevatorColumns.DESTINATION_FLOOR},
+                    CAST(strftime('%s', {ElevatorColumns.CALL_DATETIME})
+                        AS INTEGER)
+            FROM elevator;
+            DROP TABLE elevator;
+            ALTER TABLE elevator_compact RENAME TO elevator;
+            COMMIT;
+            """
+        )
+        with DatabaseContext(self):
+            try:
+                self.connection.executescript(script)
+            except sqlite3.Error:
+                if self.connection.in_transaction:
+                    self.connection.rollback()
+                raise
+            self.connection.execute("VACUUM")
+
+        self.compact = True
+        self.create_table()
+        return True
+
+
+class ElevatorSnapshot(ElevatorDatabase):
+    def __init__(self, database_path: str, compact: bool = False) -> None:
+        """
+        The __init__ function opens a read-only connection and starts a read
+        transaction on it. In WAL mode the transaction reads the database as
+        it was when it started until it ends, without blocking the writers
+        or being blocked by them. All the queries of the snapshot go through
+        that connection, so long exports and analytics made of many queries
+        never see a half-applied write.
+
+        :param database_path: [str] Path of the database
+        :param compact:       [bool] The database uses the compact schema
+
+        :return: [None]
+        """
+        super().__init__(database_path, compact)
+        self._snapshot_connection = sqlite3.connect(
+            f"file:{database_path}?mode=ro", uri=True)
+        self._snapshot_connection.execute("BEGIN")
+        # The snapshot is taken by the first read of the transaction
+        self._snapshot_connection.execute(
+            "SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+    def __enter__(self) -> "ElevatorSnapshot":
+        """
+        Enter the with block.
+
+        :return: [ElevatorSnapshot] The snapshot
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """
+        Exit the with block, ending the read transaction.
+
+        :return: [None]
+        """
+        self.close()
+
+    def connect(self) -> None:
+        """Use the connection of the snapshot"""
+        self.connection = self._snapshot_connection
+        self.cursor = self.connection.cursor()
+
+    def close_connection(self) -> None:
+        """Keep the connection of the snapshot open for the next query"""
+        if self.connection:
+            self.cursor.close()
+            self.connection = None
+            self.cursor = None
+
+    def read_snapshot(self) -> ContextManager["ElevatorSnapshot"]:
+        """
+        The read_snapshot function returns the snapshot itself, left open
+        at the end of the with block.
+
+        :return: [ContextManager[ElevatorSnapshot]] The snapshot
+        """
+        return nullcontext(self)
+
+    def close(self) -> None:
+        """
+        The close function ends the read transaction and closes the
+        connection, letting checkpoints go past the snapshot.
+
+        :return: [None]
+        """
+        self._snapshot_connection.rollback()
+        self._snapshot_connection.close()
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Builds the default database instance on first access, instead of at
+    import time.
+
+    :param name: [str] The name being accessed
 
-db = ElevatorDatabase()
+    :return: [Any] The default ElevatorDatabase instance
+    """
+    if name == "db":
+        globals()["db"] = ElevatorDatabase()
+        return globals()["db"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
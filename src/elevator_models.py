@@ -8,3 +8,7 @@ class ElevatorColumns:
     DEMAND_FLOOR: str = "demand_floor"
     DESTINATION_FLOOR: str = "destination_floor"
     CALL_DATETIME: str = "call_datetime"
+
+
+# Text format used by the API for call_datetime values
+DATETIME_FORMAT: str = "%Y-%m-%d %H:%M:%S"
@@ -0,0 +1,133 @@
+import threading
+from datetime import datetime
+
+from .call_broadcaster import CallBroadcaster
+from .db_inteface import DatabaseInterface
+from .elevator import Elevator
+from .elevator_models import ElevatorColumns, DATETIME_FORMAT
+
+# Floor where the cars of a group wait before their first call
+LOBBY_FLOOR = 1
+# Id of the first car of a group. Group cars record their stops in
+# elevator_dispatch like the standalone car 1 of /dispatch, so they are
+# numbered apart from it
+FIRST_CAR_ID = 101
+
+
+class GroupDispatcher:
+    def __init__(
+            self,
+            db: DatabaseInterface,
+            cars: int = 4,
+            floors: int = 6,
+            broadcaster: CallBroadcaster | None = None
+    ) -> None:
+        """
+        The __init__ function sets up the group controller of a bank of
+        cars, numbered from FIRST_CAR_ID, all waiting on the lobby.
+        Each hall call is assigned to the car with the lowest estimated time
+        of arrival. Every car keeps a summary of its LOOK route up to date as
+        stops are queued and served, so an assignment only compares one
+        constant-time estimate per car instead of replanning every route.
+
+        :param db:          [DatabaseInterface] The database where calls
+                                                and assignments are
+                                                recorded, an
+                                                ElevatorDatabase for the
+                                                assignments
+        :param cars:        [int] Number of cars in the bank
+        :param floors:      [int] Number of floors in the building
+        :param broadcaster: [CallBroadcaster | None] Receives every recorded
+                                                     call, for live streams
+
+        :return: [None]
+        """
+        if cars < 1:
+            raise ValueError("A group needs at least one car")
+
+        self.db = db
+        self.broadcaster = broadcaster
+        self.cars = [
+            Elevator(db, floors, car_id=car_id)
+            for car_id in range(FIRST_CAR_ID, FIRST_CAR_ID + cars)
+        ]
+        for car in self.cars:
+            car.position = LOBBY_FLOOR
+        self._lock = threading.Lock()
+
+    def get_car(self, car_id: int) -> Elevator | None:
+        """
+        The get_car function returns a car of the group.
+
+        :param car_id: [int] Id of the car
+
+        :return: [Elevator | None] The car, or None if it is not in the group
+        """
+        if 0 <= car_id - FIRST_CAR_ID < len(self.cars):
+            return self.cars[car_id - FIRST_CAR_ID]
+        return None
+
+    def _fastest_car(self, floor: int) -> tuple[Elevator, float]:
+        """
+        Finds the car with the lowest estimated time of arrival to a floor.
+        Ties go to the car with the fewest queued stops, then the lowest id.
+
+        :param floor: [int] Floor to reach
+
+        :return: [tuple[Elevator, float]] The car and its estimated seconds
+        """
+        best_car = None
+        best_key = None
+        for car in self.cars:
+            key = (car.estimate_arrival(floor), car.pending_stops)
+            if best_key is None or key < best_key:
+                best_car, best_key = car, key
+        return best_car, best_key[0]
+
+    def assign(
+            self,
+            demand_floor: int,
+            destination_floor: int
+    ) -> tuple[Elevator, float]:
+        """
+        The assign function records a hall call and queues it on the car
+        that will arrive first. The assignment is recorded in the database.
+
+        :param demand_floor:      [int] Floor the car is called from
+        :param destination_floor: [int] Floor the passenger goes to
+
+        :return: [tuple[Elevator, float]] The assigned car and its estimated
+                                          seconds of arrival
+        """
+        # Choosing and queueing happen together, so concurrent calls see
+        # each other's stops
+        with self._lock:
+            car, eta_seconds = self._fastest_car(demand_floor)
+            car.queue_call(demand_floor, destination_floor)
+            current_floor = car.position
+
+        call_datetime = datetime.now().strftime(DATETIME_FORMAT)
+        row_id = self.db.insert_call(
+            current_floor, demand_floor, destination_floor, call_datetime)
+        self.db.insert_assignment(
+            row_id, car.car_id, demand_floor, destination_floor, eta_seconds)
+
+        if self.broadcaster:
+            self.broadcaster.publish({
+                ElevatorColumns.ID: row_id,
+                ElevatorColumns.CURRENT_FLOOR: current_floor,
+                ElevatorColumns.DEMAND_FLOOR: demand_floor,
+                ElevatorColumns.DESTINATION_FLOOR: destination_floor,
+                ElevatorColumns.CALL_DATETIME: call_datetime
+            })
+
+        return car, eta_seconds
+
+    def step(self) -> dict[int, int | None]:
+        """
+        The step function moves every car to its next stop.
+
+        :return: [dict[int, int | None]] The floor each car stopped at, by
+                                         car id, None for idle cars
+        """
+        return {car.car_id: car.next_stop() for car in self.cars}
@@ -0,0 +1,355 @@
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from .elevator_database import to_epoch
+from .elevator_models import ElevatorColumns, DATETIME_FORMAT
+from .stats import percentile
+
+# Endpoint receiving the replayed calls
+LOAD_TEST_PATH = "/call-elevator"
+# Error SQLite reports when a writer waited too long for the database lock
+LOCK_ERROR = "database is locked"
+# Status reported for requests that got no HTTP response at all
+TRANSPORT_ERROR = 0
+
+# Sends the JSON body of a call and returns the status code and body text
+Sender = Callable[[dict], tuple[int, str]]
+
+
+def load_travels(json_path: str | None = None) -> list[dict]:
+    """
+    The load_travels function reads recorded calls to replay.
+
+    :param json_path: [str | None] JSON file with the calls. Defaults to the
+                                   elevator_travels.json shipped with the
+                                   package
+
+    :return: [list[dict]] The calls, in the order they were recorded
+    """
+    if json_path is None:
+        json_path = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            "elevator_travels.json"
+        )
+
+    with open(json_path, "r") as file:
+        return json.load(file)
+
+
+def synthetic_travels(
+        count: int,
+        floors: int = 6,
+        interval_seconds: float = 60.0,
+        seed: int | None = None
+) -> list[dict]:
+    """
+    The synthetic_travels function generates random calls, with exponential
+    inter-arrival times around interval_seconds.
+
+    :param count:            [int] Number of calls
+    :param floors:           [int] Number of floors in the building
+    :param interval_seconds: [float] Mean seconds between calls
+    :param seed:             [int | None] Seed, for reproducible traffic
+
+    :return: [list[dict]] The calls
+    """
+    generator = random.Random(seed)
+    call_time = to_epoch("2024-01-01 00:00:00")
+    travels = []
+
+    for _ in range(count):
+        call_time += generator.expovariate(1 / interval_seconds)
+        demand_floor = generator.randint(1, floors)
+        destination_floor = generator.choice(
+            [floor for floor in range(1, floors + 1)
+             if floor != demand_floor])
+        travels.append({
+            ElevatorColumns.DEMAND_FLOOR: demand_floor,
+            ElevatorColumns.DESTINATION_FLOOR: destination_floor,
+            ElevatorColumns.CALL_DATETIME: time.strftime(
+                DATETIME_FORMAT, time.gmtime(call_time))
+        })
+
+    return travels
+
+
+def build_schedule(
+        travels: list[dict],
+        speedup: float | None = None,
+        rate: float | None = None
+) -> list[float]:
+    """
+    The build_schedule function computes when each call is sent, in seconds
+    from the start of the test.
+    With a rate the calls are sent at that constant rate. With a speedup the
+    recorded gaps between calls are replayed, divided by the speedup. With
+    neither, all the calls are sent at once.
+
+    :param travels: [list[dict]] The calls
+    :param speedup: [float | None] Time compression of the recorded gaps
+    :param rate:    [float | None] Calls per second
+
+    :return: [list[float]] The offset of each call
+    """
+    if rate:
+        return [index / rate for index in range(len(travels))]
+    if not speedup or not travels:
+        return [0.0] * len(travels)
+
+    epochs = [
+        to_epoch(travel[ElevatorColumns.CALL_DATETIME]) for travel in travels]
+    return [(epoch - epochs[0]) / speedup for epoch in epochs]
+
+
+@dataclass
+class LoadTestReport:
+    duration_seconds: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+    status_counts: dict[int, int] = field(default_factory=dict)
+    lock_errors: int = 0
+    max_lag_seconds: float = 0.0
+
+    @property
+    def requests(self) -> int:
+        """Number of requests sent"""
+        return len(self.latencies)
+
+    @property
+    def errors(self) -> int:
+        """Number of requests that did not succeed"""
+        return sum(
+            count for status, count in self.status_counts.items()
+            if not 200 <= status < 300
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        The to_dict function summarizes the report: throughput, latency
+        percentiles in milliseconds, error rate and lock errors.
+
+        :return: [dict[str, Any]] The summary
+        """
+        latencies = sorted(self.latencies)
+
+        def milliseconds(fraction: float) -> float | None:
+            value = percentile(latencies, fraction)
+            return None if value is None else round(value * 1000, 3)
+
+        return {
+            "requests": self.requests,
+            "duration_seconds": round(self.duration_seconds, 3),
+            "throughput": round(
+                self.requests / self.duration_seconds, 2)
+            if self.duration_seconds else None,
+            "latency_ms": {
+                "p50": milliseconds(0.50),
+                "p95": milliseconds(0.95),
+                "p99": milliseconds(0.99),
+                "max": milliseconds(1.0)
+            },
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.requests, 4)
+            if self.requests else None,
+            "status_counts": {
+                str(status): count
+                for status, count in sorted(self.status_counts.items())
+            },
+            "lock_errors": self.lock_errors,
+            "max_lag_ms": round(self.max_lag_seconds * 1000, 3)
+        }
+
+
+def client_sender(app: Any, path: str = LOAD_TEST_PATH) -> Sender:
+    """
+    The client_sender function sends calls to a Flask application in
+    process, each thread through its own test client.
+
+    :param app:  [Any] The Flask application
+    :param path: [str] Endpoint receiving the calls
+
+    :return: [Sender] The sender
+    """
+    local = threading.local()
+
+    def send(body: dict) -> tuple[int, str]:
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        response = local.client.post(path, json=body)
+        return response.status_code, response.get_data(as_text=True)
+
+    return send
+
+
+def http_sender(
+        base_url: str,
+        path: str = LOAD_TEST_PATH,
+        timeout: float = 30.0
+) -> Sender:
+    """
+    The http_sender function sends calls to a running server over HTTP.
+
+    :param base_url: [str] URL of the server, like http://127.0.0.1:5000
+    :param path:     [str] Endpoint receiving the calls
+    :param timeout:  [float] Seconds to wait for each response
+
+    :return: [Sender] The sender
+    """
+    url = base_url.rstrip("/") + path
+
+    def send(body: dict) -> tuple[int, str]:
+        request = urllib.request.Request(
+            url,
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return response.status, response.read().decode("utf-8")
+        except urllib.error.HTTPError as e:
+            return e.code, e.read().decode("utf-8")
+        except OSError as e:
+            return TRANSPORT_ERROR, str(e)
+
+    return send
+
+
+def run_load_test(
+        send: Sender,
+        travels: list[dict],
+        speedup: float | None = None,
+        rate: float | None = None,
+        concurrency: int = 16
+) -> LoadTestReport:
+    """
+    The run_load_test function replays calls with an open-loop schedule:
+    each call is sent at its scheduled time by one of the concurrent
+    clients, whether or not the previous ones were answered. Latency is
+    measured from the scheduled time, so the time a call waits for a free
+    client counts against the server instead of being hidden.
+
+    :param send:        [Sender] Sends one call
+    :param travels:     [list[dict]] The calls
+    :param speedup:     [float | None] Time compression of the recorded gaps
+    :param rate:        [float | None] Calls per second, overriding speedup
+    :param concurrency: [int] Number of concurrent clients
+
+    :return: [LoadTestReport] The results
+    """
+    schedule = build_schedule(travels, speedup, rate)
+    report = LoadTestReport()
+    lock = threading.Lock()
+
+    def send_call(travel: dict, scheduled: float) -> None:
+        body = {
+            ElevatorColumns.DEMAND_FLOOR:
+                travel[ElevatorColumns.DEMAND_FLOOR],
+            ElevatorColumns.DESTINATION_FLOOR:
+                travel[ElevatorColumns.DESTINATION_FLOOR]
+        }
+        try:
+            status, text = send(body)
+        except Exception as e:
+            status, text = TRANSPORT_ERROR, str(e)
+        latency = time.perf_counter() - scheduled
+
+        with lock:
+            report.latencies.append(latency)
+            report.status_counts[status] = (
+                report.status_counts.get(status, 0) + 1)
+            if LOCK_ERROR in text:
+                report.lock_errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for travel, offset in zip(travels, schedule):
+            scheduled = started + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                report.max_lag_seconds = max(report.max_lag_seconds, -delay)
+            executor.submit(send_call, travel, scheduled)
+
+    report.duration_seconds = time.perf_counter() - started
+    return report
+
+
+def main(arguments: list[str] | None = None) -> dict[str, Any]:
+    """
+    The main function runs a load test from the command line and prints
+    its report as JSON.
+    Without --url the application is served in process, on a scratch
+    database, so the test never writes into elevator.db.
+
+    :param arguments: [list[str] | None] Command line arguments
+
+    :return: [dict[str, Any]] The report
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m src.load_test",
+        description=f"Replay elevator calls against {LOAD_TEST_PATH}"
+    )
+    parser.add_argument(
+        "--url", help="URL of a running server (default: in process)")
+    parser.add_argument(
+        "--travels", help="JSON file of calls to replay "
+                          "(default: elevator_travels.json)")
+    parser.add_argument(
+        "--synthetic", type=int, metavar="COUNT",
+        help="Send COUNT random calls instead of replaying a file")
+    parser.add_argument(
+        "--speedup", type=float, default=3600.0,
+        help="Time compression of the recorded gaps (default: 3600)")
+    parser.add_argument(
+        "--rate", type=float, help="Constant calls per second")
+    parser.add_argument(
+        "--concurrency", type=int, default=16,
+        help="Concurrent clients (default: 16)")
+    parser.add_argument(
+        "--database", help="Database of the in-process server "
+                           "(default: a temporary file)")
+    options = parser.parse_args(arguments)
+
+    if options.synthetic:
+        travels = synthetic_travels(options.synthetic, seed=0)
+    else:
+        travels = load_travels(options.travels)
+
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        if options.url:
+            send = http_sender(options.url)
+        else:
+            import main as api_module
+            from .elevator_database import ElevatorDatabase
+
+            database = ElevatorDatabase(
+                options.database
+                or os.path.join(scratch_dir, "load_test.db"),
+                compact=True
+            )
+            database.create_table()
+            api_module.db = database
+            api_module.attach_models(database)
+            send = client_sender(api_module.create_app())
+
+        report = run_load_test(
+            send, travels, options.speedup, options.rate, options.concurrency)
+
+    summary = report.to_dict()
+    print(json.dumps(summary, indent=4))
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,743 @@
+import os
+import re
+import time
+import zlib
+import atexit
+import struct
+import threading
+from datetime import datetime
+from typing import Callable, Iterable, Iterator
+
+from .db_inteface import DatabaseInterface
+from .elevator_database import from_epoch, to_epoch
+from .elevator_models import ElevatorColumns, DATETIME_FORMAT
+
+# Operation, row id, current, demand and destination floors, epoch seconds
+RECORD_BODY = struct.Struct("<Bqiiiq")
+# CRC-32 of the body, to detect records torn by a crash
+RECORD_CRC = struct.Struct("<I")
+RECORD_SIZE = RECORD_BODY.size + RECORD_CRC.size
+
+# Operations of the records
+OP_INSERT = 1
+OP_UPDATE = 2
+# Drops every row. Its row id field holds the data version after it and its
+# epoch field the last row id given, so ids are never reused
+OP_TRUNCATE = 3
+
+# Size a segment grows to before writes move to a new one
+SEGMENT_SIZE = 64 * 1024 * 1024
+SEGMENT_PATTERN = re.compile(r"^segment-(\d+)\.log$")
+# Share of records replaced by updates after which the log is compacted
+COMPACT_DEAD_FRACTION = 0.5
+# Replaced records below which the log is never compacted, however large
+# their share
+COMPACT_MIN_DEAD_RECORDS = 100_000
+
+# Column of each updatable field in the rows
+UPDATABLE_FIELDS = {
+    ElevatorColumns.CURRENT_FLOOR: 1,
+    ElevatorColumns.DEMAND_FLOOR: 2,
+    ElevatorColumns.DESTINATION_FLOOR: 3,
+    ElevatorColumns.CALL_DATETIME: 4,
+}
+
+
+def pack_record(
+        operation: int,
+        row_id: int,
+        current_floor: int = 0,
+        demand_floor: int = 0,
+        destination_floor: int = 0,
+        epoch: int = 0
+) -> bytes:
+    """
+    The pack_record function encodes a record of the log.
+
+    :param operation:         [int] OP_INSERT, OP_UPDATE or OP_TRUNCATE
+    :param row_id:            [int] Id of the row
+    :param current_floor:     [int] Floor the elevator was on
+    :param demand_floor:      [int] Floor the elevator was called from
+    :param destination_floor: [int] Floor the elevator was sent to
+    :param epoch:             [int] Epoch seconds of the call
+
+    :return: [bytes] The record
+    """
+    body = RECORD_BODY.pack(
+        operation, row_id, current_floor, demand_floor, destination_floor,
+        epoch)
+    return body + RECORD_CRC.pack(zlib.crc32(body))
+
+
+def unpack_record(buffer: bytes, offset: int = 0) -> tuple | None:
+    """
+    The unpack_record function decodes a record of the log.
+
+    :param buffer: [bytes] Bytes holding the record
+    :param offset: [int] Position of the record in the buffer
+
+    :return: [tuple | None] The operation, row id, floors and epoch seconds,
+                            or None if the record is torn or corrupted
+    """
+    end = offset + RECORD_BODY.size
+    if len(buffer) < end + RECORD_CRC.size:
+        return None
+
+    body = buffer[offset:end]
+    if RECORD_CRC.unpack_from(buffer, end)[0] != zlib.crc32(body):
+        return None
+    return RECORD_BODY.unpack(body)
+
+
+class LogElevatorDatabase(DatabaseInterface):
+    def __init__(
+            self,
+            directory: str = "./elevator_log",
+            segment_size: int = SEGMENT_SIZE,
+            sync_interval: float | None = 1.0,
+            compact_fraction: float | None = COMPACT_DEAD_FRACTION,
+            compact_min_records: int = COMPACT_MIN_DEAD_RECORDS
+    ) -> None:
+        """
+        The __init__ function opens an append-only call store.
+        Every insert and update appends a fixed-size record to the active
+        segment file, and an in-memory index maps each row id to the
+        position of its latest record, so writes never rewrite the files
+        and reads are one positioned read per row. Segments are replayed
+        on open to rebuild the index; a record torn by a crash at the end of
+        the active segment is cut off.
+        Appends are flushed to the OS right away and fsynced at most every
+        sync_interval seconds, which bounds the writes a power loss can
+        cost; 0 fsyncs every write and None only on flush and shutdown.
+        Updates leave the records they replace behind: once they make up
+        compact_fraction of the log, and at least compact_min_records, the
+        update that crossed the threshold compacts it. Each compaction
+        follows as many replaced records as live ones, so its cost is
+        spread over the updates that made it due.
+
+        :param directory:           [str] Directory of the segment files
+        :param segment_size:        [int] Bytes a segment grows to before
+                                          writes move to a new one
+        :param sync_interval:       [float | None] Seconds between fsyncs
+        :param compact_fraction:    [float | None] Share of replaced records
+                                                   before compacting, None
+                                                   to never compact
+                                                   automatically
+        :param compact_min_records: [int] Replaced records before compacting
+
+        :return: [None]
+        """
+        self.directory = directory
+        self.segment_size = segment_size
+        self.sync_interval = sync_interval
+        self.compact_fraction = compact_fraction
+        self.compact_min_records = compact_min_records
+
+        # Row id -> (segment number, offset) of its latest record
+        self._index: dict[int, tuple[int, int]] = {}
+        self._readers: dict[int, int] = {}
+        self._writer = None
+        self._segment = 0
+        self._offset = 0
+        self._version = 0
+        # Largest row id ever given, kept across truncates like AUTOINCREMENT
+        self._last_id = 0
+        # Records in the segments, live or replaced
+        self._records = 0
+        self._last_sync = time.monotonic()
+        self._insert_listeners: list[Callable[..., object]] = []
+        self._lock = threading.RLock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+        atexit.register(self.shutdown)
+
+    def _segment_path(self, segment: int) -> str:
+        """
+        Builds the path of a segment file.
+
+        :param segment: [int] Number of the segment
+
+        :return: [str] The path
+        """
+        return os.path.join(self.directory, f"segment-{segment:06d}.log")
+
+    def _segment_numbers(self) -> list[int]:
+        """
+        Lists the segments on disk.
+
+        :return: [list[int]] The segment numbers, in ascending order
+        """
+        return sorted(
+            int(match.group(1))
+            for match in map(SEGMENT_PATTERN.match, os.listdir(self.directory))
+            if match
+        )
+
+    def _apply(self, record: tuple, location: tuple[int, int]) -> None:
+        """
+        Applies a record to the index.
+
+        :param record:   [tuple] The decoded record
+        :param location: [tuple[int, int]] Segment and offset of the record
+
+        :return: [None]
+        """
+        operation, row_id = record[0], record[1]
+        self._records += 1
+        if operation == OP_TRUNCATE:
+            self._index.clear()
+            self._version = row_id
+            self._last_id = max(self._last_id, record[5])
+        else:
+            self._index[row_id] = location
+            self._version += 1
+            self._last_id = max(self._last_id, row_id)
+
+    def _load(self) -> None:
+        """
+        Replays the segments to rebuild the index and opens the last one
+        for writing. Only the last segment can end with a record torn by a
+        crash, as writes only ever go to it; it is truncated to its last
+        complete record. A bad record in an earlier segment is corruption,
+        which would silently drop the records after it.
+
+        :raises ValueError: If a segment before the last one is corrupted
+
+        :return: [None]
+        """
+        segments = self._segment_numbers()
+        for segment in segments:
+            path = self._segment_path(segment)
+            with open(path, "rb") as file:
+                data = file.read()
+
+            offset = 0
+            while offset < len(data):
+                record = unpack_record(data, offset)
+                if record is None:
+                    break
+                self._apply(record, (segment, offset))
+                offset += RECORD_SIZE
+
+            if offset < len(data):
+                if segment != segments[-1]:
+                    raise ValueError(
+                        f"Corrupted record at offset {offset} of {path}")
+                with open(path, "r+b") as file:
+                    file.truncate(offset)
+
+        self._open_writer(segments[-1] if segments else 1)
+
+    def _open_writer(self, segment: int) -> None:
+        """
+        Makes a segment the active one, appending to it.
+
+        :param segment: [int] Number of the segment
+
+        :return: [None]
+        """
+        if self._writer is not None:
+            self._writer.close()
+        self._segment = segment
+        self._writer = open(self._segment_path(segment), "ab")
+        self._offset = self._writer.tell()
+
+    def _close_files(self) -> None:
+        """
+        Closes the writer and the readers.
+
+        :return: [None]
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        for reader in self._readers.values():
+            os.close(reader)
+        self._readers = {}
+
+    def _sync(self, force: bool = False) -> None:
+        """
+        Flushes the writer to the OS, and fsyncs it when the sync interval
+        elapsed.
+
+        :param force: [bool] fsync regardless of the interval
+
+        :return: [None]
+        """
+        self._writer.flush()
+        now = time.monotonic()
+        if force or (
+                self.sync_interval is not None
+                and now - self._last_sync >= self.sync_interval):
+            os.fsync(self._writer.fileno())
+            self._last_sync = now
+
+    def _append(self, records: bytes) -> int:
+        """
+        Appends encoded records to the active segment, moving to a new
+        segment first if the active one is full.
+
+        :param records: [bytes] The records
+
+        :return: [int] Offset of the first record in the active segment
+        """
+        if self._offset >= self.segment_size:
+            self._open_writer(self._segment + 1)
+
+        offset = self._offset
+        self._writer.write(records)
+        self._offset += len(records)
+        self._records += len(records) // RECORD_SIZE
+        self._sync()
+        return offset
+
+    def _read(self, row_id: int) -> tuple:
+        """
+        Reads the latest record of a row.
+
+        :param row_id: [int] Id of the row
+
+        :return: [tuple] The decoded record
+        """
+        segment, offset = self._index[row_id]
+        if segment == self._segment:
+            self._writer.flush()
+
+        reader = self._readers.get(segment)
+        if reader is None:
+            reader = os.open(self._segment_path(segment), os.O_RDONLY)
+            self._readers[segment] = reader
+        return RECORD_BODY.unpack(
+            os.pread(reader, RECORD_BODY.size, offset))
+
+    @staticmethod
+    def _to_row(record: tuple) -> tuple:
+        """
+        Converts a record into a row of the call store.
+
+        :param record: [tuple] The decoded record
+
+        :return: [tuple] The id, floors and call_datetime of the row
+        """
+        return record[1:5] + (from_epoch(record[5]),)
+
+    def _read_all(self) -> list[tuple]:
+        """
+        Reads the latest record of every row, ordered by id.
+
+        :return: [list[tuple]] The decoded records
+        """
+        with self._lock:
+            return [self._read(row_id) for row_id in self._index]
+
+    def connect(self) -> None:
+        """The segment files stay open, there is no connection to open"""
+        pass
+
+    def close_connection(self) -> None:
+        """The segment files stay open, there is no connection to close"""
+        pass
+
+    def flush(self) -> None:
+        """
+        The flush function makes every appended record durable.
+
+        :return: [None]
+        """
+        with self._lock:
+            if self._writer is not None:
+                self._sync(force=True)
+
+    def shutdown(self) -> None:
+        """
+        The shutdown function flushes the log and closes its files. It is
+        idempotent and registered to run at exit.
+
+        :return: [None]
+        """
+        with self._lock:
+            if self._writer is not None:
+                self._sync(force=True)
+            self._close_files()
+
+    def create_table(self) -> None:
+        """
+        The create_table function exists for compatibility with the other
+        stores: the log is created when it is opened.
+
+        :return: [None]
+        """
+        pass
+
+    def recreate_table(self) -> None:
+        """
+        The recreate_table function drops every row, like delete_all_rows.
+
+        :return: [None]
+        """
+        self.delete_all_rows()
+
+    def delete_all_rows(self) -> None:
+        """
+        The delete_all_rows function drops every row: the segments are
+        removed and a new one starts with a truncate record, which keeps the
+        data version and the row ids growing.
+
+        :return: [None]
+        """
+        with self._lock:
+            segments = self._segment_numbers()
+            next_segment = self._segment + 1
+            self._close_files()
+            self._open_writer(next_segment)
+
+            self._index.clear()
+            self._records = 0
+            self._version += 1
+            self._append(pack_record(
+                OP_TRUNCATE, self._version, epoch=self._last_id))
+            self._sync(force=True)
+
+            for segment in segments:
+                os.remove(self._segment_path(segment))
+
+    def compact(self) -> int:
+        """
+        The compact function rewrites the latest record of every row into a
+        new segment and removes the old ones, dropping the records replaced
+        by updates. The new segment starts with a truncate record, so a
+        crash before the old segments are removed replays to the same rows.
+
+        :return: [int] Bytes reclaimed
+        """
+        with self._lock:
+            segments = self._segment_numbers()
+            size_before = sum(
+                os.path.getsize(self._segment_path(segment))
+                for segment in segments)
+            records = self._read_all()
+
+            segment = self._segment + 1
+            path = self._segment_path(segment)
+            temp_path = f"{path}.tmp"
+            index = {}
+            with open(temp_path, "wb") as file:
+                file.write(pack_record(
+                    OP_TRUNCATE, self._version - len(records),
+                    epoch=self._last_id))
+                for position, record in enumerate(records, start=1):
+                    index[record[1]] = (segment, position * RECORD_SIZE)
+                    file.write(pack_record(OP_INSERT, *record[1:]))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, path)
+
+            self._close_files()
+            for old_segment in segments:
+                os.remove(self._segment_path(old_segment))
+            self._index = index
+            self._records = len(records) + 1
+            self._open_writer(segment)
+
+            return size_before - self._offset
+
+    def dead_records(self) -> int:
+        """
+        The dead_records function counts the records that no longer hold the
+        latest version of a row, which compact drops.
+
+        :return: [int] The number of replaced records
+        """
+        with self._lock:
+            return self._records - len(self._index)
+
+    def _compact_if_needed(self) -> None:
+        """
+        Compacts the log once the replaced records pass the threshold.
+
+        :return: [None]
+        """
+        if self.compact_fraction is None:
+            return
+        dead = self.dead_records()
+        if (dead >= self.compact_min_records
+                and dead >= self.compact_fraction * self._records):
+            self.compact()
+
+    def insert_call(
+            self,
+            current_floor: int,
+            demand_floor: int,
+            destination_floor: int,
+            call_datetime: datetime | str | None = None
+    ) -> int:
+        """
+        The insert_call function appends a new row to the log.
+
+        :param current_floor:     [int] Floor the elevator was on
+        :param demand_floor:      [int] Floor the elevator was called from
+        :param destination_floor: [int] Floor the elevator was sent to
+        :param call_datetime:     [datetime | str | None] Date of the call.
+                                                          Defaults to now
+
+        :return: [int] The id of the inserted row
+        """
+        if call_datetime is None:
+            call_datetime = datetime.now().strftime(DATETIME_FORMAT)
+        epoch = to_epoch(call_datetime)
+
+        with self._lock:
+            row_id = self._last_id + 1
+            offset = self._append(pack_record(
+                OP_INSERT, row_id, current_floor, demand_floor,
+                destination_floor, epoch))
+            self._index[row_id] = (self._segment, offset)
+            self._version += 1
+            self._last_id = row_id
+
+        self._notify_insert(
+            row_id, current_floor, demand_floor, destination_floor,
+            from_epoch(epoch))
+        return row_id
+
+    def insert_calls(
+            self, calls: Iterable[tuple[int, int, int, datetime | str]]
+    ) -> int:
+        """
+        The insert_calls function appends many rows with a single write.
+
+        :param calls: [Iterable[tuple]] The current floor, demand floor,
+                                        destination floor and call_datetime
+                                        of each call
+
+        :return: [int] The number of inserted rows
+        """
+        calls = [
+            (current, demand, destination, to_epoch(call_datetime))
+            for current, demand, destination, call_datetime in calls
+        ]
+        if not calls:
+            return 0
+
+        with self._lock:
+            first_id = self._last_id + 1
+            offset = self._append(b"".join(
+                pack_record(OP_INSERT, row_id, *call)
+                for row_id, call in enumerate(calls, start=first_id)
+            ))
+            for position, row_id in enumerate(
+                    range(first_id, first_id + len(calls))):
+                self._index[row_id] = (
+                    self._segment, offset + position * RECORD_SIZE)
+            self._version += len(calls)
+            self._last_id += len(calls)
+
+        if self._insert_listeners:
+            for row_id, (current, demand, destination, epoch) in enumerate(
+                    calls, start=first_id):
+                self._notify_insert(
+                    row_id, current, demand, destination, from_epoch(epoch))
+        return len(calls)
+
+    def add_insert_listener(self, listener: Callable[..., object]) -> None:
+        """
+        The add_insert_listener function registers a callback notified after
+        every recorded call, with the same arguments as ElevatorDatabase
+        insert listeners. Errors raised by listeners never fail the insert.
+
+        :param listener: [Callable] The callback
+
+        :return: [None]
+        """
+        self._insert_listeners.append(listener)
+
+    def _notify_insert(self, row_id: int, *call: int | str) -> None:
+        """
+        Notifies the insert listeners of a new row.
+
+        :param row_id: [int] Id of the inserted row
+        :param call:   [int | str] Floors and call_datetime of the row
+
+        :return: [None]
+        """
+        for listener in self._insert_listeners:
+            try:
+                listener(row_id, *call)
+            except Exception as e:
+                print(f"Error while notifying an insert listener: {e}")
+
+    def get_last_floor(self) -> int | None:
+        """
+        The get_last_floor function returns the destination floor of the
+        latest row.
+
+        :return: [int | None] The floor, or None without rows
+        """
+        with self._lock:
+            if not self._index:
+                return None
+            return self._read(next(reversed(self._index)))[4]
+
+    def get_all_rows(self) -> list[tuple]:
+        """
+        The get_all_rows function returns every row, ordered by id.
+
+        :return: [list[tuple]] The rows
+        """
+        return [self._to_row(record) for record in self._read_all()]
+
+    def iter_rows(self, batch_size: int = 5000) -> Iterator[tuple]:
+        """
+        The iter_rows function yields every row, ordered by id. The lock is
+        only held while reading each batch.
+
+        :param batch_size: [int] Number of rows read at once
+
+        :return: [Iterator[tuple]] The rows
+        """
+        with self._lock:
+            row_ids = list(self._index)
+
+        for start in range(0, len(row_ids), batch_size):
+            with self._lock:
+                records = [
+                    self._read(row_id)
+                    for row_id in row_ids[start:start + batch_size]
+                    if row_id in self._index
+                ]
+            for record in records:
+                yield self._to_row(record)
+
+    def get_call_history(self) -> list[tuple[int, int, int]]:
+        """
+        The get_call_history function returns the demand floor, destination
+        floor and epoch seconds of every call, ordered by id.
+
+        :return: [list[tuple[int, int, int]]] The calls
+        """
+        return [
+            (record[3], record[4], record[5]) for record in self._read_all()]
+
+    def get_rows_between(
+            self,
+            start: datetime | str,
+            end: datetime | str
+    ) -> list[tuple]:
+        """
+        The get_rows_between function returns the rows whose call_datetime
+        falls in the [start, end) interval, ordered by call_datetime.
+
+        :param start: [datetime | str] Start of the interval (inclusive)
+        :param end:   [datetime | str] End of the interval (exclusive)
+
+        :return: [list[tuple]] The rows
+        """
+        start, end = to_epoch(start), to_epoch(end)
+        records = sorted(
+            (record for record in self._read_all()
+             if start <= record[5] < end),
+            key=lambda record: (record[5], record[1])
+        )
+        return [self._to_row(record) for record in records]
+
+    def _updated_record(self, row_id: int, values: dict) -> bytes:
+        """
+        Builds the update record of a row with new values.
+
+        :param row_id: [int] Id of the row
+        :param values: [dict] New values keyed by column name
+
+        :return: [bytes] The record
+        """
+        fields = list(self._read(row_id)[1:])
+        for column, value in values.items():
+            if column == ElevatorColumns.CALL_DATETIME:
+                value = to_epoch(value)
+            fields[UPDATABLE_FIELDS[column]] = value
+        return pack_record(OP_UPDATE, *fields)
+
+    def update_column(
+            self,
+            row_id: int,
+            column_name: str,
+            column_value: int | datetime | str
+    ) -> None:
+        """
+        The update_column function appends a new version of a row with one
+        column changed. Missing rows are ignored.
+
+        :param row_id:       [int] Id of the row
+        :param column_name:  [str] Name of the column
+        :param column_value: [int | datetime | str] New value
+
+        :return: [None]
+        """
+        self.update_rows([{ElevatorColumns.ID: row_id,
+                           column_name: column_value}])
+
+    def update_rows(self, updates: list[dict]) -> list[int]:
+        """
+        The update_rows function appends the new versions of many rows with
+        a single write. Every update is validated before anything is
+        written, so invalid columns leave the log untouched.
+
+        :param updates: [list[dict]] Each dict holds the 'id' of the row and
+                                     the new values keyed by column name
+
+        :return: [list[int]] The ids that did not match any row
+        """
+        for update in updates:
+            invalid_columns = set(update) - set(UPDATABLE_FIELDS) - {
+                ElevatorColumns.ID}
+            if invalid_columns:
+                raise ValueError(
+                    f"Invalid columns: {sorted(invalid_columns)}")
+
+        missing_ids = []
+        with self._lock:
+            # New values by row, merging the updates of the same row
+            changes: dict[int, dict] = {}
+            for update in updates:
+                row_id = update[ElevatorColumns.ID]
+                if row_id not in self._index:
+                    missing_ids.append(row_id)
+                    continue
+                values = changes.setdefault(row_id, {})
+                values.update(
+                    (column, value) for column, value in update.items()
+                    if column != ElevatorColumns.ID
+                )
+
+            changed = {
+                row_id: self._updated_record(row_id, values)
+                for row_id, values in changes.items() if values
+            }
+            if changed:
+                offset = self._append(b"".join(changed.values()))
+                for position, row_id in enumerate(changed):
+                    self._index[row_id] = (
+                        self._segment, offset + position * RECORD_SIZE)
+                self._version += len(changed)
+                self._compact_if_needed()
+
+        return missing_ids
+
+    def row_exists(self, row_id: int) -> bool:
+        """
+        The row_exists function checks whether a row is in the index.
+
+        :param row_id: [int] Id of the row
+
+        :return: [bool] True if the row exists
+        """
+        return row_id in self._index
+
+    def get_data_version(self) -> int:
+        """
+        The get_data_version function returns the number of records that
+        changed the rows, kept growing across truncates and compactions.
+
+        :return: [int] The data version
+        """
+        return self._version
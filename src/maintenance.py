@@ -0,0 +1,358 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable
+
+from .elevator_database import AUTO_VACUUM_INCREMENTAL, ElevatorDatabase
+from .elevator_models import DATETIME_FORMAT
+
+# Seconds between two checks of the database
+MAINTENANCE_INTERVAL = 30.0
+# Seconds without writes before maintenance may run
+QUIET_SECONDS = 10.0
+# Changed rows after which the planner statistics are refreshed
+ANALYZE_WRITES = 10_000
+# Share of free pages after which they are released
+VACUUM_FREE_FRACTION = 0.10
+# Pages released per step of the incremental vacuum, each step holding the
+# write lock only for a few milliseconds
+VACUUM_STEP_PAGES = 128
+# Seconds an incremental vacuum may run before yielding to the next period
+VACUUM_BUDGET_SECONDS = 1.0
+# Changes kept in the change log, older ones being pruned
+CHANGE_LOG_RETENTION = 1_000_000
+# Changes pruned per step, each step holding the write lock only briefly
+PRUNE_STEP_ROWS = 10_000
+# WAL pages after which the log is checkpointed
+CHECKPOINT_WAL_PAGES = 1000
+# Number of maintenance actions kept for the status
+HISTORY_SIZE = 100
+
+
+class MaintenanceScheduler:
+    def __init__(
+            self,
+            db: ElevatorDatabase,
+            interval: float = MAINTENANCE_INTERVAL,
+            quiet_seconds: float = QUIET_SECONDS,
+            analyze_writes: int = ANALYZE_WRITES,
+            vacuum_free_fraction: float = VACUUM_FREE_FRACTION,
+            checkpoint_wal_pages: int = CHECKPOINT_WAL_PAGES,
+            vacuum_step_pages: int = VACUUM_STEP_PAGES,
+            vacuum_budget_seconds: float = VACUUM_BUDGET_SECONDS,
+            change_log_retention: int = CHANGE_LOG_RETENTION,
+            prune_step_rows: int = PRUNE_STEP_ROWS,
+            clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        The __init__ function sets up the maintenance of a SQLite database:
+        WAL checkpoints, ANALYZE, PRAGMA optimize, pruning of the change log
+        and incremental vacuum.
+        A background thread checks the data version every interval; once it
+        stayed the same for quiet_seconds, the tasks past their write or
+        fragmentation threshold are run. Each task is a short statement, or
+        a series of them, so a call waiting on the write lock is never
+        delayed for long. Databases created without incremental auto_vacuum
+        are never rewritten by the scheduler, as a full VACUUM would hold the
+        write lock for the whole rewrite; their fragmentation is only
+        reported, for an operator to run `python -m src.cli vacuum`.
+
+        :param db:                    [ElevatorDatabase] The database
+        :param interval:              [float] Seconds between checks
+        :param quiet_seconds:         [float] Seconds without writes before
+                                              running maintenance
+        :param analyze_writes:        [int] Changes before ANALYZE
+        :param vacuum_free_fraction:  [float] Share of free pages before
+                                              vacuuming
+        :param checkpoint_wal_pages:  [int] WAL pages before checkpointing
+        :param vacuum_step_pages:     [int] Pages released per step
+        :param vacuum_budget_seconds: [float] Longest incremental vacuum or
+                                              pruning
+        :param change_log_retention:  [int] Changes kept in the change log
+        :param prune_step_rows:       [int] Changes pruned per step
+        :param clock:                 [Callable[[], float]] Monotonic clock
+
+        :return: [None]
+        """
+        self.db = db
+        self.interval = interval
+        self.quiet_seconds = quiet_seconds
+        self.analyze_writes = analyze_writes
+        self.vacuum_free_fraction = vacuum_free_fraction
+        self.checkpoint_wal_pages = checkpoint_wal_pages
+        self.vacuum_step_pages = vacuum_step_pages
+        self.vacuum_budget_seconds = vacuum_budget_seconds
+        self.change_log_retention = change_log_retention
+        self.prune_step_rows = prune_step_rows
+        self._clock = clock
+
+        self._seen_version: int | None = None
+        self._last_write = clock()
+        self._analyzed_version = 0
+        self._optimized_version = 0
+        self.history: deque[dict] = deque(maxlen=HISTORY_SIZE)
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """
+        The start function starts checking the database in the background.
+
+        :return: [None]
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name="database-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        The stop function stops the background checks, waiting for the
+        running task to finish.
+
+        :return: [None]
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _loop(self) -> None:
+        """
+        Checks the database every interval until stopped.
+
+        :return: [None]
+        """
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                self._record("check", 0.0, error=str(e))
+
+    def tick(self) -> list[dict]:
+        """
+        The tick function checks whether the database is quiet and, if so,
+        runs the maintenance tasks that are due.
+
+        :return: [list[dict]] The actions taken, empty if none
+        """
+        version = self.db.get_data_version()
+        now = self._clock()
+        if version != self._seen_version:
+            self._seen_version = version
+            self._last_write = now
+            return []
+        if now - self._last_write < self.quiet_seconds:
+            return []
+        return self.run_once()
+
+    def _record(
+            self,
+            task: str,
+            seconds: float,
+            error: str | None = None,
+            **detail: object
+    ) -> dict:
+        """
+        Adds an action to the history.
+
+        :param task:    [str] Name of the task
+        :param seconds: [float] Time it took
+        :param error:   [str | None] Error that stopped it, if any
+        :param detail:  [object] What it did
+
+        :return: [dict] The action
+        """
+        action = {
+            "task": task,
+            "at": datetime.now().strftime(DATETIME_FORMAT),
+            "duration_ms": round(seconds * 1000, 3),
+            **detail
+        }
+        if error:
+            action["error"] = error
+        self.history.append(action)
+        return action
+
+    def _timed(self, task: str, function: Callable[[], dict]) -> dict:
+        """
+        Runs a task, recording how long it took. A database locked by a
+        writer is recorded as an error, the task being retried on the next
+        quiet period.
+
+        :param task:     [str] Name of the task
+        :param function: [Callable[[], dict]] Runs it, returning its detail
+
+        :return: [dict] The action
+        """
+        started = time.perf_counter()
+        try:
+            detail = function()
+        except sqlite3.OperationalError as e:
+            return self._record(task, time.perf_counter() - started, str(e))
+        return self._record(task, time.perf_counter() - started, **detail)
+
+    def _checkpoint(self) -> dict:
+        """
+        Checkpoints the WAL without waiting for readers or writers.
+
+        :return: [dict] The frames in the log and checkpointed
+        """
+        busy, frames, checkpointed = self.db.wal_checkpoint()
+        return {
+            "frames": frames,
+            "checkpointed": checkpointed,
+            "busy": bool(busy)
+        }
+
+    def _analyze(self, writes: int) -> dict:
+        """
+        Refreshes the planner statistics.
+
+        :param writes: [int] Changes since the last refresh
+
+        :return: [dict] The changes
+        """
+        self.db.analyze()
+        return {"writes": writes}
+
+    def _optimize(self) -> dict:
+        """
+        Runs PRAGMA optimize.
+
+        :return: [dict] Nothing to report
+        """
+        self.db.optimize()
+        return {}
+
+    def _prune(self, version: int) -> dict:
+        """
+        Deletes the changes past the retention a step at a time, stopping
+        when they are all deleted, a write arrives or the time budget is
+        spent.
+
+        :param version: [int] Data version when maintenance started
+
+        :return: [dict] The changes deleted and whether it finished
+        """
+        deadline = time.perf_counter() + self.vacuum_budget_seconds
+        pruned = 0
+        while True:
+            step = self.db.prune_changes(
+                self.change_log_retention, self.prune_step_rows)
+            pruned += step
+            if step < self.prune_step_rows:
+                return {"changes_pruned": pruned, "complete": True}
+            if (time.perf_counter() >= deadline
+                    or self.db.get_data_version() != version):
+                return {"changes_pruned": pruned, "complete": False}
+
+    def _vacuum(self, version: int) -> dict:
+        """
+        Releases free pages a step at a time, stopping when they are all
+        released, a write arrives or the time budget is spent.
+
+        :param version: [int] Data version when maintenance started
+
+        :return: [dict] The pages released and whether it finished
+        """
+        deadline = time.perf_counter() + self.vacuum_budget_seconds
+        released = 0
+        while True:
+            step = self.db.incremental_vacuum(self.vacuum_step_pages)
+            released += step
+            if step < self.vacuum_step_pages:
+                return {"pages_released": released, "complete": True}
+            if (time.perf_counter() >= deadline
+                    or self.db.get_data_version() != version):
+                return {"pages_released": released, "complete": False}
+
+    def run_once(self, force: bool = False) -> list[dict]:
+        """
+        The run_once function runs the maintenance tasks past their
+        threshold: a WAL checkpoint, ANALYZE, PRAGMA optimize, pruning of the
+        change log and an incremental vacuum.
+
+        :param force: [bool] Run every task whatever its threshold
+
+        :return: [list[dict]] The actions taken
+        """
+        with self._run_lock:
+            actions = []
+            version = self.db.get_data_version()
+            stats = self.db.get_storage_stats()
+            if version < self._analyzed_version:
+                # The change log was reset, e.g. by a restore
+                self._analyzed_version = 0
+
+            if stats["journal_mode"] == "wal" and (
+                    force or stats["wal_pages"] >= self.checkpoint_wal_pages):
+                actions.append(self._timed("checkpoint", self._checkpoint))
+
+            writes = version - self._analyzed_version
+            if force or writes >= self.analyze_writes:
+                action = self._timed(
+                    "analyze", lambda: self._analyze(writes))
+                actions.append(action)
+                if "error" not in action:
+                    self._analyzed_version = version
+
+            if force or version != self._optimized_version:
+                action = self._timed("optimize", self._optimize)
+                actions.append(action)
+                if "error" not in action:
+                    self._optimized_version = version
+
+            if (version - self.db.get_pruned_version()
+                    > self.change_log_retention):
+                actions.append(self._timed(
+                    "prune_changes", lambda: self._prune(version)))
+                # The pruned changes leave free pages behind
+                stats = self.db.get_storage_stats()
+
+            free_fraction = (
+                stats["freelist_count"] / stats["page_count"]
+                if stats["page_count"] else 0.0)
+            if (stats["auto_vacuum"] == AUTO_VACUUM_INCREMENTAL
+                    and stats["freelist_count"]
+                    and (force or free_fraction >= self.vacuum_free_fraction)):
+                actions.append(self._timed(
+                    "incremental_vacuum", lambda: self._vacuum(version)))
+
+            return actions
+
+    def status(self) -> dict:
+        """
+        The status function reports the state of the database and the last
+        maintenance actions. 'vacuum_needed' tells that a database without
+        incremental auto_vacuum is fragmented past the threshold and should
+        be vacuumed by an operator.
+
+        :return: [dict] The status
+        """
+        stats = self.db.get_storage_stats()
+        version = self.db.get_data_version()
+        free_fraction = (
+            stats["freelist_count"] / stats["page_count"]
+            if stats["page_count"] else 0.0)
+        incremental = stats["auto_vacuum"] == AUTO_VACUUM_INCREMENTAL
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "interval_seconds": self.interval,
+            "quiet_seconds": self.quiet_seconds,
+            "writes_since_analyze": max(version - self._analyzed_version, 0),
+            "free_fraction": round(free_fraction, 4),
+            "incremental_vacuum": incremental,
+            "vacuum_needed": (
+                not incremental
+                and free_fraction >= self.vacuum_free_fraction),
+            "change_log_retention": self.change_log_retention,
+            "pruned_version": self.db.get_pruned_version(),
+            "storage": stats,
+            "actions": list(self.history)
+        }
@@ -0,0 +1,144 @@
+import threading
+from collections import defaultdict
+
+from .elevator_database import ElevatorDatabase
+
+# Floors of the previous call a next call can be predicted from
+TRANSITION_SOURCES = ("demand", "destination")
+
+
+class MarkovNextCallModel:
+    def __init__(self) -> None:
+        """
+        The __init__ function creates an empty next-call model.
+        For every hour of the day it counts the transitions from the demand
+        floor and from the destination floor of a call to the demand floor
+        of the next call. Counts and their totals are kept in dicts, so
+        recording a call and reading the probabilities of a floor never
+        touch SQLite.
+
+        :return: [None]
+        """
+        # (source, hour, from_floor) -> {next demand floor: count}
+        self._counts: dict[tuple[str, int, int], dict[int, int]] = (
+            defaultdict(dict))
+        self._totals: dict[tuple[str, int, int], int] = defaultdict(int)
+        self._last_call: tuple[int, int] | None = None
+        self._lock = threading.Lock()
+        self.observations = 0
+
+    @property
+    def last_destination_floor(self) -> int | None:
+        """Destination floor of the last observed call"""
+        return self._last_call[1] if self._last_call else None
+
+    def observe(
+            self,
+            row_id: int,
+            current_floor: int,
+            demand_floor: int,
+            destination_floor: int,
+            call_datetime: str
+    ) -> None:
+        """
+        The observe function records a new call in constant time.
+        Its signature matches ElevatorDatabase insert listeners.
+
+        :param row_id:            [int] Id of the inserted row
+        :param current_floor:     [int] Floor the elevator was on
+        :param demand_floor:      [int] Floor the elevator was called from
+        :param destination_floor: [int] Floor the elevator was sent to
+        :param call_datetime:     [str] Date of the call, in the format
+                                        YYYY-MM-DD HH:MM:SS
+
+        :return: [None]
+        """
+        hour = int(call_datetime[11:13])
+
+        with self._lock:
+            if self._last_call is not None:
+                for source, from_floor in zip(
+                        TRANSITION_SOURCES, self._last_call):
+                    key = (source, hour, from_floor)
+                    next_counts = self._counts[key]
+                    next_counts[demand_floor] = (
+                        next_counts.get(demand_floor, 0) + 1)
+                    self._totals[key] += 1
+
+            self._last_call = (demand_floor, destination_floor)
+            self.observations += 1
+
+    def rebuild(self, db: ElevatorDatabase) -> None:
+        """
+        The rebuild function recomputes the model from the elevator table.
+        The call history is loaded into a NumPy array and the transitions of
+        every hour are counted at once with np.unique.
+
+        :param db: [ElevatorDatabase] The database to read the calls from
+
+        :return: [None]
+        """
+        import numpy as np
+
+        history = db.get_call_history()
+        counts: dict[tuple[str, int, int], dict[int, int]] = defaultdict(dict)
+        totals: dict[tuple[str, int, int], int] = defaultdict(int)
+
+        if len(history) > 1:
+            calls = np.asarray(history, dtype=np.int64)
+            hours = (calls[1:, 2] // 3600) % 24
+            next_demand_floors = calls[1:, 0]
+
+            for column, source in enumerate(TRANSITION_SOURCES):
+                transitions = np.stack(
+                    (hours, calls[:-1, column], next_demand_floors), axis=1)
+                keys, key_counts = np.unique(
+                    transitions, axis=0, return_counts=True)
+
+                for (hour, from_floor, to_floor), count in zip(
+                        keys.tolist(), key_counts.tolist()):
+                    key = (source, hour, from_floor)
+                    counts[key][to_floor] = count
+                    totals[key] += count
+
+        with self._lock:
+            self._counts = counts
+            self._totals = totals
+            self._last_call = tuple(history[-1][:2]) if history else None
+            self.observations = len(history)
+
+    def probabilities(
+            self,
+            hour: int,
+            floor: int,
+            source: str = "destination"
+    ) -> tuple[dict[int, float], int]:
+        """
+        The probabilities function returns the probability of each floor
+        being the demand floor of the next call.
+
+        :param hour:   [int] Hour of the day of the next call
+        :param floor:  [int] Demand or destination floor of the last call
+        :param source: [str] 'demand' or 'destination', which floor of the
+                             last call is given
+
+        :return: [tuple[dict[int, float], int]] The probabilities by floor
+                                                and the number of
+                                                transitions they are based
+                                                on
+        """
+        if source not in TRANSITION_SOURCES:
+            raise ValueError(
+                f"'source' must be one of: {', '.join(TRANSITION_SOURCES)}")
+
+        key = (source, hour, floor)
+        with self._lock:
+            total = self._totals.get(key, 0)
+            next_counts = dict(self._counts.get(key, {}))
+
+        if not total:
+            return {}, 0
+        return {
+            next_floor: count / total
+            for next_floor, count in sorted(next_counts.items())
+        }, total
@@ -0,0 +1,155 @@
+import os
+import atexit
+import sqlite3
+import threading
+import time
+from contextlib import nullcontext
+from typing import ContextManager
+
+from .elevator_database import ElevatorDatabase
+
+
+class MemoryElevatorDatabase(ElevatorDatabase):
+    def __init__(
+            self,
+            checkpoint_path: str | None = None,
+            checkpoint_interval: float | None = None,
+            compact: bool = True
+    ) -> None:
+        """
+        The __init__ function sets up a RAM-backed database.
+        A single shared connection to an in-memory SQLite database is kept
+        for the lifetime of the instance, so data survives between queries.
+        Every query holds a lock on that connection, which serializes the
+        writers. When checkpoint_path is given the database is loaded from it
+        on start and written back to it every checkpoint_interval seconds
+        and on shutdown, bounding data loss to one interval.
+
+        :param checkpoint_path:     [str | None] File used to persist the
+                                                 database
+        :param checkpoint_interval: [float | None] Seconds between automatic
+                                                   checkpoints. None disables
+                                                   them
+        :param compact:             [bool] Use the compact STRICT schema
+
+        :return: [None]
+        """
+        super().__init__(":memory:", compact)
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.last_checkpoint: float | None = None
+        self.last_checkpoint_duration: float | None = None
+
+        self._shared_connection = sqlite3.connect(
+            ":memory:", check_same_thread=False)
+        self._lock = threading.RLock()
+        self._checkpointed_changes = 0
+        self._stop_event = threading.Event()
+        self._checkpoint_thread: threading.Thread | None = None
+
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            self.restore(checkpoint_path)
+            self._checkpointed_changes = self._shared_connection.total_changes
+
+        if checkpoint_path and checkpoint_interval:
+            self._checkpoint_thread = threading.Thread(
+                target=self._checkpoint_loop,
+                name="elevator-checkpoint",
+                daemon=True
+            )
+            self._checkpoint_thread.start()
+
+        atexit.register(self.shutdown)
+
+    def connect(self) -> None:
+        """Borrow the shared connection, waiting for the current holder"""
+        self._lock.acquire()
+        self.connection = self._shared_connection
+        self.cursor = self.connection.cursor()
+
+    def close_connection(self) -> None:
+        """Give the shared connection back without closing it"""
+        if self.connection:
+            self.cursor.close()
+            self.connection = None
+            self.cursor = None
+            self._lock.release()
+
+    def read_snapshot(self) -> ContextManager["MemoryElevatorDatabase"]:
+        """
+        The read_snapshot function returns the database itself: an
+        in-memory database has no WAL, its reads go through the shared
+        connection.
+
+        :return: [ContextManager[MemoryElevatorDatabase]] The database
+        """
+        return nullcontext(self)
+
+    def has_pending_changes(self) -> bool:
+        """
+        The has_pending_changes function checks whether there were writes
+        since the last checkpoint.
+
+        :return: [bool] True if a checkpoint would persist new data
+        """
+        return (
+            self._shared_connection.total_changes
+            != self._checkpointed_changes
+        )
+
+    def checkpoint(self, force: bool = False) -> bool:
+        """
+        The checkpoint function writes the in-memory database to
+        checkpoint_path in a single backup step.
+
+        :param force: [bool] Write the checkpoint even without new changes
+
+        :return: [bool] True if a checkpoint was written
+        """
+        if not self.checkpoint_path:
+            return False
+
+        with self._lock:
+            if not force and not self.has_pending_changes():
+                return False
+
+            started = time.perf_counter()
+            self.snapshot(self.checkpoint_path, pages=-1)
+            self._checkpointed_changes = self._shared_connection.total_changes
+
+        self.last_checkpoint = time.time()
+        self.last_checkpoint_duration = time.perf_counter() - started
+        return True
+
+    def _checkpoint_loop(self) -> None:
+        """
+        Background loop writing a checkpoint every checkpoint_interval
+        seconds until shutdown.
+
+        :return: [None]
+        """
+        while not self._stop_event.wait(self.checkpoint_interval):
+            try:
+                self.checkpoint()
+            except Exception as e:
+                print(f"Error while checkpointing the database: {e}")
+
+    def shutdown(self) -> None:
+        """
+        The shutdown function stops the checkpoint thread, writes a last
+        checkpoint and closes the shared connection.
+        Calling it more than once has no effect.
+
+        :return: [None]
+        """
+        if self._stop_event.is_set():
+            return
+
+        self._stop_event.set()
+        if self._checkpoint_thread:
+            self._checkpoint_thread.join()
+
+        self.checkpoint()
+        with self._lock:
+            self._shared_connection.close()
+        atexit.unregister(self.shutdown)
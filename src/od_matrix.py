@@ -0,0 +1,116 @@
+import threading
+from typing import Any, Iterable
+
+from .elevator_database import ElevatorDatabase
+
+HOURS_PER_DAY = 24
+DAYS_PER_WEEK = 7
+
+
+def build_od_cube(counts: list[tuple[int, int, int, int, int]]) -> tuple:
+    """
+    The build_od_cube function builds the origin-destination counts of every
+    hour of the week: an array indexed by weekday, hour, demand floor and
+    destination floor. The grouped counts are loaded into typed arrays and
+    summed into the cube with one weighted bincount.
+
+    :param counts: [list[tuple[int, int, int, int, int]]] Weekday, hour,
+                                                          demand floor,
+                                                          destination floor
+                                                          and number of
+                                                          calls, as returned
+                                                          by get_od_counts
+
+    :return: [tuple] The sorted floors, as a NumPy array, and the cube, or
+                     None for both if there are no calls
+    """
+    import numpy as np
+
+    if not counts:
+        return None, None
+
+    columns = np.asarray(counts, dtype=np.int64).reshape(-1, 5)
+    floors = np.unique(columns[:, 2:4])
+    size = len(floors)
+    demand = np.searchsorted(floors, columns[:, 2])
+    destination = np.searchsorted(floors, columns[:, 3])
+    cells = ((columns[:, 0] * HOURS_PER_DAY + columns[:, 1]) * size
+             + demand) * size + destination
+
+    cube = np.bincount(
+        cells,
+        weights=columns[:, 4],
+        minlength=DAYS_PER_WEEK * HOURS_PER_DAY * size * size
+    ).astype(np.int64)
+    return floors, cube.reshape(DAYS_PER_WEEK, HOURS_PER_DAY, size, size)
+
+
+class ODMatrix:
+    def __init__(self) -> None:
+        """
+        The __init__ function creates the origin-destination matrix, whose
+        counts by hour of the week are cached by data version. Any slice by
+        hours and weekdays is then a sum over the cached cube.
+
+        :return: [None]
+        """
+        self._floors: Any = None
+        self._cube: Any = None
+        self._data_version: int | None = None
+        self._lock = threading.Lock()
+
+    def _get_cube(self, db: ElevatorDatabase) -> tuple:
+        """
+        Returns the floors and the cube, rebuilding them when the data
+        changed.
+
+        :param db: [ElevatorDatabase] The database with the calls
+
+        :return: [tuple] The floors and the cube, None for both if there are
+                         no calls
+        """
+        data_version = db.get_data_version()
+        with self._lock:
+            if data_version == self._data_version:
+                return self._floors, self._cube
+
+        floors, cube = build_od_cube(db.get_od_counts())
+        with self._lock:
+            self._floors, self._cube = floors, cube
+            self._data_version = data_version
+        return floors, cube
+
+    def matrix(
+            self,
+            db: ElevatorDatabase,
+            hours: Iterable[int] | None = None,
+            weekdays: Iterable[int] | None = None
+    ) -> dict:
+        """
+        The matrix function returns the calls between every demand floor and
+        destination floor, optionally only those made in some hours of the
+        day or days of the week.
+
+        :param db:       [ElevatorDatabase] The database with the calls
+        :param hours:    [Iterable[int] | None] Hours of the day, 0 to 23
+                                                (default: all)
+        :param weekdays: [Iterable[int] | None] Days of the week, 0 is
+                                                Monday (default: all)
+
+        :return: [dict] The floors, the matrix with a row per demand floor
+                        and a column per destination floor, and the total
+        """
+        floors, cube = self._get_cube(db)
+        if cube is None:
+            return {"floors": [], "matrix": [], "total": 0}
+
+        if weekdays is not None:
+            cube = cube[sorted(set(weekdays))]
+        if hours is not None:
+            cube = cube[:, sorted(set(hours))]
+        matrix = cube.sum(axis=(0, 1))
+        return {
+            "floors": floors.tolist(),
+            "matrix": matrix.tolist(),
+            "total": int(matrix.sum())
+        }
@@ -0,0 +1,138 @@
+import threading
+from typing import Any
+
+from .elevator_database import ElevatorDatabase
+
+MINUTES_PER_WEEK = 7 * 24 * 60
+# Minutes between 1970-01-01 (a Thursday) and the start of its week
+EPOCH_WEEK_OFFSET_MINUTES = 3 * 24 * 60
+
+
+def minute_of_week(epochs: Any) -> Any:
+    """
+    The minute_of_week function returns the minutes elapsed since Monday
+    00:00 for epoch seconds, as a NumPy array or int.
+
+    :param epochs: [Any] Epoch seconds
+
+    :return: [Any] The minutes of the week
+    """
+    return (epochs // 60 + EPOCH_WEEK_OFFSET_MINUTES) % MINUTES_PER_WEEK
+
+
+def build_profile(
+        history: list[tuple[int, int, int]],
+        step_minutes: int
+) -> Any:
+    """
+    The build_profile function computes the recommended resting floor of
+    every slot of the week: the floor most calls come from in that slot.
+    Demand is counted for every (slot, floor) pair with one bincount.
+    Slots without calls fall back to the busiest floor of the same hour
+    of the day and then to the busiest floor overall.
+
+    :param history:      [list[tuple[int, int, int]]] Demand floor,
+                                                      destination floor and
+                                                      epoch seconds of each
+                                                      call
+    :param step_minutes: [int] Length of the slots
+
+    :return: [Any] A NumPy array with the floor of each slot of the week,
+                   or None if there are no calls
+    """
+    import numpy as np
+
+    if not history:
+        return None
+
+    calls = np.asarray(history, dtype=np.int64).reshape(-1, 3)
+    floors, floor_indexes = np.unique(calls[:, 0], return_inverse=True)
+    slots_per_week = -(-MINUTES_PER_WEEK // step_minutes)
+    minutes = minute_of_week(calls[:, 2])
+
+    demand = np.bincount(
+        minutes // step_minutes * len(floors) + floor_indexes,
+        minlength=slots_per_week * len(floors)
+    ).reshape(slots_per_week, len(floors))
+
+    hourly_demand = np.bincount(
+        minutes // 60 % 24 * len(floors) + floor_indexes,
+        minlength=24 * len(floors)
+    ).reshape(24, len(floors))
+    hourly_floors = hourly_demand.argmax(axis=1)
+    hourly_floors[hourly_demand.sum(axis=1) == 0] = (
+        hourly_demand.sum(axis=0).argmax())
+
+    slot_hours = np.arange(slots_per_week) * step_minutes // 60 % 24
+    profile = np.where(
+        demand.sum(axis=1) > 0,
+        demand.argmax(axis=1),
+        hourly_floors[slot_hours]
+    )
+    return floors[profile]
+
+
+class RestingScheduler:
+    def __init__(self) -> None:
+        """
+        The __init__ function creates the scheduler, which keeps the weekly
+        profiles cached by data version and slot length.
+
+        :return: [None]
+        """
+        self._profiles: dict[int, Any] = {}
+        self._data_version: int | None = None
+        self._lock = threading.Lock()
+
+    def _get_profile(self, db: ElevatorDatabase, step_minutes: int) -> Any:
+        """
+        Returns the weekly profile, rebuilding it when the data changed.
+
+        :param db:           [ElevatorDatabase] The database with the calls
+        :param step_minutes: [int] Length of the slots
+
+        :return: [Any] The floor of each slot of the week, or None
+        """
+        data_version = db.get_data_version()
+        with self._lock:
+            if data_version != self._data_version:
+                self._profiles = {}
+                self._data_version = data_version
+            if step_minutes in self._profiles:
+                return self._profiles[step_minutes]
+
+        profile = build_profile(db.get_call_history(), step_minutes)
+        with self._lock:
+            if data_version == self._data_version:
+                self._profiles[step_minutes] = profile
+        return profile
+
+    def schedule(
+            self,
+            db: ElevatorDatabase,
+            start: int,
+            end: int,
+            step_minutes: int
+    ) -> list[int] | None:
+        """
+        The schedule function returns the recommended resting floor of every
+        slot between start and end, looked up in the weekly profile for all
+        the slots at once.
+
+        :param db:           [ElevatorDatabase] The database with the calls
+        :param start:        [int] Epoch seconds of the first slot
+        :param end:          [int] Epoch seconds where the schedule ends
+                                   (exclusive)
+        :param step_minutes: [int] Length of the slots
+
+        :return: [list[int] | None] The floor of each slot, or None if there
+                                    are no calls to learn from
+        """
+        import numpy as np
+
+        profile = self._get_profile(db, step_minutes)
+        if profile is None:
+            return None
+
+        slot_starts = np.arange(start, end, step_minutes * 60, dtype=np.int64)
+        return profile[minute_of_week(slot_starts) // step_minutes].tolist()
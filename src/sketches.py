@@ -0,0 +1,966 @@
+import json
+import math
+import os
+import threading
+from typing import Any, Iterable
+
+from .db_inteface import DatabaseInterface
+from .elevator_database import to_epoch
+
+MASK_64 = (1 << 64) - 1
+# Floors are packed in the low and high 32 bits of the key of a pair
+FLOOR_BITS = 32
+FLOOR_MASK = (1 << FLOOR_BITS) - 1
+# Version of the serialized sketches
+SKETCH_FORMAT = 1
+
+
+def mix(value: int) -> int:
+    """
+    Hashes an integer key into 64 bits (splitmix64 finalizer), the same on
+    every process and platform, unlike the builtin hash.
+
+    :param value: [int] The key
+
+    :return: [int] The 64-bit hash
+    """
+    value = (value + 0x9E3779B97F4A7C15) & MASK_64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return value ^ (value >> 31)
+
+
+def mix_array(values: Any) -> Any:
+    """
+    Hashes an array of integer keys, giving the same hashes as mix.
+
+    :param values: [np.ndarray] The keys
+
+    :return: [np.ndarray] The 64-bit hashes, as uint64
+    """
+    import numpy as np
+
+    values = np.asarray(values).astype(np.uint64)
+    values = values + np.uint64(0x9E3779B97F4A7C15)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(
+        0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(
+        0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def pair_key(demand_floor: int, destination_floor: int) -> int:
+    """
+    Packs a (demand floor, destination floor) pair into one integer key.
+
+    :param demand_floor:      [int] Floor the elevator was called from
+    :param destination_floor: [int] Floor the elevator was sent to
+
+    :return: [int] The key
+    """
+    return ((demand_floor & FLOOR_MASK) << FLOOR_BITS) | (
+        destination_floor & FLOOR_MASK)
+
+
+def unpack_pair(key: int) -> tuple[int, int]:
+    """
+    Unpacks a key made by pair_key.
+
+    :param key: [int] The key
+
+    :return: [tuple[int, int]] The demand and destination floors
+    """
+    def signed(value: int) -> int:
+        return value - (1 << FLOOR_BITS) if value >> 31 else value
+
+    return signed(key >> FLOOR_BITS), signed(key & FLOOR_MASK)
+
+
+class CountMinSketch:
+    def __init__(self, width: int = 2048, depth: int = 4) -> None:
+        """
+        The __init__ function creates an empty count-min sketch, estimating
+        the frequency of any key in fixed memory. Estimates never undercount
+        and overcount by at most e / width of the total, with probability
+        1 - e^-depth.
+
+        :param width: [int] Counters per row
+        :param depth: [int] Number of rows, one hash each
+
+        :return: [None]
+        """
+        self.width = width
+        self.depth = depth
+        # Allocated on first use, so NumPy is only imported when needed
+        self._table = None
+        self.total = 0
+
+    @property
+    def table(self) -> Any:
+        """Counters of the sketch, a row per hash"""
+        if self._table is None:
+            import numpy as np
+
+            self._table = np.zeros((self.depth, self.width), dtype=np.int64)
+        return self._table
+
+    @table.setter
+    def table(self, table: Any) -> None:
+        self._table = table
+
+    def _columns(self, hashes: Any) -> Any:
+        """
+        Computes the column of every hash in every row, from two halves of
+        the hash (Kirsch-Mitzenmacher).
+
+        :param hashes: [np.ndarray] The 64-bit hashes
+
+        :return: [np.ndarray] The columns, one row per sketch row
+        """
+        import numpy as np
+
+        low = hashes & np.uint64(0xFFFFFFFF)
+        high = (hashes >> np.uint64(32)) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((low + rows * high) % np.uint64(self.width)).astype(np.int64)
+
+    def add(self, key: int, count: int = 1) -> None:
+        """
+        The add function counts a key.
+
+        :param key:   [int] The key
+        :param count: [int] Number of occurrences
+
+        :return: [None]
+        """
+        import numpy as np
+
+        columns = self._columns(np.array([mix(key)], dtype=np.uint64))
+        self.table[np.arange(self.depth), columns[:, 0]] += count
+        self.total += count
+
+    def add_array(self, keys: Any) -> None:
+        """
+        The add_array function counts many keys at once.
+
+        :param keys: [np.ndarray] The keys, one occurrence each
+
+        :return: [None]
+        """
+        import numpy as np
+
+        if not len(keys):
+            return
+        columns = self._columns(mix_array(keys))
+        for row in range(self.depth):
+            self.table[row] += np.bincount(
+                columns[row], minlength=self.width)
+        self.total += len(keys)
+
+    def estimate(self, key: int) -> int:
+        """
+        The estimate function returns the estimated frequency of a key.
+
+        :param key: [int] The key
+
+        :return: [int] The estimate, never below the real frequency
+        """
+        import numpy as np
+
+        columns = self._columns(np.array([mix(key)], dtype=np.uint64))
+        return int(self.table[np.arange(self.depth), columns[:, 0]].min())
+
+    @property
+    def error(self) -> float:
+        """Largest overcount of the estimates, with high probability"""
+        return math.e / self.width * self.total
+
+    def merge(self, other: "CountMinSketch") -> None:
+        """
+        The merge function adds the counts of a sketch of the same size.
+
+        :param other: [CountMinSketch] The sketch to merge
+
+        :return: [None]
+        """
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("Count-min sketches of different sizes")
+        self.table += other.table
+        self.total += other.total
+
+    def to_dict(self) -> dict:
+        """Serializable state of the sketch"""
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "total": self.total,
+            "table": self.table.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "CountMinSketch":
+        """Sketch from the state given by to_dict"""
+        import numpy as np
+
+        sketch = cls(state["width"], state["depth"])
+        sketch.table = np.asarray(state["table"], dtype=np.int64)
+        sketch.total = state["total"]
+        return sketch
+
+
+class HeavyHitters:
+    def __init__(self, capacity: int = 64) -> None:
+        """
+        The __init__ function creates an empty heavy-hitters summary
+        (Misra-Gries), keeping at most capacity counters. Every key more
+        frequent than total / (capacity + 1) has a counter, and counters
+        undercount by at most that much.
+
+        :param capacity: [int] Number of counters
+
+        :return: [None]
+        """
+        self.capacity = capacity
+        self.counters: dict[int, int] = {}
+        self.total = 0
+
+    def add_counts(self, counts: Iterable[tuple[int, int]]) -> None:
+        """
+        The add_counts function merges exact counts of keys, dropping the
+        smallest counters when there are more than capacity.
+
+        :param counts: [Iterable[tuple[int, int]]] (key, count) pairs
+
+        :return: [None]
+        """
+        counters = self.counters
+        for key, count in counts:
+            counters[key] = counters.get(key, 0) + count
+            self.total += count
+
+        if len(counters) > self.capacity:
+            cut = sorted(counters.values(), reverse=True)[self.capacity]
+            self.counters = {
+                key: count - cut for key, count in counters.items()
+                if count > cut
+            }
+
+    def add(self, key: int) -> None:
+        """
+        The add function counts a key.
+
+        :param key: [int] The key
+
+        :return: [None]
+        """
+        self.add_counts(((key, 1),))
+
+    def top(self, k: int) -> list[tuple[int, int]]:
+        """
+        The top function returns the keys with the largest counters.
+
+        :param k: [int] Number of keys
+
+        :return: [list[tuple[int, int]]] (key, counter) pairs, largest first
+        """
+        return sorted(
+            self.counters.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+    @property
+    def error(self) -> float:
+        """Largest undercount of the counters"""
+        return self.total / (self.capacity + 1)
+
+    def merge(self, other: "HeavyHitters") -> None:
+        """
+        The merge function adds the counters of another summary, keeping
+        the same error bound on the merged total.
+
+        :param other: [HeavyHitters] The summary to merge
+
+        :return: [None]
+        """
+        total = self.total + other.total
+        self.add_counts(other.counters.items())
+        self.total = total
+
+    def to_dict(self) -> dict:
+        """Serializable state of the summary"""
+        return {
+            "capacity": self.capacity,
+            "total": self.total,
+            "counters": [
+                [key, count] for key, count in sorted(self.counters.items())]
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "HeavyHitters":
+        """Summary from the state given by to_dict"""
+        summary = cls(state["capacity"])
+        summary.counters = {key: count for key, count in state["counters"]}
+        summary.total = state["total"]
+        return summary
+
+
+class QuantileSketch:
+    def __init__(
+            self,
+            relative_accuracy: float = 0.01,
+            max_buckets: int = 2048
+    ) -> None:
+        """
+        The __init__ function creates an empty quantile sketch of positive
+        values, counted in buckets of logarithmic width (DDSketch). The
+        quantiles are within relative_accuracy of the real ones. Past
+        max_buckets, the lowest buckets are collapsed together.
+
+        :param relative_accuracy: [float] Relative error of the quantiles
+        :param max_buckets:       [int] Largest number of buckets kept
+
+        :return: [None]
+        """
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def _collapse(self) -> None:
+        """
+        Collapses the lowest buckets into one until at most max_buckets are
+        left.
+
+        :return: [None]
+        """
+        if len(self.buckets) <= self.max_buckets:
+            return
+        indexes = sorted(self.buckets)
+        excess = len(indexes) - self.max_buckets
+        target = indexes[excess]
+        self.buckets[target] += sum(
+            self.buckets.pop(index) for index in indexes[:excess])
+
+    def add(self, value: float) -> None:
+        """
+        The add function counts a value.
+
+        :param value: [float] The value, 0 or more
+
+        :return: [None]
+        """
+        self.count += 1
+        if value <= 0:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self._collapse()
+
+    def add_array(self, values: Any) -> None:
+        """
+        The add_array function counts many values at once.
+
+        :param values: [np.ndarray] The values, 0 or more
+
+        :return: [None]
+        """
+        import numpy as np
+
+        values = np.asarray(values, dtype=np.float64)
+        positive = values[values > 0]
+        self.count += len(values)
+        self.zero_count += len(values) - len(positive)
+        if not len(positive):
+            return
+
+        indexes, counts = np.unique(
+            np.ceil(np.log(positive) / self._log_gamma).astype(np.int64),
+            return_counts=True)
+        for index, count in zip(indexes.tolist(), counts.tolist()):
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self._collapse()
+
+    def quantile(self, fraction: float) -> float | None:
+        """
+        The quantile function returns the estimated value at a fraction of
+        the sorted values.
+
+        :param fraction: [float] Between 0 and 1, e.g. 0.99
+
+        :return: [float | None] The value, None without values
+        """
+        if not self.count:
+            return None
+
+        rank = fraction * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """
+        The merge function adds the values of a sketch of the same accuracy.
+
+        :param other: [QuantileSketch] The sketch to merge
+
+        :return: [None]
+        """
+        if self.relative_accuracy != other.relative_accuracy:
+            raise ValueError("Quantile sketches of different accuracies")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self._collapse()
+
+    def to_dict(self) -> dict:
+        """Serializable state of the sketch"""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "max_buckets": self.max_buckets,
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "buckets": [
+                [index, count]
+                for index, count in sorted(self.buckets.items())
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "QuantileSketch":
+        """Sketch from the state given by to_dict"""
+        sketch = cls(state["relative_accuracy"], state["max_buckets"])
+        sketch.buckets = {index: count for index, count in state["buckets"]}
+        sketch.zero_count = state["zero_count"]
+        sketch.count = state["count"]
+        return sketch
+
+
+class HyperLogLog:
+    def __init__(self, precision: int = 12) -> None:
+        """
+        The __init__ function creates an empty HyperLogLog, estimating the
+        number of distinct keys in 2^precision one-byte registers, with a
+        standard error of 1.04 / sqrt(2^precision).
+
+        :param precision: [int] Bits of the hash choosing the register
+
+        :return: [None]
+        """
+        self.precision = precision
+        # Allocated on first use, so NumPy is only imported when needed
+        self._registers = None
+
+    @property
+    def registers(self) -> Any:
+        """Registers of the HyperLogLog"""
+        if self._registers is None:
+            import numpy as np
+
+            self._registers = np.zeros(1 << self.precision, dtype=np.uint8)
+        return self._registers
+
+    @registers.setter
+    def registers(self, registers: Any) -> None:
+        self._registers = registers
+
+    def add(self, key: int) -> None:
+        """
+        The add function counts a key.
+
+        :param key: [int] The key
+
+        :return: [None]
+        """
+        hashed = mix(key)
+        rest_bits = 64 - self.precision
+        index = hashed >> rest_bits
+        rank = rest_bits - (hashed & ((1 << rest_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def add_array(self, keys: Any) -> None:
+        """
+        The add_array function counts many keys at once.
+
+        :param keys: [np.ndarray] The keys
+
+        :return: [None]
+        """
+        import numpy as np
+
+        if not len(keys):
+            return
+        hashes = mix_array(keys)
+        rest_bits = 64 - self.precision
+        indexes = (hashes >> np.uint64(rest_bits)).astype(np.int64)
+        rest = hashes & np.uint64((1 << rest_bits) - 1)
+
+        # Exact bit length of the rest of the hashes, by binary search
+        bit_length = np.zeros(len(rest), dtype=np.int64)
+        for shift in (32, 16, 8, 4, 2, 1):
+            larger = (rest >> np.uint64(shift)) != 0
+            bit_length[larger] += shift
+            rest[larger] >>= np.uint64(shift)
+        bit_length += (rest != 0)
+
+        ranks = (rest_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, indexes, ranks)
+
+    def estimate(self) -> int:
+        """
+        The estimate function returns the estimated number of distinct keys.
+
+        :return: [int] The estimate
+        """
+        import numpy as np
+
+        registers = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / registers)
+        raw = alpha * registers ** 2 / np.sum(
+            np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * registers and zeros:
+            # Linear counting is more accurate on few keys
+            raw = registers * math.log(registers / zeros)
+        return round(raw)
+
+    @property
+    def error(self) -> float:
+        """Relative standard error of the estimate"""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """
+        The merge function adds the keys of a HyperLogLog of the same
+        precision.
+
+        :param other: [HyperLogLog] The HyperLogLog to merge
+
+        :return: [None]
+        """
+        import numpy as np
+
+        if self.precision != other.precision:
+            raise ValueError("HyperLogLogs of different precisions")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def to_dict(self) -> dict:
+        """Serializable state of the HyperLogLog"""
+        return {
+            "precision": self.precision,
+            "registers": self.registers.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "HyperLogLog":
+        """HyperLogLog from the state given by to_dict"""
+        import numpy as np
+
+        sketch = cls(state["precision"])
+        sketch.registers = np.asarray(state["registers"], dtype=np.uint8)
+        return sketch
+
+
+class CallSketches:
+    def __init__(self) -> None:
+        """
+        The __init__ function creates the empty sketches of the calls:
+        the frequency of every (demand, destination) pair, the busiest
+        pairs, the seconds between consecutive calls and the distinct
+        active hours. Memory stays the same whatever the number of calls.
+
+        :return: [None]
+        """
+        self.pair_frequencies = CountMinSketch()
+        self.busiest_pairs = HeavyHitters()
+        self.inter_arrival = QuantileSketch()
+        self.active_hours = HyperLogLog()
+        self._last_epoch: int | None = None
+        # Largest row id sketched, telling which calls a rebuild already read
+        self._last_row_id = 0
+        # Data version the sketches were built or loaded at, and the
+        # inserts observed since
+        self.data_version: int | None = None
+        self._observed_since_version = 0
+        # Calls observed while a refresh or rebuild reads the table, as
+        # (row id, pair key, epoch), None when none runs
+        self._pending: list[tuple[int, int, int]] | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def observations(self) -> int:
+        """Number of calls sketched"""
+        return self.pair_frequencies.total
+
+    def _add(self, row_id: int, key: int, epoch: int) -> None:
+        """
+        Sketches a call.
+
+        :param row_id: [int] Id of the row
+        :param key:    [int] Key of the (demand, destination) pair
+        :param epoch:  [int] Epoch seconds of the call
+
+        :return: [None]
+        """
+        self._last_row_id = max(self._last_row_id, row_id)
+        self.pair_frequencies.add(key)
+        self.busiest_pairs.add(key)
+        self.active_hours.add(epoch // 3600)
+        # Calls inserted out of order give no inter-arrival time
+        if self._last_epoch is not None and epoch >= self._last_epoch:
+            self.inter_arrival.add(epoch - self._last_epoch)
+        self._last_epoch = epoch
+
+    def _add_batch(self, rows: list[tuple]) -> None:
+        """
+        Sketches a batch of rows at once.
+
+        :param rows: [list[tuple]] Rows of the elevator table, ordered by id
+
+        :return: [None]
+        """
+        import numpy as np
+
+        keys = np.fromiter(
+            (pair_key(row[2], row[3]) for row in rows),
+            dtype=np.uint64, count=len(rows))
+        epochs = np.fromiter(
+            (to_epoch(row[4]) for row in rows),
+            dtype=np.int64, count=len(rows))
+
+        self.pair_frequencies.add_array(keys)
+        unique_keys, counts = np.unique(keys, return_counts=True)
+        self.busiest_pairs.add_counts(
+            zip(unique_keys.tolist(), counts.tolist()))
+        self.active_hours.add_array(epochs // 3600)
+
+        if self._last_epoch is not None:
+            gaps = np.diff(epochs, prepend=self._last_epoch)
+        else:
+            gaps = np.diff(epochs)
+        self.inter_arrival.add_array(gaps[gaps >= 0])
+        self._last_epoch = int(epochs[-1])
+        self._last_row_id = max(self._last_row_id, rows[-1][0])
+
+    def observe(
+            self,
+            row_id: int,
+            current_floor: int,
+            demand_floor: int,
+            destination_floor: int,
+            call_datetime: str
+    ) -> None:
+        """
+        The observe function sketches a new call.
+        Its signature matches ElevatorDatabase insert listeners. While a
+        refresh or rebuild reads the table, the call is also kept, to be
+        replayed on the new sketches if they did not read it.
+
+        :param row_id:            [int] Id of the inserted row
+        :param current_floor:     [int] Floor the elevator was on
+        :param demand_floor:      [int] Floor the elevator was called from
+        :param destination_floor: [int] Floor the elevator was sent to
+        :param call_datetime:     [str] Date of the call, in the format
+                                        YYYY-MM-DD HH:MM:SS
+
+        :return: [None]
+        """
+        key = pair_key(demand_floor, destination_floor)
+        epoch = to_epoch(call_datetime)
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((row_id, key, epoch))
+            self._add(row_id, key, epoch)
+            self._observed_since_version += 1
+
+    @staticmethod
+    def _build(
+            db: DatabaseInterface,
+            batch_size: int = 5000
+    ) -> "CallSketches":
+        """
+        Sketches the elevator table, streaming it in batches.
+
+        :param db:         [DatabaseInterface] The database to read from
+        :param batch_size: [int] Rows sketched at a time
+
+        :return: [CallSketches] The sketches
+        """
+        sketches = CallSketches()
+        batch = []
+        for row in db.iter_rows(batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                sketches._add_batch(batch)
+                batch = []
+        if batch:
+            sketches._add_batch(batch)
+        return sketches
+
+    def _start_pending(self) -> None:
+        """
+        Starts keeping the observed calls, before the table is read.
+
+        :return: [None]
+        """
+        with self._lock:
+            self._pending = []
+
+    def _swap(self, sketches: "CallSketches | None") -> None:
+        """
+        Takes new sketches and replays the calls observed while they were
+        read that they do not hold, then stops keeping the observed calls.
+
+        :param sketches: [CallSketches | None] The new sketches, None to
+                                               keep the current ones
+
+        :return: [None]
+        """
+        with self._lock:
+            pending, self._pending = self._pending or [], None
+            if sketches is None:
+                return
+            self._replace(sketches)
+            for row_id, key, epoch in pending:
+                if row_id > sketches._last_row_id:
+                    self._add(row_id, key, epoch)
+                    self._observed_since_version += 1
+
+    def rebuild(self, db: DatabaseInterface, batch_size: int = 5000) -> None:
+        """
+        The rebuild function recomputes the sketches from the elevator
+        table, streaming it in batches so memory stays bounded. Calls
+        observed meanwhile are replayed on the new sketches unless the scan
+        read them.
+
+        :param db:         [DatabaseInterface] The database to read from
+        :param batch_size: [int] Rows sketched at a time
+
+        :return: [None]
+        """
+        self._start_pending()
+        sketches = None
+        try:
+            sketches = self._build(db, batch_size)
+        finally:
+            self._swap(sketches)
+
+    def _replace(self, other: "CallSketches") -> None:
+        """
+        Takes the sketches of another instance.
+
+        :param other: [CallSketches] The instance
+
+        :return: [None]
+        """
+        self.pair_frequencies = other.pair_frequencies
+        self.busiest_pairs = other.busiest_pairs
+        self.inter_arrival = other.inter_arrival
+        self.active_hours = other.active_hours
+        self._last_epoch = other._last_epoch
+        self._last_row_id = other._last_row_id
+        self.data_version = other.data_version
+        self._observed_since_version = 0
+
+    def merge(self, other: "CallSketches") -> None:
+        """
+        The merge function adds the sketches of another shard. The
+        inter-arrival times between the shards are not known, so none is
+        added.
+
+        :param other: [CallSketches] The sketches of the shard
+
+        :return: [None]
+        """
+        with self._lock:
+            self.pair_frequencies.merge(other.pair_frequencies)
+            self.busiest_pairs.merge(other.busiest_pairs)
+            self.inter_arrival.merge(other.inter_arrival)
+            self.active_hours.merge(other.active_hours)
+            if other._last_epoch is not None:
+                self._last_epoch = max(
+                    self._last_epoch or other._last_epoch, other._last_epoch)
+            self._last_row_id = max(self._last_row_id, other._last_row_id)
+
+    def pair_count(
+            self,
+            demand_floor: int,
+            destination_floor: int
+    ) -> int:
+        """
+        The pair_count function returns the estimated number of calls from
+        a demand floor to a destination floor.
+
+        :param demand_floor:      [int] Floor the elevator was called from
+        :param destination_floor: [int] Floor the elevator was sent to
+
+        :return: [int] The estimate, never below the real count
+        """
+        with self._lock:
+            return self.pair_frequencies.estimate(
+                pair_key(demand_floor, destination_floor))
+
+    def summary(self, top: int, quantiles: list[float]) -> dict:
+        """
+        The summary function reports the busiest pairs, the inter-arrival
+        quantiles and the distinct active hours, with their error bounds.
+
+        :param top:       [int] Number of busiest pairs
+        :param quantiles: [list[float]] Fractions of the inter-arrival times
+
+        :return: [dict] The summary
+        """
+        with self._lock:
+            busiest_pairs = []
+            for key, min_count in self.busiest_pairs.top(top):
+                demand_floor, destination_floor = unpack_pair(key)
+                busiest_pairs.append({
+                    "demand_floor": demand_floor,
+                    "destination_floor": destination_floor,
+                    "count": self.pair_frequencies.estimate(key),
+                    "min_count": min_count
+                })
+
+            return {
+                "observations": self.observations,
+                "busiest_pairs": busiest_pairs,
+                "busiest_pairs_error": round(self.busiest_pairs.error, 3),
+                "pair_count_error": round(self.pair_frequencies.error, 3),
+                "inter_arrival_seconds": {
+                    f"{fraction:g}": self.inter_arrival.quantile(fraction)
+                    for fraction in quantiles
+                },
+                "inter_arrival_relative_error":
+                    self.inter_arrival.relative_accuracy,
+                "distinct_active_hours": self.active_hours.estimate(),
+                "distinct_active_hours_error": round(
+                    self.active_hours.error, 4)
+            }
+
+    def to_dict(self) -> dict:
+        """Serializable state of the sketches"""
+        with self._lock:
+            return {
+                "format": SKETCH_FORMAT,
+                "pair_frequencies": self.pair_frequencies.to_dict(),
+                "busiest_pairs": self.busiest_pairs.to_dict(),
+                "inter_arrival": self.inter_arrival.to_dict(),
+                "active_hours": self.active_hours.to_dict(),
+                "last_epoch": self._last_epoch,
+                "last_row_id": self._last_row_id
+            }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "CallSketches":
+        """Sketches from the state given by to_dict"""
+        if state.get("format") != SKETCH_FORMAT:
+            raise ValueError("Unsupported sketch format")
+        sketches = cls()
+        sketches.pair_frequencies = CountMinSketch.from_dict(
+            state["pair_frequencies"])
+        sketches.busiest_pairs = HeavyHitters.from_dict(state["busiest_pairs"])
+        sketches.inter_arrival = QuantileSketch.from_dict(
+            state["inter_arrival"])
+        sketches.active_hours = HyperLogLog.from_dict(state["active_hours"])
+        sketches._last_epoch = state["last_epoch"]
+        sketches._last_row_id = state.get("last_row_id", 0)
+        return sketches
+
+    def save(self, path: str, data_version: int | None = None) -> None:
+        """
+        The save function writes the sketches to a JSON file, replacing it
+        atomically.
+
+        :param path:         [str] Path of the file
+        :param data_version: [int | None] Data version the sketches match
+
+        :return: [None]
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump({"data_version": data_version, **self.to_dict()}, file)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> tuple["CallSketches", int | None]:
+        """
+        The load function reads sketches written by save.
+
+        :param path: [str] Path of the file
+
+        :return: [tuple[CallSketches, int | None]] The sketches and the
+                                                   data version they match
+        """
+        with open(path) as file:
+            state = json.load(file)
+        return cls.from_dict(state), state.get("data_version")
+
+    def refresh(self, db: DatabaseInterface, path: str | None = None) -> bool:
+        """
+        The refresh function loads the sketches saved for the current data
+        version, or rebuilds them from the table and saves them. The table
+        is read from a read snapshot, so the sketches match its data
+        version; calls observed meanwhile are replayed on them unless they
+        already hold them.
+
+        :param db:   [DatabaseInterface] The database to read from
+        :param path: [str | None] Path of the saved sketches, None to only
+                                  rebuild
+
+        :return: [bool] True if the saved sketches were loaded
+        """
+        # Calls are kept from before the snapshot starts, so none falls
+        # between the snapshot and the swap
+        self._start_pending()
+        sketches = None
+        loaded = False
+        try:
+            with db.read_snapshot() as snapshot:
+                data_version = snapshot.get_data_version()
+                if path and os.path.exists(path):
+                    try:
+                        saved, saved_version = CallSketches.load(path)
+                    except (OSError, ValueError, KeyError):
+                        saved_version = None
+                    if saved_version == data_version:
+                        sketches, loaded = saved, True
+
+                if sketches is None:
+                    sketches = self._build(snapshot)
+                    if path:
+                        sketches.save(path, data_version)
+            sketches.data_version = data_version
+        finally:
+            self._swap(sketches)
+        return loaded
+
+    def current_version(self, db: DatabaseInterface) -> int | None:
+        """
+        The current_version function returns the data version the sketches
+        match now: the version they were built or loaded at, moved past the
+        inserts they observed since. The sketches only see inserts, so when
+        any other change was made since, they match no version.
+
+        :param db: [DatabaseInterface] The database they were built from
+
+        :return: [int | None] The data version, or None if the sketches do
+                              not match the database
+        """
+        with self._lock:
+            if self.data_version is None:
+                return None
+            version = self.data_version + self._observed_since_version
+        # Every change bumps the version once, so any other change, or an
+        # insert not observed, makes them differ
+        return version if db.get_data_version() == version else None
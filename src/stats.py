@@ -0,0 +1,17 @@
+import math
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float | None:
+    """
+    The percentile function returns the nearest-rank percentile of sorted
+    values.
+
+    :param sorted_values: [list[float]] The values, in ascending order
+    :param fraction:      [float] The percentile, between 0 and 1
+
+    :return: [float | None] The percentile, or None without values
+    """
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
@@ -0,0 +1,335 @@
+import os
+import glob
+import threading
+import time
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from typing import Any
+
+from .elevator_database import ElevatorDatabase, to_epoch
+
+# Names of the features the resting floor classifier is trained on
+FEATURE_NAMES = ("hour", "weekday", "previous_floor")
+# Prefix of the model artifact files, followed by the data version
+ARTIFACT_PREFIX = "resting_floor_v"
+# Number of artifacts kept on disk, the older ones being deleted
+KEEP_ARTIFACTS = 3
+
+
+def time_features(epochs: Any) -> tuple[Any, Any]:
+    """
+    The time_features function computes the hour of the day and the day of
+    the week (Monday is 0) of epoch seconds, for NumPy arrays or ints.
+
+    :param epochs: [Any] Epoch seconds
+
+    :return: [tuple[Any, Any]] The hours and the weekdays
+    """
+    # 1970-01-01 was a Thursday, 3 days after a Monday
+    return (epochs // 3600) % 24, (epochs // 86400 + 3) % 7
+
+
+def extract_features(history: list[tuple[int, int, int]]) -> tuple[Any, Any]:
+    """
+    The extract_features function builds the training set from the call
+    history: for every call after the first one, the hour, weekday and the
+    floor the elevator was resting on (destination of the previous call),
+    labeled with the floor it was called from.
+
+    :param history: [list[tuple[int, int, int]]] Demand floor, destination
+                                                 floor and epoch seconds of
+                                                 each call, ordered by id
+
+    :return: [tuple[Any, Any]] The features matrix and the labels
+    """
+    import numpy as np
+
+    calls = np.asarray(history, dtype=np.int64).reshape(-1, 3)
+    hours, weekdays = time_features(calls[1:, 2])
+
+    features = np.column_stack((hours, weekdays, calls[:-1, 1]))
+    labels = calls[1:, 0]
+    return features, labels
+
+
+def artifact_path(artifact_dir: str, data_version: int) -> str:
+    """
+    The artifact_path function builds the path of the model artifact
+    trained on a given data version.
+
+    :param artifact_dir: [str] Directory of the artifacts
+    :param data_version: [int] Data version the model was trained on
+
+    :return: [str] The artifact path
+    """
+    return os.path.join(
+        artifact_dir, f"{ARTIFACT_PREFIX}{data_version}.joblib")
+
+
+def artifact_paths(artifact_dir: str) -> list[str]:
+    """
+    The artifact_paths function lists the model artifacts of a directory.
+
+    :param artifact_dir: [str] Directory of the artifacts
+
+    :return: [list[str]] The artifact paths, oldest data version first
+    """
+    paths = glob.glob(
+        os.path.join(artifact_dir, f"{ARTIFACT_PREFIX}*.joblib"))
+    return sorted(
+        paths,
+        key=lambda path: int(
+            os.path.basename(path)[len(ARTIFACT_PREFIX):-len(".joblib")])
+    )
+
+
+def prune_artifacts(
+        artifact_dir: str,
+        current_path: str,
+        keep: int = KEEP_ARTIFACTS
+) -> list[str]:
+    """
+    The prune_artifacts function deletes the artifacts of the oldest data
+    versions, keeping the current one and the latest others up to keep
+    artifacts, so retraining on every new data version does not fill the
+    disk.
+
+    :param artifact_dir: [str] Directory of the artifacts
+    :param current_path: [str] The artifact just saved, always kept
+    :param keep:         [int] Number of artifacts kept, at least 1
+
+    :return: [list[str]] The deleted paths
+    """
+    others = [
+        path for path in artifact_paths(artifact_dir)
+        if os.path.abspath(path) != os.path.abspath(current_path)
+    ]
+    deleted = []
+    for path in others[:max(len(others) - keep + 1, 0)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # Already deleted by another training
+            continue
+        deleted.append(path)
+    return deleted
+
+
+def train_model(
+        history: list[tuple[int, int, int]],
+        data_version: int,
+        artifact_dir: str
+) -> str:
+    """
+    The train_model function trains the resting floor classifier and saves
+    it as a joblib artifact, deleting all but the last KEEP_ARTIFACTS ones.
+    It runs in a worker process, so training never competes with the request
+    workers for the GIL.
+
+    :param history:      [list[tuple[int, int, int]]] The call history
+    :param data_version: [int] Data version of the history
+    :param artifact_dir: [str] Directory of the artifacts
+
+    :return: [str] The artifact path
+    """
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+
+    started = time.perf_counter()
+    features, labels = extract_features(history)
+
+    model = RandomForestClassifier(
+        n_estimators=50, min_samples_leaf=2, random_state=0)
+    model.fit(features, labels)
+
+    path = artifact_path(artifact_dir, data_version)
+    temp_path = f"{path}.tmp"
+    os.makedirs(artifact_dir, exist_ok=True)
+    joblib.dump({
+        "model": model,
+        "data_version": data_version,
+        "samples": len(labels),
+        "trained_at": datetime.now().isoformat(timespec="seconds"),
+        "training_seconds": time.perf_counter() - started
+    }, temp_path)
+    os.replace(temp_path, path)
+    prune_artifacts(artifact_dir, path)
+
+    return path
+
+
+class ModelTrainer:
+    def __init__(
+            self,
+            artifact_dir: str = "./models",
+            executor: Executor | None = None
+    ) -> None:
+        """
+        The __init__ function sets up the training pipeline.
+        Models are trained in a process pool by a background thread and
+        cached as joblib artifacts named after the data version they were
+        trained on; a finished model replaces the served one atomically.
+
+        :param artifact_dir: [str] Directory of the artifacts
+        :param executor:     [Executor | None] Runs train_model. Defaults to
+                                               a single-process pool
+                                               created on first use
+
+        :return: [None]
+        """
+        self.artifact_dir = artifact_dir
+        self.last_error: str | None = None
+        self._executor = executor
+        self._artifact: dict | None = None
+        self._loaded = False
+        self._training: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_training(self) -> bool:
+        """Whether a training is running"""
+        return self._training is not None and self._training.is_alive()
+
+    def _get_executor(self) -> Executor:
+        """
+        Returns the executor, creating the process pool on first use.
+
+        :return: [Executor] The executor
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _load(self, path: str) -> None:
+        """
+        Loads an artifact and swaps it in as the served model.
+
+        :param path: [str] The artifact path
+
+        :return: [None]
+        """
+        import joblib
+
+        artifact = joblib.load(path)
+        with self._lock:
+            self._artifact = artifact
+            self._loaded = True
+
+    def load_latest(self) -> bool:
+        """
+        The load_latest function serves the artifact trained on the most
+        recent data version, if any was saved.
+
+        :return: [bool] True if an artifact was loaded
+        """
+        paths = artifact_paths(self.artifact_dir)
+        with self._lock:
+            self._loaded = True
+        if not paths:
+            return False
+
+        self._load(paths[-1])
+        return True
+
+    def current(self) -> dict | None:
+        """
+        The current function returns the served artifact, loading the latest
+        one from disk on first use.
+
+        :return: [dict | None] The artifact with the model and its metadata
+        """
+        if not self._loaded:
+            self.load_latest()
+        return self._artifact
+
+    def _train(self, db: ElevatorDatabase, data_version: int) -> None:
+        """
+        Background training: reads the call history, trains in the process
+        pool and hot-swaps the new model.
+
+        :param db:           [ElevatorDatabase] The database to train on
+        :param data_version: [int] Data version to train on
+
+        :return: [None]
+        """
+        try:
+            history = db.get_call_history()
+            if len(history) < 2:
+                raise ValueError("Not enough calls to train a model")
+
+            future = self._get_executor().submit(
+                train_model, history, data_version, self.artifact_dir)
+            self._load(future.result())
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+
+    def train_async(self, db: ElevatorDatabase) -> str:
+        """
+        The train_async function starts a training on the current data, in
+        the background. The artifact of the current data version is reused
+        when it already exists.
+
+        :param db: [ElevatorDatabase] The database to train on
+
+        :return: [str] 'cached', 'running' or 'started'
+        """
+        data_version = db.get_data_version()
+
+        artifact = self.current()
+        if artifact and artifact["data_version"] == data_version:
+            return "cached"
+
+        path = artifact_path(self.artifact_dir, data_version)
+        if os.path.exists(path):
+            self._load(path)
+            return "cached"
+
+        with self._lock:
+            if self.is_training:
+                return "running"
+            self._training = threading.Thread(
+                target=self._train,
+                args=(db, data_version),
+                name="elevator-training",
+                daemon=True
+            )
+            self._training.start()
+        return "started"
+
+    def wait(self, timeout: float | None = None) -> None:
+        """
+        The wait function blocks until the running training, if any, ends.
+
+        :param timeout: [float | None] Maximum seconds to wait
+
+        :return: [None]
+        """
+        training = self._training
+        if training is not None:
+            training.join(timeout)
+
+    def predict(
+            self,
+            call_datetime: datetime | str,
+            previous_floor: int
+    ) -> int | None:
+        """
+        The predict function returns the recommended resting floor.
+
+        :param call_datetime:  [datetime | str] Moment of the prediction
+        :param previous_floor: [int] Floor the elevator is resting on
+
+        :return: [int | None] The floor, or None if no model is available
+        """
+        artifact = self.current()
+        if artifact is None:
+            return None
+
+        hour, weekday = time_features(to_epoch(call_datetime))
+        return int(artifact["model"].predict(
+            [[hour, weekday, previous_floor]])[0])
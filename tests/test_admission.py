@@ -0,0 +1,140 @@
+import threading
+import time
+
+from src.admission import (
+    AdmissionController,
+    PRIORITY_BULK,
+    PRIORITY_CALL
+)
+
+
+class TestAdmissionController:
+    @staticmethod
+    def wait_for_queue(controller: AdmissionController, size: int) -> None:
+        """
+        Waits until the given number of requests are queued.
+
+        :param controller: [AdmissionController] The controller
+        :param size:       [int] Number of queued requests to wait for
+
+        :return: [None]
+        """
+        while controller.stats()["queued"] < size:
+            time.sleep(0.001)
+
+    def test_admits_up_to_limit(self) -> None:
+        """
+        Test requests run at once up to the limit, and the next one is shed
+        when nothing can wait.
+        """
+        controller = AdmissionController(max_in_flight=2, max_queue=0)
+
+        assert controller.acquire() == 0.0
+        assert controller.acquire(PRIORITY_BULK) == 0.0
+        assert controller.acquire() is None
+
+        controller.release()
+        assert controller.acquire() == 0.0
+
+        stats = controller.stats()
+        assert stats["in_flight"] == 2
+        assert stats["admitted"] == {"call": 2, "bulk": 1}
+        assert stats["shed"] == {"call": 1, "bulk": 0}
+
+    def test_queue_deadline(self) -> None:
+        """
+        Test a waiting request is shed once its queue deadline passes.
+        """
+        controller = AdmissionController(
+            max_in_flight=1,
+            queue_timeouts={PRIORITY_CALL: 0.05, PRIORITY_BULK: 0.05}
+        )
+        controller.acquire()
+
+        started = time.perf_counter()
+        assert controller.acquire() is None
+        assert time.perf_counter() - started >= 0.05
+        assert controller.stats()["queued"] == 0
+        assert controller.retry_after(PRIORITY_CALL) == 1
+
+    def test_calls_served_before_bulk(self) -> None:
+        """
+        Test a waiting call gets the next free slot before a bulk request
+        that arrived earlier, and its queue time is recorded.
+        """
+        controller = AdmissionController(
+            max_in_flight=1, reserved_call_slots=0)
+        controller.acquire()
+        order = []
+
+        def request(priority: int) -> None:
+            if controller.acquire(priority) is not None:
+                order.append(priority)
+                controller.release(priority)
+
+        bulk = threading.Thread(target=request, args=(PRIORITY_BULK,))
+        bulk.start()
+        self.wait_for_queue(controller, 1)
+        call = threading.Thread(target=request, args=(PRIORITY_CALL,))
+        call.start()
+        self.wait_for_queue(controller, 2)
+
+        controller.release()
+        bulk.join()
+        call.join()
+
+        assert order == [PRIORITY_CALL, PRIORITY_BULK]
+        assert controller.stats()["max_queue_ms"] > 0
+
+    def test_call_evicts_bulk_from_full_queue(self) -> None:
+        """
+        Test a call arriving at a full queue sheds the waiting bulk request
+        instead of being shed itself.
+        """
+        controller = AdmissionController(
+            max_in_flight=1, max_queue=1, reserved_call_slots=0)
+        controller.acquire()
+        results = {}
+
+        def request(priority: int) -> None:
+            results[priority] = controller.acquire(priority)
+            if results[priority] is not None:
+                controller.release(priority)
+
+        bulk = threading.Thread(target=request, args=(PRIORITY_BULK,))
+        bulk.start()
+        self.wait_for_queue(controller, 1)
+        call = threading.Thread(target=request, args=(PRIORITY_CALL,))
+        call.start()
+        bulk.join()
+
+        controller.release()
+        call.join()
+
+        assert results[PRIORITY_BULK] is None
+        assert results[PRIORITY_CALL] is not None
+        assert controller.stats()["shed"] == {"call": 0, "bulk": 1}
+
+    def test_reserved_call_slot(self) -> None:
+        """
+        Test bulk requests cannot take the slot reserved for calls, which
+        a call still gets right away.
+        """
+        controller = AdmissionController(
+            max_in_flight=3,
+            queue_timeouts={PRIORITY_CALL: 0.05, PRIORITY_BULK: 0.05}
+        )
+
+        assert controller.acquire(PRIORITY_BULK) == 0.0
+        assert controller.acquire(PRIORITY_BULK) == 0.0
+        assert controller.acquire(PRIORITY_BULK) is None
+        assert controller.acquire(PRIORITY_CALL) == 0.0
+
+        controller.release(PRIORITY_BULK)
+        assert controller.acquire(PRIORITY_BULK) == 0.0
+
+        stats = controller.stats()
+        assert stats["in_flight"] == 3
+        assert stats["bulk_in_flight"] == 2
+        assert stats["max_bulk_in_flight"] == 2
+        assert stats["shed"] == {"call": 0, "bulk": 1}
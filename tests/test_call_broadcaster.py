@@ -0,0 +1,69 @@
+import threading
+
+from src.call_broadcaster import CallBroadcaster
+
+
+class TestCallBroadcaster:
+    def test_publish_to_all_subscribers(self) -> None:
+        """Publish an event and verify every subscriber receives it"""
+        broadcaster = CallBroadcaster()
+        subscriptions = [broadcaster.subscribe() for _ in range(3)]
+
+        delivered = broadcaster.publish({"id": 1})
+
+        assert delivered == 3
+        for subscription in subscriptions:
+            assert subscription.get(timeout=0) == {"id": 1}
+            assert subscription.get(timeout=0) is None
+
+    def test_slow_consumer_is_dropped(self) -> None:
+        """
+        Fill the buffer of a subscriber and verify it is dropped without
+        affecting the others
+        """
+        broadcaster = CallBroadcaster(buffer_size=2)
+        slow = broadcaster.subscribe()
+        fast = broadcaster.subscribe()
+
+        for event_id in range(3):
+            broadcaster.publish({"id": event_id})
+            fast.get(timeout=0)
+
+        assert slow.dropped is True
+        assert fast.dropped is False
+        assert broadcaster.subscriber_count == 1
+        assert broadcaster.dropped == 1
+        assert broadcaster.published == 3
+
+    def test_concurrent_publishers_count_drops(self) -> None:
+        """
+        Publish from several threads to full subscribers and verify each
+        subscriber is counted as dropped exactly once
+        """
+        broadcaster = CallBroadcaster(buffer_size=1)
+        for _ in range(50):
+            broadcaster.subscribe()
+        broadcaster.publish({"id": 0})
+
+        threads = [
+            threading.Thread(target=broadcaster.publish, args=({"id": 1},))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert broadcaster.subscriber_count == 0
+        assert broadcaster.dropped == 50
+        assert broadcaster.published == 9
+
+    def test_subscriber_limit(self) -> None:
+        """Verify subscriptions are refused once the limit is reached"""
+        broadcaster = CallBroadcaster(max_subscribers=1)
+        subscription = broadcaster.subscribe()
+
+        assert broadcaster.subscribe() is None
+
+        broadcaster.unsubscribe(subscription)
+        assert broadcaster.subscribe() is not None
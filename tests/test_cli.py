@@ -0,0 +1,166 @@
+import gzip
+import io
+import json
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+from src import ElevatorDatabase
+from src.elevator_database import AUTO_VACUUM_INCREMENTAL
+from src.cli import Progress, main
+from src.csv_export import iter_csv
+
+ROWS = [
+    (1, 1, 2, 3, "2024-01-01 10:00:00"),
+    (2, 3, 4, 5, "2024-01-02 10:05:00"),
+    (3, 5, 6, 1, "2024-01-03 10:10:00"),
+]
+
+
+class TestCli:
+    @pytest.fixture
+    def work_dir(self) -> str:
+        """
+        Returns a temporary directory holding a CSV export of ROWS.
+
+        :return: [str] Path of the directory
+        """
+        work_dir = tempfile.mkdtemp()
+        with open(os.path.join(work_dir, "calls.csv"), "w") as file:
+            file.write("".join(iter_csv(ROWS)))
+        return work_dir
+
+    def test_ingest_and_export(
+            self, work_dir: str, capsys: pytest.CaptureFixture) -> None:
+        """
+        Ingest a CSV file into a new database, export it back and verify
+        the rows and the printed result
+        """
+        database = os.path.join(work_dir, "cli.db")
+        csv_path = os.path.join(work_dir, "calls.csv")
+
+        result = main(["--database", database, "ingest", csv_path])
+        assert result["rows"] == 3
+        assert ElevatorDatabase.open(database).get_all_rows() == ROWS
+        assert json.loads(capsys.readouterr().out)["rows"] == 3
+
+        export_path = os.path.join(work_dir, "export.csv.gz")
+        result = main([
+            "--database", database, "export", export_path,
+            "--compression", "gzip", "--start", "2024-01-02 00:00:00"])
+        assert result["rows"] == 2
+        with gzip.open(export_path, "rt", newline="") as file:
+            assert file.read() == "".join(iter_csv(ROWS[1:]))
+
+    def test_ingest_travel_logs(self, work_dir: str) -> None:
+        """Ingest a directory of travel logs"""
+        logs_dir = os.path.join(work_dir, "logs")
+        os.mkdir(logs_dir)
+        with open(os.path.join(logs_dir, "day.json"), "w") as file:
+            json.dump([{
+                "current_floor": 1,
+                "demand_floor": 2,
+                "destination_floor": 5,
+                "call_datetime": "2024-01-01 08:00:00"
+            }], file)
+
+        result = main([
+            "--database", os.path.join(work_dir, "cli.db"),
+            "ingest", logs_dir, "--workers", "1"])
+        assert result["files"] == 1
+        assert result["rows"] == 1
+
+    def test_snapshot_and_reindex(self, work_dir: str) -> None:
+        """Snapshot a database online and rebuild its indexes"""
+        database = os.path.join(work_dir, "cli.db")
+        main(["--database", database, "ingest",
+              os.path.join(work_dir, "calls.csv")])
+
+        snapshot_path = os.path.join(work_dir, "snapshot.db")
+        result = main([
+            "--database", database, "snapshot", snapshot_path,
+            "--pages", "1"])
+        assert result["bytes"] == os.path.getsize(snapshot_path)
+        assert ElevatorDatabase.open(snapshot_path).get_all_rows() == ROWS
+
+        result = main(["--database", database, "reindex"])
+        assert "elevator_call_datetime_idx" in result["indexes"]
+
+    def test_migrate(self, work_dir: str) -> None:
+        """
+        Migrate a database of the text schema to the compact schema and
+        verify the rows are kept
+        """
+        database = os.path.join(work_dir, "legacy.db")
+        legacy = ElevatorDatabase(database, compact=False)
+        legacy.create_table()
+        legacy.insert_calls([row[1:] for row in ROWS])
+
+        result = main(["--database", database, "migrate"])
+        assert result["migrated"] is True
+
+        migrated = ElevatorDatabase.open(database)
+        assert migrated.compact
+        assert migrated.get_all_rows() == ROWS
+
+        assert main(["--database", database, "migrate"])["migrated"] is False
+
+    def test_vacuum(self, work_dir: str) -> None:
+        """
+        Vacuum a database created without incremental auto_vacuum and
+        verify it is converted and its free pages released
+        """
+        database = os.path.join(work_dir, "old.db")
+        with sqlite3.connect(database) as connection:
+            connection.execute("PRAGMA auto_vacuum = NONE")
+            connection.execute("CREATE TABLE old (id INTEGER)")
+        db = ElevatorDatabase.open(database)
+        db.insert_calls([row[1:] for row in ROWS] * 1000)
+        db.delete_all_rows()
+
+        result = main(["--database", database, "vacuum"])
+
+        assert result["pages_released"] > 0
+        assert result["auto_vacuum"] == AUTO_VACUUM_INCREMENTAL
+        assert db.get_storage_stats()["freelist_count"] == 0
+
+    def test_train(self, work_dir: str) -> None:
+        """Train a model offline, then reuse it for the same data"""
+        database = os.path.join(work_dir, "cli.db")
+        model_dir = os.path.join(work_dir, "models")
+        main(["--database", database, "ingest",
+              os.path.join(work_dir, "calls.csv")])
+
+        result = main([
+            "--database", database, "train", "--model-dir", model_dir])
+        assert result["status"] == "trained"
+        assert os.path.exists(result["path"])
+
+        result = main([
+            "--database", database, "train", "--model-dir", model_dir])
+        assert result["status"] == "cached"
+
+    def test_benchmark(self, work_dir: str) -> None:
+        """Verify the benchmark never writes into the given database"""
+        database = os.path.join(work_dir, "cli.db")
+        result = main([
+            "--database", database, "benchmark", "--rows", "500",
+            "--batch-size", "100"])
+
+        assert result["rows"] == 500
+        assert set(result["paths"]) == {
+            "insert_calls", "iter_rows", "get_call_history", "export_csv",
+            "travel_costs"}
+        assert ElevatorDatabase.open(database).get_all_rows() == []
+
+    def test_progress(self) -> None:
+        """Verify progress lines show the count, share and rate"""
+        stream = io.StringIO()
+        progress = Progress("Rows", stream)
+        progress.update(50, 200)
+        progress.finish()
+
+        assert stream.getvalue().startswith("Rows: 50/200 (25%)")
+        assert progress.done == 50
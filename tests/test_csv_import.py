@@ -0,0 +1,112 @@
+import gzip
+import io
+
+import pytest
+
+from src import ElevatorDatabase
+from src.csv_export import compress_chunks, iter_csv
+from src.csv_import import import_csv, main, open_text, read_csv_chunks
+from .conftest import TEST_DATABASE_PATH
+
+ROWS = [
+    (1, 1, 2, 3, "2024-01-01 10:00:00"),
+    (2, 3, 4, 5, "2024-01-01 10:05:00"),
+    (3, 5, 6, 1, "2024-01-01 10:10:00"),
+]
+
+
+class TestCsvImport:
+    @pytest.fixture
+    def db_instance(self) -> ElevatorDatabase:
+        """
+        The db_instance function returns a database with an empty table.
+
+        :return: [ElevatorDatabase] An instance of the class
+        """
+        db_instance = ElevatorDatabase(TEST_DATABASE_PATH)
+        db_instance.recreate_table()
+        return db_instance
+
+    def test_round_trip(self, db_instance: ElevatorDatabase) -> None:
+        """Import an exported file in chunks and verify the rows"""
+        progress = []
+        imported = import_csv(
+            db_instance, io.StringIO("".join(iter_csv(ROWS))), chunk_rows=2,
+            progress=progress.append)
+
+        assert imported == 3
+        assert progress == [2, 3]
+        assert db_instance.get_all_rows() == ROWS
+
+    def test_columns_in_any_order(self) -> None:
+        """Verify columns are matched by name and the id is optional"""
+        lines = io.StringIO(
+            "call_datetime,destination_floor,demand_floor,current_floor\n"
+            "2024-01-01 10:00:00,3,2,1\n"
+            "\n"
+        )
+
+        assert list(read_csv_chunks(lines)) == [
+            [(1, 2, 3, "2024-01-01 10:00:00")]]
+
+    @pytest.mark.parametrize("content, message", [
+        ("", "empty"),
+        ("current_floor,demand_floor,floor\n", "Invalid columns"),
+        ("current_floor,demand_floor,destination_floor,call_datetime\n"
+         "1,2,x,2024-01-01 10:00:00\n", "Line 2"),
+        ("current_floor,demand_floor,destination_floor,call_datetime\n"
+         "1,2,3,2024-01-01\n", "Line 2"),
+        ("current_floor,demand_floor,destination_floor,call_datetime\n"
+         "1,2,3,2024-01-01 10:00:00\n"
+         "1,2,3,2024-13-45 99:99:99\n", "Line 3: 'call_datetime'"),
+    ])
+    def test_invalid_files(self, content: str, message: str) -> None:
+        """Verify invalid files are rejected with a helpful message"""
+        with pytest.raises(ValueError, match=message):
+            list(read_csv_chunks(io.StringIO(content)))
+
+    def test_error_keeps_previous_chunks(
+            self, db_instance: ElevatorDatabase) -> None:
+        """Verify the chunks before an invalid row stay imported"""
+        content = "".join(iter_csv(ROWS)) + "4,1,2,x,2024-01-01 11:00:00\n"
+
+        with pytest.raises(ValueError, match="2 rows imported"):
+            import_csv(db_instance, io.StringIO(content), chunk_rows=2)
+        assert len(db_instance.get_all_rows()) == 2
+
+    def test_compressed_stream(self) -> None:
+        """Decode a gzip stream compressed chunk by chunk"""
+        compressed = b"".join(compress_chunks(iter_csv(ROWS), "gzip"))
+
+        lines = open_text(io.BytesIO(compressed), "gzip")
+
+        assert next(read_csv_chunks(lines)) == [row[1:] for row in ROWS]
+        with pytest.raises(ValueError):
+            open_text(io.BytesIO(compressed), "br")
+
+    @pytest.mark.parametrize("encoding, corrupt", [
+        ("gzip", lambda data: data[:len(data) // 2]),
+        ("gzip", lambda data: data[:10] + b"\x00" * (len(data) - 10)),
+        ("deflate", lambda data: b"not deflate"),
+    ])
+    def test_invalid_compressed_stream(
+            self,
+            db_instance: ElevatorDatabase,
+            encoding: str,
+            corrupt
+    ) -> None:
+        """Reject truncated and corrupted compressed streams"""
+        compressed = b"".join(compress_chunks(iter_csv(ROWS), encoding))
+        lines = open_text(io.BytesIO(corrupt(compressed)), encoding)
+
+        with pytest.raises(ValueError, match="Invalid compressed data"):
+            import_csv(db_instance, lines)
+
+    def test_command(self, db_instance: ElevatorDatabase, tmp_path) -> None:
+        """Import a gzip file from the command line"""
+        path = str(tmp_path / "elevator_data.csv.gz")
+        with gzip.open(path, "wt", newline="") as file:
+            file.writelines(iter_csv(ROWS))
+
+        assert main([path, "--database", TEST_DATABASE_PATH]) == 3
+        assert db_instance.get_all_rows() == ROWS
@@ -1,9 +1,12 @@
 import os
 import json
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
 from src import DataGenerator, ElevatorDatabase, ElevatorColumns
+from src.data_generator import parse_travel_file
 from .conftest import TEST_DATABASE_PATH
 
 
@@ -53,3 +56,87 @@ class TestDataGenerator:
             assert rows[i][2] == travel[ElevatorColumns.DEMAND_FLOOR]
             assert rows[i][3] == travel[ElevatorColumns.DESTINATION_FLOOR]
             assert rows[i][4] == travel[ElevatorColumns.CALL_DATETIME]
+
+    @staticmethod
+    def write_travels(path: str, floors: list, day: int) -> None:
+        """
+        Writes a travel log with one travel per demand floor.
+
+        :param path:   [str] Path of the JSON file
+        :param floors: [list] Demand floor of each travel
+        :param day:    [int] Day of January 2024 of the travels
+
+        :return: [None]
+        """
+        with open(path, "w") as file:
+            json.dump([
+                {
+                    ElevatorColumns.CURRENT_FLOOR: 1,
+                    ElevatorColumns.DEMAND_FLOOR: floor,
+                    ElevatorColumns.DESTINATION_FLOOR: 1,
+                    ElevatorColumns.CALL_DATETIME:
+                        f"2024-01-{day:02d} 10:00:{position:02d}"
+                }
+                for position, floor in enumerate(floors)
+            ], file)
+
+    def test_parse_travel_file(self, tmp_path) -> None:
+        """Verify invalid travels are reported with their position"""
+        path = str(tmp_path / "travels.json")
+        self.write_travels(path, [2, "3", 4], day=1)
+
+        calls, errors = parse_travel_file(path)
+
+        assert len(calls) == 2
+        assert calls[0] == (1, 2, 1, "2024-01-01 10:00:00")
+        assert len(errors) == 1 and errors[0].startswith("Travel 1:")
+        assert parse_travel_file(str(tmp_path / "missing.json"))[1]
+
+    def test_ingest_directory(
+            self, db_instance: ElevatorDatabase, tmp_path) -> None:
+        """
+        Ingest a directory of daily logs in a process pool and verify the
+        rows are written in file order and invalid files are rejected
+        """
+        db_instance.recreate_table()
+        logs = tmp_path / "logs"
+        logs.mkdir()
+        self.write_travels(str(logs / "2024-01-02.json"), [4, 5], day=2)
+        self.write_travels(str(logs / "2024-01-01.json"), [2, 3], day=1)
+        self.write_travels(str(logs / "2024-01-03.json"), [6, None], day=3)
+
+        summary = DataGenerator.ingest(
+            db_instance, str(logs), workers=2, batch_size=3)
+
+        assert summary["files"] == 2
+        assert summary["rows"] == 4
+        assert list(summary["rejected"]) == [
+            str(logs / "2024-01-03.json")]
+        assert [row[2] for row in db_instance.get_all_rows()] == [2, 3, 4, 5]
+
+    def test_ingest_resumes(
+            self, db_instance: ElevatorDatabase, tmp_path) -> None:
+        """
+        Verify files recorded in the progress file are not ingested again,
+        and a fixed file is ingested on the next run
+        """
+        db_instance.recreate_table()
+        progress_path = str(tmp_path / "progress.json")
+        for day in (1, 2):
+            self.write_travels(
+                str(tmp_path / f"day-{day}.json"), [day + 1], day=day)
+        self.write_travels(str(tmp_path / "day-3.json"), ["x"], day=3)
+        pattern = str(tmp_path / "day-*.json")
+
+        with ThreadPoolExecutor() as executor:
+            first = DataGenerator.ingest(
+                db_instance, pattern, progress_path, executor=executor)
+            self.write_travels(str(tmp_path / "day-3.json"), [4], day=3)
+            second = DataGenerator.ingest(
+                db_instance, pattern, progress_path, executor=executor)
+
+        assert (first["files"], first["skipped"]) == (2, 0)
+        assert (second["files"], second["skipped"]) == (1, 2)
+        assert [row[2] for row in db_instance.get_all_rows()] == [2, 3, 4]
+        with open(progress_path, "r") as file:
+            assert len(json.load(file)["done"]) == 3
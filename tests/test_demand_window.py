@@ -0,0 +1,95 @@
+from datetime import datetime
+
+import pytest
+
+from src import ElevatorDatabase
+from src.demand_window import DemandWindow
+from .conftest import TEST_DATABASE_PATH
+
+NOW = datetime(2024, 1, 1, 9, 0, 0)
+
+
+class TestDemandWindow:
+    @pytest.fixture
+    def db_instance(self) -> ElevatorDatabase:
+        """
+        Returns an ElevatorDatabase with a recreated table and calls made
+        over the last two hours before NOW.
+
+        :return: [ElevatorDatabase] An instance of the class
+        """
+        db_instance = ElevatorDatabase(TEST_DATABASE_PATH)
+        db_instance.recreate_table()
+
+        db_instance.insert_call(1, 1, 5, "2024-01-01 07:30:00")
+        db_instance.insert_call(5, 2, 1, "2024-01-01 08:10:00")
+        db_instance.insert_call(1, 3, 1, "2024-01-01 08:50:00")
+        db_instance.insert_call(1, 3, 6, "2024-01-01 08:55:30")
+        db_instance.insert_call(6, 1, 4, "2024-01-01 08:59:59")
+
+        return db_instance
+
+    def test_rebuild(self, db_instance: ElevatorDatabase) -> None:
+        """Rebuild the counters from the tail of the table"""
+        window = DemandWindow()
+        window.rebuild(db_instance, now=NOW)
+
+        # The call of 07:30 is older than the longest window
+        assert window.observations == 4
+        assert window.counts(60, now=NOW) == {1: 1, 2: 1, 3: 2}
+        assert window.counts(15, now=NOW) == {1: 1, 3: 2}
+        # Windows are whole buckets, the one of NOW included
+        assert window.counts(6, now=NOW) == {1: 1, 3: 1}
+        assert window.counts(2, now=NOW) == {1: 1}
+        assert window.counts(1, now=NOW) == {}
+
+    def test_observe_matches_rebuild(
+            self, db_instance: ElevatorDatabase) -> None:
+        """
+        Verify the counters updated on every insert, including a late call,
+        match counters rebuilt from the table
+        """
+        live_window = DemandWindow()
+        live_window.rebuild(db_instance, now=NOW)
+        db_instance.add_insert_listener(live_window.observe)
+
+        db_instance.insert_call(4, 4, 2, "2024-01-01 09:01:00")
+        db_instance.insert_call(2, 6, 1, "2024-01-01 08:58:00")
+
+        later = datetime(2024, 1, 1, 9, 2, 0)
+        rebuilt_window = DemandWindow()
+        rebuilt_window.rebuild(db_instance, now=later)
+
+        for minutes in (1, 3, 10, 60):
+            assert (live_window.counts(minutes, now=later)
+                    == rebuilt_window.counts(minutes, now=later))
+        assert live_window.counts(5, now=later) == {1: 1, 4: 1, 6: 1}
+
+    def test_window_slides(self) -> None:
+        """Verify old buckets leave the window as time goes on"""
+        window = DemandWindow(bucket_seconds=60, buckets=10)
+        window.observe(1, 1, 2, 5, "2024-01-01 08:00:00")
+        window.observe(2, 5, 5, 1, "2024-01-01 08:05:00")
+
+        assert window.counts(10, now=datetime(2024, 1, 1, 8, 5)) == {
+            2: 1, 5: 1}
+        assert window.counts(10, now=datetime(2024, 1, 1, 8, 12)) == {5: 1}
+        assert window.counts(10, now=datetime(2024, 1, 1, 9, 0)) == {}
+
+        # Calls older than the ring are dropped
+        window.observe(3, 1, 3, 1, "2024-01-01 07:00:00")
+        assert window.observations == 2
+
+        # A jump over the whole ring clears it
+        window.observe(4, 1, 4, 1, "2024-01-02 08:00:00")
+        assert window.counts(10, now=datetime(2024, 1, 2, 8, 0)) == {4: 1}
+
+    def test_counts_invalid_minutes(self) -> None:
+        """Verify windows longer than the ring are rejected"""
+        window = DemandWindow(bucket_seconds=60, buckets=10)
+
+        assert window.counts(5) == {}
+        with pytest.raises(ValueError):
+            window.counts(0)
+        with pytest.raises(ValueError):
+            window.counts(11)
@@ -1,6 +1,11 @@
+import random
+import time
+
 import pytest
 
-from src import Elevator, ElevatorDatabase
+from src import Elevator, ElevatorDatabase, ElevatorColumns
+from src.call_broadcaster import CallBroadcaster
+from src.elevator import UP, DOWN, IDLE
 from .conftest import TEST_DATABASE_PATH
 
 
@@ -41,3 +46,116 @@ class TestElevator:
         elevator_instance.call_elevator(demand_floor=1, destination_floor=4)
 
         assert elevator_instance.db.get_last_floor() == 4
+
+    def test_call_elevator_publishes_call(
+            self, elevator_instance: Elevator) -> None:
+        """
+        Test that the recorded call is published to the broadcaster
+        subscribers, with the id of the inserted row.
+        """
+        elevator_instance.broadcaster = CallBroadcaster()
+        subscription = elevator_instance.broadcaster.subscribe()
+
+        elevator_instance.call_elevator(demand_floor=3, destination_floor=5)
+
+        event = subscription.get(timeout=0)
+        row = elevator_instance.db.get_all_rows()[-1]
+        assert event[ElevatorColumns.ID] == row[0]
+        assert event[ElevatorColumns.DEMAND_FLOOR] == 3
+        assert event[ElevatorColumns.DESTINATION_FLOOR] == 5
+        assert event[ElevatorColumns.CALL_DATETIME] == row[4]
+
+    def test_look_ordering(self, elevator_instance: Elevator) -> None:
+        """
+        Test the car serves the stops ahead before reversing, and records
+        every decision in the database.
+        """
+        elevator_instance.position = 3
+        for floor in (5, 1, 4, 2, 6):
+            elevator_instance.request_stop(floor)
+        elevator_instance.request_stop(4)
+
+        assert elevator_instance.pending_stops == 5
+
+        # Idle car starts towards the closest stop (4, going up)
+        stops = []
+        while (floor := elevator_instance.next_stop()) is not None:
+            stops.append(floor)
+
+        assert stops == [4, 5, 6, 2, 1]
+        assert elevator_instance.direction == IDLE
+
+        log = elevator_instance.db.get_dispatch_log(
+            elevator_instance.car_id, limit=len(stops))
+        assert [stop[2] for stop in reversed(log)] == stops
+        assert log[0][3] == DOWN
+        assert log[-1][3] == UP
+
+    def test_stop_requested_while_travelling(
+            self, elevator_instance: Elevator) -> None:
+        """
+        Test a stop behind the car is served after the reversal, and a stop
+        ahead is served on the way.
+        """
+        elevator_instance.position = 1
+        elevator_instance.request_stop(5)
+        assert elevator_instance.next_stop() == 5
+
+        elevator_instance.request_stop(6)
+        elevator_instance.request_stop(2)
+        elevator_instance.request_stop(4)
+
+        assert elevator_instance.next_stop() == 6
+        assert elevator_instance.next_stop() == 4
+        assert elevator_instance.next_stop() == 2
+        assert elevator_instance.next_stop() is None
+
+    def test_call_elevator_queues_pickup_and_destination(
+            self, elevator_instance: Elevator) -> None:
+        """
+        Test a call queues its demand floor, and its destination once the
+        car picks it up.
+        """
+        elevator_instance.call_elevator(demand_floor=3, destination_floor=1)
+
+        assert elevator_instance.next_stop() == 3
+        assert elevator_instance.pending_stops == 1
+        assert elevator_instance.next_stop() == 1
+        assert elevator_instance.next_stop() is None
+
+    def test_repeated_calls_stay_bounded(
+            self, elevator_instance: Elevator) -> None:
+        """
+        Test repeated calls from a floor queue each destination once, and
+        the floor is forgotten once served.
+        """
+        for _ in range(100):
+            elevator_instance.queue_call(demand_floor=3, destination_floor=5)
+        elevator_instance.queue_call(demand_floor=3, destination_floor=1)
+
+        assert elevator_instance._pickups == {3: {1, 5}}
+        assert elevator_instance.pending_stops == 1
+        assert elevator_instance.next_stop() == 3
+        assert elevator_instance._pickups == {}
+        assert elevator_instance.pending_stops == 2
+
+    def test_thousands_of_queued_stops(
+            self, elevator_instance: Elevator) -> None:
+        """
+        Test queueing and serving thousands of stops stays fast and every
+        sweep is monotonic.
+        """
+        elevator_instance.db.insert_dispatch = lambda *args: None
+        elevator_instance.position = 0
+        floors = random.Random(0).sample(range(-5000, 5000), 5000)
+
+        started = time.perf_counter()
+        for floor in floors:
+            elevator_instance.request_stop(floor)
+        stops = [elevator_instance.next_stop() for _ in floors]
+        elapsed = time.perf_counter() - started
+
+        up_sweep = [floor for floor in floors if floor >= 0]
+        down_sweep = [floor for floor in floors if floor < 0]
+        assert stops == sorted(up_sweep) + sorted(down_sweep, reverse=True)
+        assert elapsed < 1
@@ -1,3 +1,4 @@
+import sqlite3
 from datetime import datetime
 
 import pytest
@@ -171,6 +172,18 @@ class TestElevatorDatabase:
             assert isinstance(row[3], int)
             assert isinstance(row[4], str)
 
+    def test_iter_rows(self, db_instance: ElevatorDatabase) -> None:
+        """
+        Create a table, insert multiple calls, and verify iterating in small
+        batches returns the same rows as get_all_rows
+        """
+        db_instance.recreate_table()
+        for floor in range(7):
+            db_instance.insert_call(floor, floor + 1, floor + 2)
+
+        assert list(db_instance.iter_rows(batch_size=3)) == (
+            db_instance.get_all_rows())
+
     def test_update_column(self, db_instance: ElevatorDatabase) -> None:
         """
         Create a table, insert a call, update a column,
@@ -190,6 +203,133 @@ class TestElevatorDatabase:
 
         assert updated_value == new_current_floor_value
 
+    def test_insert_calls(self, db_instance: ElevatorDatabase) -> None:
+        """
+        Insert many calls at once and verify the rows and the ids the insert
+        listeners are notified with
+        """
+        db_instance.recreate_table()
+        db_instance.insert_call(1, 2, 3, "2024-01-01 09:00:00")
+        notified = []
+        db_instance.add_insert_listener(
+            lambda row_id, *call: notified.append((row_id,) + call))
+
+        inserted = db_instance.insert_calls([
+            (3, 4, 5, "2024-01-01 10:00:00"),
+            (5, 6, 1, "2024-01-01 10:05:00"),
+        ])
+
+        rows = db_instance.get_all_rows()
+        assert inserted == 2
+        assert [row[1:] for row in rows[1:]] == [
+            (3, 4, 5, "2024-01-01 10:00:00"),
+            (5, 6, 1, "2024-01-01 10:05:00"),
+        ]
+        assert notified == [tuple(row) for row in rows[1:]]
+        assert db_instance.insert_calls([]) == 0
+
+        # Deleted ids are not reused, the listeners get the real ones
+        db_instance.delete_all_rows()
+        notified.clear()
+        db_instance.insert_calls([(1, 2, 3, "2024-01-01 11:00:00")])
+        rows = db_instance.get_all_rows()
+        assert rows[0][0] == 4
+        assert notified == [tuple(row) for row in rows]
+
+    def test_update_rows(self, db_instance: ElevatorDatabase) -> None:
+        """
+        Create a table, insert calls, update several columns of several rows
+        at once and verify the updates and the reported missing ids
+        """
+        db_instance.recreate_table()
+        db_instance.insert_call(1, 2, 3)
+        db_instance.insert_call(4, 5, 6)
+        first_id, second_id = [row[0] for row in db_instance.get_all_rows()]
+
+        missing_ids = db_instance.update_rows([
+            {
+                ElevatorColumns.ID: first_id,
+                ElevatorColumns.CURRENT_FLOOR: 10,
+                ElevatorColumns.CALL_DATETIME: "2024-01-01 10:00:00"
+            },
+            {ElevatorColumns.ID: second_id, ElevatorColumns.DEMAND_FLOOR: 11},
+            {ElevatorColumns.ID: second_id + 100,
+             ElevatorColumns.DEMAND_FLOOR: 1},
+        ])
+
+        assert missing_ids == [second_id + 100]
+
+        rows = db_instance.get_all_rows()
+        assert rows[0][1] == 10
+        assert rows[0][4] == "2024-01-01 10:00:00"
+        assert rows[1][2] == 11
+
+    def test_update_rows_invalid_column(
+            self, db_instance: ElevatorDatabase) -> None:
+        """
+        Verify an invalid column rolls back the whole batch
+        """
+        db_instance.recreate_table()
+        db_instance.insert_call(1, 2, 3)
+        row_id = db_instance.get_all_rows()[0][0]
+
+        with pytest.raises(ValueError):
+            db_instance.update_rows([
+                {ElevatorColumns.ID: row_id, ElevatorColumns.DEMAND_FLOOR: 9},
+                {ElevatorColumns.ID: row_id, "invalid_column": 1},
+            ])
+
+        assert db_instance.get_all_rows()[0][2] == 2
+
+    def test_get_changes(
+            self, db_instance: ElevatorDatabase, date_str: str) -> None:
+        """
+        Insert, update and delete rows and verify the change log records
+        every change in order
+        """
+        db_instance.recreate_table()
+        since = db_instance.get_changes(0, 1_000_000)[-1][0]
+
+        db_instance.insert_call(1, 2, 3, date_str)
+        row_id = db_instance.get_all_rows()[0][0]
+        db_instance.update_column(row_id, ElevatorColumns.DEMAND_FLOOR, 4)
+        db_instance.delete_all_rows()
+
+        changes = db_instance.get_changes(since)
+
+        assert [change[1] for change in changes] == [
+            "insert", "update", "delete"]
+        assert changes[0][2:] == (row_id, 1, 2, 3, date_str)
+        assert changes[1][2:] == (row_id, 1, 4, 3, date_str)
+        assert changes[2][2:] == (row_id, None, None, None, None)
+        assert db_instance.get_changes(changes[1][0]) == changes[2:]
+
+        db_instance.recreate_table()
+        assert db_instance.get_changes(changes[-1][0])[0][1] == "truncate"
+
+    def test_prune_changes(
+            self, db_instance: ElevatorDatabase, date_str: str) -> None:
+        """
+        Prune the change log in steps and verify the recent changes and the
+        data version are kept
+        """
+        db_instance.recreate_table()
+        # Start from a log holding only the truncate
+        db_instance.prune_changes(keep=1, max_rows=1_000_000)
+        pruned = db_instance.get_pruned_version()
+        db_instance.insert_calls([(1, 2, 3, date_str)] * 10)
+        version = db_instance.get_data_version()
+
+        assert db_instance.prune_changes(keep=3, max_rows=5) == 5
+        assert db_instance.get_pruned_version() == pruned + 5
+        assert db_instance.prune_changes(keep=3, max_rows=5) == 3
+        assert db_instance.prune_changes(keep=3, max_rows=5) == 0
+        assert db_instance.prune_changes(keep=0, max_rows=5) == 2
+
+        assert db_instance.get_pruned_version() == version - 1
+        assert db_instance.get_data_version() == version
+        assert len(db_instance.get_changes(0)) == 1
+
     def test_row_exists(self, db_instance: ElevatorDatabase) -> None:
         """Create a table, insert a call, and test row existence"""
         db_instance.create_table()
@@ -220,3 +360,251 @@ class TestElevatorDatabase:
         count_after_deletion = db_instance._fetch_one(query)[0]
 
         assert count_after_deletion == 0
+
+    def test_snapshot_and_restore(
+            self, db_instance: ElevatorDatabase, tmp_path) -> None:
+        """
+        Take a snapshot, change the database and verify restoring the
+        snapshot brings the original rows back
+        """
+        db_instance.recreate_table()
+        db_instance.insert_call(1, 2, 3)
+        db_instance.insert_call(4, 5, 6)
+        rows_before = db_instance.get_all_rows()
+
+        steps = []
+        snapshot_path = str(tmp_path / "snapshot.db")
+        db_instance.snapshot(
+            snapshot_path,
+            pages=1,
+            progress=lambda status, remaining, total: steps.append(remaining)
+        )
+
+        assert len(steps) > 1
+        assert steps[-1] == 0
+
+        db_instance.delete_all_rows()
+        db_instance.insert_call(7, 8, 9)
+        version = db_instance.get_data_version()
+        db_instance.restore(snapshot_path)
+
+        assert db_instance.get_all_rows() == rows_before
+        # The data version never goes back, a truncate marks the restore
+        assert db_instance.get_data_version() == version + 1
+        assert db_instance.get_changes(version)[0][1] == "truncate"
+        with sqlite3.connect(snapshot_path) as connection:
+            assert connection.execute(
+                "PRAGMA journal_mode").fetchone()[0] == "delete"
+
+    def test_snapshot_during_writes(
+            self, db_instance: ElevatorDatabase, tmp_path) -> None:
+        """
+        Keep writing while a snapshot is taken and verify the copy never
+        restarts and holds the rows as they were when it started
+        """
+        db_instance.recreate_table()
+        db_instance.insert_calls([(1, 2, 3, "2024-01-01 08:00:00")] * 5000)
+        writer = ElevatorDatabase(
+            db_instance.database_path, db_instance.compact)
+
+        steps = []
+
+        def write(status: int, remaining: int, total: int) -> None:
+            steps.append(remaining)
+            writer.insert_call(4, 5, 6, "2024-01-01 09:00:00")
+
+        snapshot_path = str(tmp_path / "snapshot.db")
+        db_instance.snapshot(snapshot_path, pages=1, progress=write)
+
+        # The pages left only ever go down
+        assert steps == sorted(steps, reverse=True)
+        assert steps[-1] == 0
+        assert len(ElevatorDatabase.open(snapshot_path).get_all_rows()) == (
+            5000)
+        assert len(db_instance.get_all_rows()) == 5000 + len(steps)
+
+    def test_read_snapshot(self, db_instance: ElevatorDatabase) -> None:
+        """
+        Verify a read snapshot keeps seeing the rows as they were when it
+        was opened while the database is written, and refuses writes
+        """
+        db_instance.recreate_table()
+        db_instance.insert_call(1, 2, 3, "2024-01-01 08:00:00")
+        db_instance.insert_call(4, 5, 6, "2024-01-01 09:00:00")
+        rows_before = db_instance.get_all_rows()
+        assert db_instance.get_storage_stats()["journal_mode"] == "wal"
+
+        with db_instance.read_snapshot() as snapshot:
+            version = snapshot.get_data_version()
+            rows = snapshot.iter_rows(batch_size=1)
+            assert next(rows) == rows_before[0]
+
+            db_instance.update_rows([{
+                f"{ElevatorColumns.ID}": rows_before[1][0],
+                f"{ElevatorColumns.CURRENT_FLOOR}": 7,
+                f"{ElevatorColumns.DEMAND_FLOOR}": 7
+            }])
+            db_instance.insert_call(7, 8, 9, "2024-01-01 10:00:00")
+
+            assert list(rows) == rows_before[1:]
+            assert snapshot.get_all_rows() == rows_before
+            assert snapshot.get_data_version() == version
+            with snapshot.read_snapshot() as nested:
+                assert nested.get_all_rows() == rows_before
+            assert snapshot.get_all_rows() == rows_before
+            with pytest.raises(sqlite3.OperationalError):
+                snapshot.insert_call(1, 1, 1)
+
+        assert len(db_instance.get_all_rows()) == 3
+        assert db_instance.get_data_version() > version
+
+    def test_restore_missing_snapshot(
+            self, db_instance: ElevatorDatabase, tmp_path) -> None:
+        """Restoring a snapshot that doesn't exist raises an error"""
+        with pytest.raises(FileNotFoundError):
+            db_instance.restore(str(tmp_path / "missing.db"))
+
+    @pytest.fixture
+    def compact_db_instance(self) -> ElevatorDatabase:
+        """
+        Returns an ElevatorDatabase instance using the compact schema, with
+        a freshly recreated elevator table.
+
+        :return: [ElevatorDatabase] An instance of the class
+        """
+        compact_db = ElevatorDatabase(TEST_DATABASE_PATH, compact=True)
+        compact_db.recreate_table()
+        return compact_db
+
+    def test_compact_schema_storage(
+        self,
+        compact_db_instance: ElevatorDatabase,
+        date_str: str,
+        _date: datetime
+    ) -> None:
+        """
+        Insert calls on the compact schema and verify call_datetime is stored
+        as an integer but returned in the API string format
+        """
+        compact_db_instance.insert_call(1, 2, 3, _date)
+        compact_db_instance.insert_call(3, 4, 5, date_str)
+
+        assert compact_db_instance.is_compact_schema() is True
+
+        query = f"SELECT {ElevatorColumns.CALL_DATETIME} FROM elevator"
+        stored_values = compact_db_instance._fetch_all(query)
+        assert all(isinstance(value[0], int) for value in stored_values)
+
+        rows = compact_db_instance.get_all_rows()
+        assert len(rows) == 2
+        assert rows[0][4] == date_str
+        assert rows[1][4] == date_str
+
+    def test_compact_update_call_datetime(
+            self, compact_db_instance: ElevatorDatabase) -> None:
+        """Update call_datetime on the compact schema using a string value"""
+        compact_db_instance.insert_call(1, 2, 3)
+        row_id = compact_db_instance.get_all_rows()[0][0]
+
+        compact_db_instance.update_column(
+            row_id, ElevatorColumns.CALL_DATETIME, "2024-02-04 05:30:00")
+
+        assert compact_db_instance.get_all_rows()[0][4] == (
+            "2024-02-04 05:30:00")
+
+    def test_get_rows_between(self, db_instance: ElevatorDatabase) -> None:
+        """
+        Insert calls on both schemas and verify the time range filter
+        returns the same rows
+        """
+        for compact in (True, False):
+            db_instance.compact = compact
+            db_instance.recreate_table()
+            db_instance.insert_call(1, 2, 3, "2024-01-01 09:59:59")
+            db_instance.insert_call(1, 2, 3, "2024-01-01 10:00:00")
+            db_instance.insert_call(1, 2, 3, "2024-01-01 10:30:00")
+            db_instance.insert_call(1, 2, 3, "2024-01-01 11:00:00")
+
+            rows = db_instance.get_rows_between(
+                "2024-01-01 10:00:00", datetime(2024, 1, 1, 11))
+
+            assert [row[4] for row in rows] == [
+                "2024-01-01 10:00:00", "2024-01-01 10:30:00"]
+
+    def test_iter_rows_between(self, db_instance: ElevatorDatabase) -> None:
+        """
+        Insert calls on both schemas and verify the rows in a time range are
+        streamed in batches in the order of get_rows_between
+        """
+        for compact in (True, False):
+            db_instance.compact = compact
+            db_instance.recreate_table()
+            db_instance.insert_calls([
+                (1, 2, 3, "2024-01-01 10:30:00"),
+                (1, 2, 3, "2024-01-01 09:59:59"),
+                (1, 2, 3, "2024-01-01 10:00:00"),
+                (1, 2, 3, "2024-01-01 10:30:00"),
+                (1, 2, 3, "2024-01-01 10:00:00"),
+                (1, 2, 3, "2024-01-01 11:00:00")
+            ])
+            start, end = "2024-01-01 10:00:00", "2024-01-01 11:00:00"
+
+            rows = list(db_instance.iter_rows_between(
+                start, end, batch_size=1))
+
+            assert len(rows) == 4
+            assert rows == db_instance.get_rows_between(start, end)
+
+    def test_get_travel_costs_by_hour(
+            self, db_instance: ElevatorDatabase) -> None:
+        """
+        Insert calls on both schemas and verify the empty travel,
+        repositioning and counterfactual costs per hour
+        """
+        for compact in (True, False):
+            db_instance.compact = compact
+            db_instance.recreate_table()
+            db_instance.insert_call(1, 3, 5, "2024-01-01 08:00:00")
+            db_instance.insert_call(5, 5, 1, "2024-01-01 08:10:00")
+            db_instance.insert_call(2, 4, 6, "2024-01-01 09:00:00")
+
+            assert db_instance.get_travel_costs_by_hour() == [
+                (8, 2, 1, 2, 2, 0, 0, None, None),
+                (9, 1, 1, 2, 2, 1, 1, None, None)
+            ]
+            assert db_instance.get_travel_costs_by_hour(
+                start="2024-01-01 08:05:00", resting_floor=1) == [
+                (8, 1, 0, 0, 0, 0, 0, 4, None),
+                (9, 1, 1, 2, 2, 1, 1, 3, 0)
+            ]
+            assert db_instance.get_travel_costs_by_hour(
+                end=datetime(2024, 1, 1, 8, 30)) == [
+                (8, 2, 1, 2, 2, 0, 0, None, None)
+            ]
+
+    def test_migrate_to_compact(
+            self, db_instance: ElevatorDatabase, date_str: str) -> None:
+        """
+        Migrate a legacy table to the compact schema and verify rows, ids
+        and the autoincrement sequence are preserved
+        """
+        db_instance.recreate_table()
+        db_instance.insert_call(1, 2, 3, date_str)
+        db_instance.insert_call(4, 5, 6, date_str)
+        rows_before = db_instance.get_all_rows()
+
+        assert db_instance.migrate_to_compact() is True
+        assert db_instance.compact is True
+        assert db_instance.is_compact_schema() is True
+        assert db_instance.get_all_rows() == rows_before
+
+        db_instance.insert_call(6, 1, 2, date_str)
+        assert db_instance.get_all_rows()[-1][0] == rows_before[-1][0] + 1
+
+        # Migrating an already compact table is a no-op
+        assert db_instance.migrate_to_compact() is False
+
+        legacy_db = ElevatorDatabase(TEST_DATABASE_PATH)
+        assert legacy_db.detect_schema() is True
+        db_instance.compact = False
+        db_instance.recreate_table()
@@ -0,0 +1,99 @@
+import pytest
+
+from src import ElevatorDatabase
+from src.elevator import UP, FLOOR_TRAVEL_SECONDS, STOP_SECONDS
+from src.group_dispatcher import FIRST_CAR_ID, GroupDispatcher, LOBBY_FLOOR
+from .conftest import TEST_DATABASE_PATH
+
+
+class TestGroupDispatcher:
+    @pytest.fixture
+    def group_instance(self) -> GroupDispatcher:
+        """
+        The group_instance function is a fixture that creates a group of
+        three cars on an empty database.
+
+        :return: [GroupDispatcher] An instance of the class
+        """
+        db_instance = ElevatorDatabase(TEST_DATABASE_PATH)
+        db_instance.recreate_table()
+
+        return GroupDispatcher(db_instance, cars=3)
+
+    def test_cars_start_on_lobby(
+            self, group_instance: GroupDispatcher) -> None:
+        """
+        Test the cars are numbered apart from the standalone car and wait on
+        the lobby.
+        """
+        assert [car.car_id for car in group_instance.cars] == [101, 102, 103]
+        assert FIRST_CAR_ID == 101
+        assert all(
+            car.position == LOBBY_FLOOR for car in group_instance.cars)
+        assert group_instance.get_car(102) is group_instance.cars[1]
+        assert group_instance.get_car(1) is None
+        assert group_instance.get_car(104) is None
+
+    def test_group_needs_a_car(self) -> None:
+        """
+        Test a group can't be created without cars.
+        """
+        db_instance = ElevatorDatabase(TEST_DATABASE_PATH)
+
+        with pytest.raises(ValueError):
+            GroupDispatcher(db_instance, cars=0)
+
+    def test_assign_spreads_calls(
+            self, group_instance: GroupDispatcher) -> None:
+        """
+        Test equally fast cars are assigned to the one with fewer queued
+        stops, and the assignments are recorded with their calls.
+        """
+        car, eta_seconds = group_instance.assign(5, 2)
+        assert car.car_id == 101
+        assert eta_seconds == 4 * FLOOR_TRAVEL_SECONDS
+
+        car, _ = group_instance.assign(4, 1)
+        assert car.car_id == 102
+
+        rows = group_instance.db.get_all_rows()
+        assignments = group_instance.db.get_assignments(limit=2)
+        assert [
+            (call_id, car_id, demand, destination)
+            for _, call_id, car_id, demand, destination, _, _ in assignments
+        ] == [(rows[1][0], 102, 4, 1), (rows[0][0], 101, 5, 2)]
+        assert group_instance.db.get_assignments(car_id=101)[0][3] == 5
+
+    def test_assign_prefers_car_on_the_way(
+            self, group_instance: GroupDispatcher) -> None:
+        """
+        Test a car that would have to reverse loses against an idle car
+        closer to the call.
+        """
+        car, _ = group_instance.assign(5, 6)
+        assert group_instance.step()[car.car_id] == 5
+        assert car.direction == UP
+
+        # Car 1 must reach 6 before coming down to 3
+        assert car.estimate_arrival(3) == (
+            4 * FLOOR_TRAVEL_SECONDS + STOP_SECONDS)
+
+        other_car, eta_seconds = group_instance.assign(3, 1)
+        assert other_car.car_id != car.car_id
+        assert eta_seconds == 2 * FLOOR_TRAVEL_SECONDS
+
+    def test_step_serves_all_cars(
+            self, group_instance: GroupDispatcher) -> None:
+        """
+        Test stepping moves every car along its own route until all of them
+        are idle, recording the stops of each car.
+        """
+        group_instance.assign(5, 2)
+        group_instance.assign(4, 6)
+
+        assert group_instance.step() == {101: 5, 102: 4, 103: None}
+        assert group_instance.step() == {101: 2, 102: 6, 103: None}
+        assert group_instance.step() == {101: None, 102: None, 103: None}
+
+        stops = group_instance.db.get_dispatch_log(car_id=102, limit=2)
+        assert [stop[2] for stop in stops] == [6, 4]
@@ -0,0 +1,82 @@
+import pytest
+
+import main
+from main import app, configure_test
+from src.load_test import (
+    LOCK_ERROR,
+    build_schedule,
+    client_sender,
+    load_travels,
+    run_load_test,
+    synthetic_travels
+)
+
+
+class TestLoadTest:
+    @pytest.fixture
+    def travels(self) -> list[dict]:
+        """
+        The travels fixture returns a small deterministic synthetic traffic.
+
+        :return: [list[dict]] The calls
+        """
+        return synthetic_travels(50, seed=1)
+
+    def test_synthetic_travels_are_reproducible(
+            self, travels: list[dict]) -> None:
+        """
+        Test the same seed generates the same calls, always between two
+        different floors of the building.
+        """
+        assert travels == synthetic_travels(50, seed=1)
+        assert all(
+            1 <= travel["demand_floor"] <= 6
+            and travel["demand_floor"] != travel["destination_floor"]
+            for travel in travels
+        )
+
+    def test_build_schedule(self) -> None:
+        """
+        Test the recorded gaps are compressed by the speedup and a rate
+        overrides them.
+        """
+        travels = load_travels()[:3]
+
+        # The recorded calls are 30 minutes apart
+        assert build_schedule(travels, speedup=1800) == [0.0, 1.0, 2.0]
+        assert build_schedule(travels, rate=4) == [0.0, 0.25, 0.5]
+        assert build_schedule(travels) == [0.0, 0.0, 0.0]
+
+    def test_report_counts_errors(self, travels: list[dict]) -> None:
+        """
+        Test failed requests and lock errors are counted by status.
+        """
+        def send(body: dict) -> tuple[int, str]:
+            if body["demand_floor"] == 1:
+                return 500, f'{{"error": "{LOCK_ERROR}"}}'
+            return 200, "{}"
+
+        report = run_load_test(send, travels, concurrency=4)
+        failed = sum(travel["demand_floor"] == 1 for travel in travels)
+
+        summary = report.to_dict()
+        assert summary["requests"] == 50
+        assert summary["errors"] == failed
+        assert summary["lock_errors"] == failed
+        assert summary["status_counts"]["200"] == 50 - failed
+        assert summary["latency_ms"]["p50"] is not None
+
+    def test_in_process_replay(self, travels: list[dict]) -> None:
+        """
+        Test calls replayed through the Flask test clients, from concurrent
+        threads, are all recorded.
+        """
+        configure_test()
+        database = main.get_db()
+        database.recreate_table()
+
+        report = run_load_test(
+            client_sender(app), travels, rate=500, concurrency=8)
+
+        assert report.errors == 0
+        assert len(database.get_all_rows()) == len(travels)
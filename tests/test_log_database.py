@@ -0,0 +1,227 @@
+import os
+import threading
+
+import pytest
+
+from src import LogElevatorDatabase, ElevatorColumns
+from src.backends import (
+    available_backends,
+    create_database,
+    register_backend
+)
+from src.log_database import RECORD_SIZE
+
+
+class TestLogElevatorDatabase:
+    @pytest.fixture
+    def log_directory(self, tmp_path) -> str:
+        """
+        Returns the directory of the segment files used by the tests.
+
+        :return: [str] Path of the directory
+        """
+        return str(tmp_path / "elevator_log")
+
+    @pytest.fixture
+    def log_db(self, log_directory: str) -> LogElevatorDatabase:
+        """
+        Returns a log store, shut down after the test.
+
+        :return: [LogElevatorDatabase] An instance of the class
+        """
+        log_db = LogElevatorDatabase(log_directory, sync_interval=None)
+        yield log_db
+        log_db.shutdown()
+
+    def test_insert_and_read(self, log_db: LogElevatorDatabase) -> None:
+        """Insert calls one by one and in bulk and read them back"""
+        assert log_db.get_last_floor() is None
+
+        assert log_db.insert_call(1, 2, 3, "2024-01-01 10:00:00") == 1
+        assert log_db.insert_calls([
+            (3, 4, 5, "2024-01-01 09:00:00"),
+            (5, 6, 1, "2024-01-01 11:00:00"),
+        ]) == 2
+
+        assert log_db.get_all_rows() == [
+            (1, 1, 2, 3, "2024-01-01 10:00:00"),
+            (2, 3, 4, 5, "2024-01-01 09:00:00"),
+            (3, 5, 6, 1, "2024-01-01 11:00:00"),
+        ]
+        assert list(log_db.iter_rows(batch_size=2)) == log_db.get_all_rows()
+        assert log_db.get_last_floor() == 1
+        assert [row[0] for row in log_db.get_rows_between(
+            "2024-01-01 09:00:00", "2024-01-01 11:00:00")] == [2, 1]
+        assert log_db.get_call_history()[0][:2] == (2, 3)
+        assert log_db.row_exists(3) and not log_db.row_exists(4)
+        assert log_db.get_data_version() == 3
+
+    def test_updates(self, log_db: LogElevatorDatabase) -> None:
+        """Update rows, merging the updates of the same row"""
+        log_db.insert_calls([(1, 2, 3, "2024-01-01 10:00:00")] * 2)
+
+        log_db.update_column(1, ElevatorColumns.DEMAND_FLOOR, 6)
+        missing_ids = log_db.update_rows([
+            {ElevatorColumns.ID: 2, ElevatorColumns.CURRENT_FLOOR: 4},
+            {ElevatorColumns.ID: 2,
+             ElevatorColumns.CALL_DATETIME: "2024-02-01 08:00:00"},
+            {ElevatorColumns.ID: 9, ElevatorColumns.DEMAND_FLOOR: 1},
+        ])
+
+        assert missing_ids == [9]
+        assert log_db.get_all_rows() == [
+            (1, 1, 6, 3, "2024-01-01 10:00:00"),
+            (2, 4, 2, 3, "2024-02-01 08:00:00"),
+        ]
+
+        with pytest.raises(ValueError):
+            log_db.update_rows([
+                {ElevatorColumns.ID: 1, ElevatorColumns.DEMAND_FLOOR: 2},
+                {ElevatorColumns.ID: 2, "floor": 2},
+            ])
+        assert log_db.get_all_rows()[0][2] == 6
+
+    def test_reload_and_torn_record(
+            self, log_db: LogElevatorDatabase, log_directory: str) -> None:
+        """
+        Reopen the log and verify the index is rebuilt and a torn record at
+        the end of the segment is cut off
+        """
+        log_db.insert_calls([(1, 2, 3, "2024-01-01 10:00:00")] * 3)
+        log_db.update_column(2, ElevatorColumns.DESTINATION_FLOOR, 5)
+        log_db.shutdown()
+
+        segment_path = os.path.join(log_directory, "segment-000001.log")
+        with open(segment_path, "ab") as file:
+            file.write(b"\x01torn")
+
+        reopened = LogElevatorDatabase(log_directory)
+        try:
+            assert [row[3] for row in reopened.get_all_rows()] == [3, 5, 3]
+            assert reopened.get_data_version() == 4
+            assert os.path.getsize(segment_path) == 4 * RECORD_SIZE
+            assert reopened.insert_call(1, 1, 1) == 4
+        finally:
+            reopened.shutdown()
+
+    def test_corrupted_segment(self, log_directory: str) -> None:
+        """
+        Corrupt a record of a segment before the last one and verify the log
+        refuses to open instead of cutting the segment
+        """
+        log_db = LogElevatorDatabase(
+            log_directory, segment_size=4 * RECORD_SIZE)
+        log_db.insert_calls([(1, 2, 3, "2024-01-01 10:00:00")] * 4)
+        log_db.insert_call(1, 2, 3, "2024-01-01 10:00:00")
+        log_db.shutdown()
+
+        segment_path = os.path.join(log_directory, "segment-000001.log")
+        with open(segment_path, "r+b") as file:
+            file.seek(RECORD_SIZE + 1)
+            file.write(b"\xff")
+
+        with pytest.raises(ValueError, match="segment-000001"):
+            LogElevatorDatabase(log_directory)
+        assert os.path.getsize(segment_path) == 4 * RECORD_SIZE
+
+    def test_segments_delete_and_compact(self, log_directory: str) -> None:
+        """
+        Fill several segments, compact and delete, and verify the rows and
+        the data version survive reopening
+        """
+        log_db = LogElevatorDatabase(
+            log_directory, segment_size=4 * RECORD_SIZE)
+        for floor in range(1, 11):
+            log_db.insert_call(1, floor, 1, "2024-01-01 10:00:00")
+        for floor in (20, 21, 22):
+            log_db.update_column(1, ElevatorColumns.DEMAND_FLOOR, floor)
+        assert len(os.listdir(log_directory)) == 4
+
+        # 13 records become a truncate record and the 10 rows
+        assert log_db.compact() == 2 * RECORD_SIZE
+        assert len(os.listdir(log_directory)) == 1
+        rows = log_db.get_all_rows()
+        version = log_db.get_data_version()
+        log_db.shutdown()
+
+        log_db = LogElevatorDatabase(log_directory)
+        assert log_db.get_all_rows() == rows
+        assert log_db.get_data_version() == version
+
+        log_db.delete_all_rows()
+        assert log_db.get_all_rows() == []
+        assert log_db.get_data_version() == version + 1
+        log_db.shutdown()
+
+        log_db = LogElevatorDatabase(log_directory)
+        assert log_db.get_all_rows() == []
+        assert log_db.get_data_version() == version + 1
+        # Ids are never reused, like AUTOINCREMENT
+        assert log_db.insert_call(1, 2, 3) == 11
+        log_db.compact()
+        log_db.delete_all_rows()
+        log_db.shutdown()
+
+        log_db = LogElevatorDatabase(log_directory)
+        assert log_db.insert_calls([(1, 2, 3, "2024-01-01 10:00:00")]) == 1
+        assert log_db.get_all_rows()[0][0] == 12
+        log_db.shutdown()
+
+    def test_compacts_when_mostly_dead(self, log_directory: str) -> None:
+        """
+        Keep updating a row and verify the log compacts itself once the
+        replaced records make up half of it
+        """
+        log_db = LogElevatorDatabase(
+            log_directory, segment_size=4 * RECORD_SIZE,
+            compact_min_records=4)
+        log_db.insert_calls([(1, 2, 3, "2024-01-01 10:00:00")] * 4)
+        for floor in (4, 5, 6):
+            log_db.update_column(1, ElevatorColumns.DEMAND_FLOOR, floor)
+        assert log_db.dead_records() == 3
+        assert len(os.listdir(log_directory)) == 2
+
+        log_db.update_column(1, ElevatorColumns.DEMAND_FLOOR, 7)
+
+        # Only the truncate record starting the compacted segment is left
+        assert log_db.dead_records() == 1
+        assert len(os.listdir(log_directory)) == 1
+        assert log_db.get_all_rows()[0][2] == 7
+        assert log_db.get_data_version() == 8
+        log_db.shutdown()
+
+    def test_concurrent_writers(self, log_db: LogElevatorDatabase) -> None:
+        """Insert calls from many threads and verify no call is lost"""
+        notified = []
+        log_db.add_insert_listener(lambda row_id, *call: notified.append(
+            row_id))
+
+        def insert_calls() -> None:
+            for _ in range(50):
+                log_db.insert_call(1, 2, 3)
+
+        threads = [threading.Thread(target=insert_calls) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert [row[0] for row in log_db.get_all_rows()] == list(
+            range(1, 401))
+        assert sorted(notified) == list(range(1, 401))
+
+    def test_backend_registry(self, log_directory: str) -> None:
+        """Create stores by backend name and register a new backend"""
+        assert {"sqlite", "memory", "log"} <= set(available_backends())
+
+        log_db = create_database("log", directory=log_directory)
+        assert isinstance(log_db, LogElevatorDatabase)
+        log_db.shutdown()
+
+        register_backend("custom", LogElevatorDatabase)
+        custom_db = create_database("custom", directory=log_directory)
+        assert custom_db.get_all_rows() == []
+        custom_db.shutdown()
+
+        with pytest.raises(ValueError):
+            create_database("unknown")
@@ -1,11 +1,23 @@
+import gzip
 import json
 import os
+import tempfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from unittest.mock import patch
 from flask_testing import TestCase
-from src import ElevatorDatabase, ElevatorColumns
+from src import (
+    ElevatorDatabase,
+    ElevatorColumns,
+    LogElevatorDatabase,
+    MemoryElevatorDatabase
+)
+import main
 from main import app, Elevator, configure_test
+from src.admission import AdmissionController
+from src.training import ModelTrainer
 from .conftest import TEST_DATABASE_PATH
 
 os.environ["FLASK_ENV"] = "test"
@@ -42,6 +54,24 @@ class TestAPI(TestCase):
         assert response.status_code == 200
         assert data["status"] == "healthy"
 
+    def test_startup_report_endpoint(self) -> None:
+        """
+        Test the startup report endpoint.
+        """
+        response = self.client.get("/startup-report")
+        data = json.loads(response.data.decode("utf-8"))
+        assert response.status_code == 200
+        assert "create_app" in data
+        assert "boot_cpu" in data
+
+    def test_lazy_database_setup(self) -> None:
+        """
+        Test the database is only set up on first use.
+        """
+        with patch("main.db", None), patch("main.setup") as mock_setup:
+            main.get_db()
+        mock_setup.assert_called_once()
+
     def test_generate_data_endpoint(self) -> None:
         """
         Test the generate data endpoint.
@@ -112,6 +142,386 @@ class TestAPI(TestCase):
                 in data["error"]
         )
 
+    def test_dispatch_endpoints(self) -> None:
+        """
+        Test the dispatcher serves the calls made through the API.
+        """
+        for demand_floor, destination_floor in ((3, 5), (1, 4)):
+            self.client.post("/call-elevator", json={
+                f"{ElevatorColumns.DEMAND_FLOOR}": demand_floor,
+                f"{ElevatorColumns.DESTINATION_FLOOR}": destination_floor
+            })
+
+        stops = []
+        while True:
+            response = self.client.post("/dispatch/next-stop")
+            data = json.loads(response.data.decode("utf-8"))
+            assert response.status_code == 200
+            if data["floor"] is None:
+                break
+            stops.append(data["floor"])
+
+        # Picks up at 3, drops at 5, reverses to pick up at 1, drops at 4
+        assert stops == [3, 5, 1, 4]
+        assert data["direction"] == "idle"
+
+        response = self.client.get("/dispatch/status")
+        data = json.loads(response.data.decode("utf-8"))
+        assert data["position"] == 4
+        assert data["pending_stops"] == 0
+        assert [stop["floor"] for stop in data["last_stops"][:4]] == [
+            4, 1, 5, 3]
+
+    def test_call_elevator_shed_when_overloaded(self) -> None:
+        """
+        Test write requests are rejected with 503 and Retry-After when no
+        slot is available, and the shed requests are reported.
+        """
+        controller = AdmissionController(max_in_flight=0, max_queue=0)
+
+        with patch.object(main, "admission_controller", controller):
+            response = self.client.post("/call-elevator", json={
+                f"{ElevatorColumns.DEMAND_FLOOR}": 3,
+                f"{ElevatorColumns.DESTINATION_FLOOR}": 5
+            })
+            assert response.status_code == 503
+            assert response.headers["Retry-After"] == "1"
+
+            response = self.client.put("/update-row", json={
+                f"{ElevatorColumns.ID}": 1,
+                f"{ElevatorColumns.DEMAND_FLOOR}": 2
+            })
+            assert response.status_code == 503
+            assert response.headers["Retry-After"] == "2"
+
+            response = self.client.get("/admission/status")
+            data = json.loads(response.data.decode("utf-8"))
+
+        assert response.status_code == 200
+        assert data["shed"] == {"call": 1, "bulk": 1}
+        assert self.db.get_all_rows() == []
+
+    def test_group_endpoints(self) -> None:
+        """
+        Test the hall calls made through the API are assigned to the cars of
+        the bank and served by them.
+        """
+        response = self.client.post("/group/call", json={
+            f"{ElevatorColumns.DEMAND_FLOOR}": 3})
+        assert response.status_code == 400
+
+        car_ids = set()
+        for demand_floor, destination_floor in ((3, 5), (2, 1)):
+            response = self.client.post("/group/call", json={
+                f"{ElevatorColumns.DEMAND_FLOOR}": demand_floor,
+                f"{ElevatorColumns.DESTINATION_FLOOR}": destination_floor
+            })
+            data = json.loads(response.data.decode("utf-8"))
+            assert response.status_code == 200
+            assert data["eta_seconds"] >= 0
+            car_ids.add(data["car_id"])
+
+        # Both cars were idle, so each call got its own car
+        assert len(car_ids) == 2
+
+        served = []
+        while True:
+            response = self.client.post("/group/step")
+            assert response.status_code == 200
+            stops = json.loads(response.data.decode("utf-8"))["stops"]
+            if all(floor is None for floor in stops.values()):
+                break
+            served.extend(
+                floor for floor in stops.values() if floor is not None)
+        assert sorted(served) == [1, 2, 3, 5]
+
+        response = self.client.get("/group/status")
+        data = json.loads(response.data.decode("utf-8"))
+        assert response.status_code == 200
+        assert all(car["pending_stops"] == 0 for car in data["cars"])
+        assert [
+            assignment[f"{ElevatorColumns.DEMAND_FLOOR}"]
+            for assignment in data["last_assignments"][:2]
+        ] == [2, 3]
+
+    def test_stream_calls_endpoint(self) -> None:
+        """
+        Test the live call stream receives the calls recorded through
+        the call elevator endpoint.
+        """
+        response = self.client.get("/stream-calls")
+        assert response.status_code == 200
+        assert response.mimetype == "text/event-stream"
+
+        events = response.response
+        assert next(events) == b": connected\n\n"
+
+        self.client.post("/call-elevator", json={
+            f"{ElevatorColumns.DEMAND_FLOOR}": 3,
+            f"{ElevatorColumns.DESTINATION_FLOOR}": 5
+        })
+
+        event = next(events).decode("utf-8")
+        row_id = self.db.get_all_rows()[-1][0]
+        assert event.startswith(f"id: {row_id}\nevent: call\ndata: ")
+        data = json.loads(event.split("data: ")[1])
+        assert data[f"{ElevatorColumns.DEMAND_FLOOR}"] == 3
+
+        response.close()
+        assert main.broadcaster.subscriber_count == 0
+
+    def test_stream_calls_closed_before_first_event(self) -> None:
+        """
+        Test the subscription of a stream closed before any event was sent
+        is removed.
+        """
+        # The test client always reads the first event, so the view is
+        # called directly to leave the stream unread
+        with app.test_request_context("/stream-calls"):
+            response = main.stream_calls()
+        assert main.broadcaster.subscriber_count == 1
+
+        response.close()
+        assert main.broadcaster.subscriber_count == 0
+
+    def test_predict_next_floor_endpoint(self) -> None:
+        """
+        Test the next floor prediction follows the recorded calls.
+        """
+        main.refresh_models(self.db)
+
+        for demand_floor, destination_floor in ((1, 5), (5, 1), (1, 5)):
+            self.client.post("/call-elevator", json={
+                f"{ElevatorColumns.DEMAND_FLOOR}": demand_floor,
+                f"{ElevatorColumns.DESTINATION_FLOOR}": destination_floor
+            })
+
+        hour = datetime.now().hour
+        response = self.client.get(f"/predict/next-floor?hour={hour}")
+        data = json.loads(response.data.decode("utf-8"))
+
+        assert response.status_code == 200
+        assert data["floor"] == 5
+        assert data["most_likely_floor"] == 5
+        assert data["probabilities"] == {"5": 1.0}
+
+        response = self.client.get("/predict/next-floor?hour=24")
+        assert response.status_code == 400
+
+        response = self.client.get("/predict/next-floor?source=current")
+        assert response.status_code == 400
+
+    def test_demand_recent_endpoint(self) -> None:
+        """
+        Test the recent demand counts follow the recorded calls.
+        """
+        main.refresh_models(self.db)
+
+        for demand_floor, destination_floor in ((1, 5), (3, 1), (3, 6)):
+            self.client.post("/call-elevator", json={
+                f"{ElevatorColumns.DEMAND_FLOOR}": demand_floor,
+                f"{ElevatorColumns.DESTINATION_FLOOR}": destination_floor
+            })
+
+        response = self.client.get("/demand/recent?minutes=5")
+        data = json.loads(response.data.decode("utf-8"))
+
+        assert response.status_code == 200
+        assert data["total"] == 3
+        assert data["busiest_floor"] == 3
+        assert data["floors"] == {"1": 1, "3": 2}
+
+        response = self.client.get("/demand/recent?minutes=0")
+        assert response.status_code == 400
+
+        response = self.client.get("/demand/recent?minutes=61")
+        assert response.status_code == 400
+
+    def test_analytics_sketches_endpoint(self) -> None:
+        """
+        Test the sketch analytics follow the recorded calls.
+        """
+        main.refresh_models(self.db)
+
+        for demand_floor, destination_floor in ((1, 5), (1, 5), (3, 1)):
+            self.client.post("/call-elevator", json={
+                f"{ElevatorColumns.DEMAND_FLOOR}": demand_floor,
+                f"{ElevatorColumns.DESTINATION_FLOOR}": destination_floor
+            })
+
+        response = self.client.get(
+            f"/analytics/sketches?top=1&quantiles=0.5"
+            f"&{ElevatorColumns.DEMAND_FLOOR}=3"
+            f"&{ElevatorColumns.DESTINATION_FLOOR}=1")
+        data = json.loads(response.data.decode("utf-8"))
+
+        assert response.status_code == 200
+        assert data["observations"] == 3
+        assert data["busiest_pairs"] == [{
+            "demand_floor": 1,
+            "destination_floor": 5,
+            "count": 2,
+            "min_count": 2
+        }]
+        assert data["pair_count"] == 1
+        assert list(data["inter_arrival_seconds"]) == ["0.5"]
+
+        for query in ("top=0", "quantiles=2", "quantiles=a",
+                      f"{ElevatorColumns.DEMAND_FLOOR}=3"):
+            response = self.client.get(f"/analytics/sketches?{query}")
+            assert response.status_code == 400
+
+    def test_travel_analytics_endpoints(self) -> None:
+        """
+        Test the empty travel, repositioning and resting floor cost
+        analytics of the recorded calls.
+        """
+        self.db.insert_call(1, 3, 5, "2024-01-01 08:00:00")
+        self.db.insert_call(5, 5, 1, "2024-01-01 08:10:00")
+        self.db.insert_call(2, 4, 6, "2024-01-01 09:00:00")
+
+        response = self.client.get("/analytics/empty-travel")
+        data = json.loads(response.data.decode("utf-8"))
+        assert response.status_code == 200
+        assert data["calls"] == 3
+        assert data["empty_calls"] == 2
+        assert data["floors"] == 4
+        assert data["seconds"] == 8.0
+        assert [hour["hour"] for hour in data["by_hour"]] == [8, 9]
+
+        response = self.client.get(
+            "/analytics/repositioning?start=2024-01-01 08:30:00")
+        data = json.loads(response.data.decode("utf-8"))
+        assert response.status_code == 200
+        assert data["repositionings"] == 0
+        assert data["by_hour"] == [
+            {"hour": 9, "repositionings": 0, "floors": 0, "seconds": 0.0}]
+
+        response = self.client.get("/analytics/resting-floor-cost?floor=4")
+        data = json.loads(response.data.decode("utf-8"))
+        assert response.status_code == 200
+        assert data["actual"] == {
+            "empty_travel_floors": 4,
+            "repositioning_floors": 1,
+            "seconds": 10.0
+        }
+        assert data["counterfactual"] == {
+            "empty_travel_floors": 2,
+            "repositioning_floors": 4,
+            "seconds": 12.0
+        }
+        assert data["saved_seconds"] == -2.0
+
+        response = self.client.get("/analytics/resting-floor-cost")
+        assert response.status_code == 400
+
+        response = self.client.get("/analytics/empty-travel?start=today")
+        assert response.status_code == 400
+
+    def test_od_matrix_endpoint(self) -> None:
+        """
+        Test the origin-destination matrix and its slices.
+        """
+        self.db.insert_call(1, 1, 5, "2024-01-01 08:05:00")
+        self.db.insert_call(5, 1, 3, "2024-01-01 09:10:00")
+        self.db.insert_call(3, 5, 1, "2024-01-02 18:00:00")
+
+        response = self.client.get("/analytics/od-matrix")
+        data = json.loads(response.data.decode("utf-8"))
+        assert response.status_code == 200
+        assert data["floors"] == [1, 3, 5]
+        assert data["matrix"] == [[0, 1, 1], [0, 0, 0], [1, 0, 0]]
+        assert data["total"] == 3
+
+        response = self.client.get("/analytics/od-matrix?hour=8,9&weekday=0")
+        data = json.loads(response.data.decode("utf-8"))
+        assert response.status_code == 200
+        assert data["hours"] == [8, 9]
+        assert data["weekdays"] == [0]
+        assert data["total"] == 2
+
+        response = self.client.get("/analytics/od-matrix?hour=24")
+        assert response.status_code == 400
+
+        response = self.client.get("/analytics/od-matrix?weekday=monday")
+        assert response.status_code == 400
+
+    def test_train_and_predict_resting_floor_endpoints(self) -> None:
+        """
+        Test training the resting floor model and getting predictions.
+        """
+        for day in range(1, 8):
+            self.db.insert_call(1, 5, 1, f"2024-01-{day:02d} 08:00:00")
+            self.db.insert_call(5, 1, 5, f"2024-01-{day:02d} 18:00:00")
+
+        with tempfile.TemporaryDirectory() as model_dir:
+            trainer = ModelTrainer(model_dir, executor=ThreadPoolExecutor())
+            with patch("main.trainer", trainer):
+                response = self.client.get(
+                    "/predict/resting-floor?floor=1")
+                assert response.status_code == 503
+
+                response = self.client.post("/train")
+                data = json.loads(response.data.decode("utf-8"))
+                assert response.status_code == 202
+                assert data["status"] == "started"
+                trainer.wait()
+
+                response = self.client.get("/train/status")
+                data = json.loads(response.data.decode("utf-8"))
+                assert data["training"] is False
+                assert data["model"]["samples"] == 13
+
+                response = self.client.get(
+                    "/predict/resting-floor?floor=5"
+                    "&call_datetime=2024-01-10 08:00:00")
+                data = json.loads(response.data.decode("utf-8"))
+                assert response.status_code == 200
+                assert data["resting_floor"] == 5
+
+                response = self.client.post("/train")
+                assert response.status_code == 200
+
+                response = self.client.get(
+                    "/predict/resting-floor?call_datetime=invalid")
+                assert response.status_code == 400
+
+    def test_predict_resting_schedule_endpoint(self) -> None:
+        """
+        Test the resting schedule of a week at 15-minute granularity.
+        """
+        response = self.client.get(
+            "/predict/resting-schedule?start=2024-01-08 00:00:00"
+            "&end=2024-01-15 00:00:00")
+        assert response.status_code == 503
+
+        self.db.insert_call(1, 5, 1, "2024-01-01 08:05:00")
+        self.db.insert_call(1, 1, 1, "2024-01-01 18:05:00")
+
+        response = self.client.get(
+            "/predict/resting-schedule?start=2024-01-08 00:00:00"
+            "&end=2024-01-15 00:00:00&step=15")
+        data = json.loads(response.data.decode("utf-8"))
+
+        assert response.status_code == 200
+        assert data["step"] == 15
+        assert len(data["floors"]) == 7 * 96
+        assert data["floors"][8 * 4] == 5
+        assert data["floors"][18 * 4] == 1
+
+    def test_predict_resting_schedule_invalid_parameters(self) -> None:
+        """
+        Test the resting schedule endpoint with invalid parameters.
+        """
+        for query in (
+            "start=2024-01-08&end=2024-01-15 00:00:00",
+            "start=2024-01-08 00:00:00&end=2024-01-01 00:00:00",
+            "start=2024-01-08 00:00:00&end=2024-01-15 00:00:00&step=0",
+            "start=2000-01-01 00:00:00&end=2024-01-15 00:00:00&step=1",
+        ):
+            response = self.client.get(f"/predict/resting-schedule?{query}")
+            assert response.status_code == 400
+
     def test_get_all_rows_endpoint(self) -> None:
         """
         Test the get all rows endpoint.
@@ -303,7 +713,7 @@ class TestAPI(TestCase):
         }
 
         # Mock a side effect that raises an exception
-        with patch("src.ElevatorDatabase.update_column",
+        with patch("src.ElevatorDatabase.update_rows",
                    side_effect=Exception("Simulated error")):
             response = self.client.put("/update-row", json=update_data)
 
@@ -313,6 +723,127 @@ class TestAPI(TestCase):
         assert "error" in data
         assert "Simulated error" in data["error"]
 
+    def test_update_rows_endpoint(self) -> None:
+        """
+        Test the bulk update rows endpoint.
+        """
+        elevator = Elevator(db=self.db)
+        elevator.call_elevator(demand_floor=3, destination_floor=5)
+        elevator.call_elevator(demand_floor=1, destination_floor=4)
+
+        first_id, second_id = [row[0] for row in self.db.get_all_rows()]
+
+        update_data = [
+            {
+                f"{ElevatorColumns.ID}": first_id,
+                f"{ElevatorColumns.DEMAND_FLOOR}": 2,
+                f"{ElevatorColumns.DESTINATION_FLOOR}": 6,
+            },
+            {
+                f"{ElevatorColumns.ID}": second_id,
+                f"{ElevatorColumns.CALL_DATETIME}": "2024-01-01 10:00:00",
+            },
+            {
+                f"{ElevatorColumns.ID}": 1234,
+                f"{ElevatorColumns.CURRENT_FLOOR}": 1,
+            },
+        ]
+
+        response = self.client.put("/update-rows", json=update_data)
+        data = json.loads(response.data.decode("utf-8"))
+
+        assert response.status_code == 200
+        assert data["message"] == "2 rows updated successfully"
+        assert data["missing_ids"] == [1234]
+
+        rows = self.db.get_all_rows()
+        assert rows[0][2] == 2
+        assert rows[0][3] == 6
+        assert rows[1][4] == "2024-01-01 10:00:00"
+
+    def test_update_rows_invalid_payload(self) -> None:
+        """
+        Test the bulk update rows endpoint with invalid payloads.
+        """
+        response = self.client.put(
+            "/update-rows", json={f"{ElevatorColumns.ID}": 1})
+        assert response.status_code == 400
+
+        response = self.client.put("/update-rows", json=[
+            {f"{ElevatorColumns.ID}": 1, f"{ElevatorColumns.DEMAND_FLOOR}": 2},
+            {f"{ElevatorColumns.ID}": 2,
+             f"{ElevatorColumns.DEMAND_FLOOR}": "x"}
+        ])
+        data = json.loads(response.data.decode("utf-8"))
+
+        assert response.status_code == 400
+        assert "position 1" in data["error"]
+
+    def test_changes_endpoint(self) -> None:
+        """
+        Test the change feed endpoint paging through the changes.
+        """
+        # Last change so far, the truncate recorded by setUp
+        since = self.db.get_changes(0, 1_000_000)[-1][0]
+
+        elevator = Elevator(db=self.db)
+        elevator.call_elevator(demand_floor=3, destination_floor=5)
+        elevator.call_elevator(demand_floor=1, destination_floor=4)
+        row_id = self.db.get_all_rows()[0][0]
+        self.db.update_column(row_id, ElevatorColumns.DEMAND_FLOOR, 2)
+
+        response = self.client.get(f"/changes?since={since}&limit=2")
+        data = json.loads(response.data.decode("utf-8"))
+
+        assert response.status_code == 200
+        assert data["has_more"] is True
+        assert [change["operation"] for change in data["changes"]] == [
+            "insert", "insert"]
+        assert data["changes"][0][f"{ElevatorColumns.DEMAND_FLOOR}"] == 3
+
+        response = self.client.get(
+            f"/changes?since={data['next_since']}&limit=2")
+        data = json.loads(response.data.decode("utf-8"))
+
+        assert data["has_more"] is False
+        assert len(data["changes"]) == 1
+        assert data["changes"][0]["operation"] == "update"
+        assert data["changes"][0][f"{ElevatorColumns.ID}"] == row_id
+        assert data["changes"][0][f"{ElevatorColumns.DEMAND_FLOOR}"] == 2
+
+    def test_changes_pruned(self) -> None:
+        """
+        Test the change feed endpoint when the changes asked for were pruned.
+        """
+        elevator = Elevator(db=self.db)
+        elevator.call_elevator(demand_floor=3, destination_floor=5)
+        elevator.call_elevator(demand_floor=1, destination_floor=4)
+        self.db.prune_changes(keep=1, max_rows=1_000_000)
+        pruned_version = self.db.get_pruned_version()
+
+        response = self.client.get(f"/changes?since={pruned_version - 1}")
+        data = json.loads(response.data.decode("utf-8"))
+
+        assert response.status_code == 410
+        assert data["pruned_version"] == pruned_version
+
+        response = self.client.get(f"/changes?since={pruned_version}")
+        data = json.loads(response.data.decode("utf-8"))
+
+        assert response.status_code == 200
+        assert [change["operation"] for change in data["changes"]] == [
+            "insert"]
+
+    def test_changes_invalid_parameters(self) -> None:
+        """
+        Test the change feed endpoint with invalid parameters.
+        """
+        response = self.client.get("/changes?since=-1")
+        assert response.status_code == 400
+
+        response = self.client.get("/changes?limit=0")
+        assert response.status_code == 400
+
     def test_delete_all_rows_endpoint(self) -> None:
         """
         Test the delete all rows endpoint.
@@ -344,6 +875,101 @@ class TestAPI(TestCase):
         assert "error" in data
         assert "Simulated error" in data["error"]
 
+    def test_snapshot_and_restore_endpoints(self) -> None:
+        """
+        Test the admin snapshot, list and restore endpoints.
+        """
+        elevator = Elevator(db=self.db)
+        elevator.call_elevator(demand_floor=3, destination_floor=5)
+
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            with patch("main.SNAPSHOT_DIR", snapshot_dir):
+                response = self.client.post(
+                    "/admin/snapshot", json={"name": "known-good"})
+                assert response.status_code == 200
+
+                response = self.client.get("/admin/snapshots")
+                data = json.loads(response.data.decode("utf-8"))
+                assert data["snapshots"] == ["known-good"]
+
+                self.db.delete_all_rows()
+
+                response = self.client.post(
+                    "/admin/restore", json={"name": "known-good"})
+                data = json.loads(response.data.decode("utf-8"))
+
+                assert response.status_code == 200
+                assert data["message"] == (
+                    "Snapshot known-good restored successfully")
+                assert len(self.db.get_all_rows()) == 1
+
+    def test_maintenance_endpoints(self) -> None:
+        """
+        Test maintenance can be run on demand and is reported.
+        """
+        self.db.insert_call(1, 2, 3)
+
+        response = self.client.post("/admin/maintenance/run?force=true")
+        data = json.loads(response.data.decode("utf-8"))
+        assert response.status_code == 200
+        assert {"analyze", "optimize"} <= {
+            action["task"] for action in data["actions"]}
+
+        response = self.client.get("/admin/maintenance")
+        data = json.loads(response.data.decode("utf-8"))
+        assert response.status_code == 200
+        assert not data["running"]
+        assert data["writes_since_analyze"] == 0
+        assert data["storage"]["page_count"] > 0
+        assert data["actions"]
+
+        # An in-memory database has no file to maintain
+        memory_db = MemoryElevatorDatabase()
+        assert main.get_maintenance(memory_db) is None
+        memory_db.shutdown()
+
+    def test_sqlite_only_endpoints_on_log_storage(self) -> None:
+        """
+        Test the endpoints relying on SQLite-only tables are rejected with
+        400 on the log storage, without recording the call.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            log_db = LogElevatorDatabase(directory, sync_interval=None)
+            with patch.object(main, "db", log_db):
+                call = {
+                    f"{ElevatorColumns.DEMAND_FLOOR}": 3,
+                    f"{ElevatorColumns.DESTINATION_FLOOR}": 5
+                }
+                responses = [
+                    self.client.post("/dispatch/next-stop"),
+                    self.client.get("/dispatch/status"),
+                    self.client.post("/group/call", json=call),
+                    self.client.post("/group/step"),
+                    self.client.get("/group/status"),
+                    self.client.get("/changes"),
+                    self.client.post("/admin/snapshot"),
+                    self.client.post("/admin/restore", json={"name": "x"})
+                ]
+                assert [
+                    response.status_code for response in responses
+                ] == [400] * len(responses)
+                assert log_db.get_all_rows() == []
+            log_db.shutdown()
+
+    def test_snapshot_invalid_name(self) -> None:
+        """
+        Test the admin snapshot endpoints with invalid or unknown names.
+        """
+        response = self.client.post(
+            "/admin/snapshot", json={"name": "../elevator"})
+        assert response.status_code == 400
+
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            with patch("main.SNAPSHOT_DIR", snapshot_dir):
+                response = self.client.post(
+                    "/admin/restore", json={"name": "missing"})
+        assert response.status_code == 404
+
     def test_export_csv_endpoint(self) -> None:
         """
         Test the export CSV endpoint.
@@ -381,6 +1007,99 @@ class TestAPI(TestCase):
         for record in expected_records:
             assert record in actual_csv_content
 
+    def test_import_csv_endpoint(self) -> None:
+        """
+        Test a gzip export can be imported back, and invalid files are
+        rejected.
+        """
+        elevator = Elevator(db=self.db)
+        for _ in range(20):
+            elevator.call_elevator(demand_floor=3, destination_floor=5)
+        exported = self.client.get(
+            "/export-csv", headers={"Accept-Encoding": "gzip"}).data
+
+        response = self.client.post(
+            "/import-csv",
+            data=exported,
+            headers={"Content-Encoding": "gzip", "Content-Type": "text/csv"}
+        )
+        data = json.loads(response.data.decode("utf-8"))
+
+        assert response.status_code == 200
+        assert data["rows"] == 20
+        rows = self.db.get_all_rows()
+        assert len(rows) == 40
+        assert [row[1:] for row in rows[20:]] == [
+            row[1:] for row in rows[:20]]
+
+        response = self.client.post(
+            "/import-csv", data="floor\n1\n",
+            headers={"Content-Type": "text/csv"})
+        assert response.status_code == 400
+        assert "Invalid columns" in json.loads(
+            response.data.decode("utf-8"))["error"]
+
+        response = self.client.post(
+            "/import-csv",
+            data=exported[:len(exported) // 2],
+            headers={"Content-Encoding": "gzip", "Content-Type": "text/csv"}
+        )
+        assert response.status_code == 400
+        assert "Invalid compressed data" in json.loads(
+            response.data.decode("utf-8"))["error"]
+
+    def test_export_csv_gzip_accept_encoding(self) -> None:
+        """
+        Test the export CSV endpoint negotiating gzip via Accept-Encoding.
+        """
+        elevator = Elevator(db=self.db)
+        for _ in range(500):
+            elevator.call_elevator(demand_floor=3, destination_floor=5)
+
+        response = self.client.get(
+            "/export-csv", headers={"Accept-Encoding": "gzip, deflate"})
+
+        assert response.status_code == 200
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.is_streamed
+
+        csv_content = gzip.decompress(response.data).decode("utf-8")
+        lines = csv_content.splitlines()
+        assert lines[0] == (
+            f"{ElevatorColumns.ID},"
+            f"{ElevatorColumns.CURRENT_FLOOR},"
+            f"{ElevatorColumns.DEMAND_FLOOR},"
+            f"{ElevatorColumns.DESTINATION_FLOOR},"
+            f"{ElevatorColumns.CALL_DATETIME}"
+        )
+        assert len(lines) == 501
+        assert len(response.data) < len(csv_content) / 5
+
+    def test_export_csv_compression_parameter(self) -> None:
+        """
+        Test the export CSV endpoint with the compression query parameter.
+        """
+        elevator = Elevator(db=self.db)
+        elevator.call_elevator(demand_floor=3, destination_floor=5)
+
+        response = self.client.get("/export-csv?compression=deflate&level=1")
+
+        assert response.status_code == 200
+        assert response.headers["Content-Type"] == "application/zlib"
+        assert "Content-Encoding" not in response.headers
+        assert (
+                response.headers["Content-Disposition"]
+                == "attachment; filename=elevator_data.csv.zz"
+        )
+        lines = zlib.decompress(response.data).decode("utf-8").splitlines()
+        assert len(lines) == 2
+
+        response = self.client.get("/export-csv?compression=brotli")
+        assert response.status_code == 400
+
+        response = self.client.get("/export-csv?compression=gzip&level=0")
+        assert response.status_code == 400
+
     def test_export_csv_internal_error(self) -> None:
         """
         Test the export CSV endpoint with simulated internal error.
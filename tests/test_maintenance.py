@@ -0,0 +1,166 @@
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+from src import ElevatorDatabase
+from src.maintenance import MaintenanceScheduler
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        """
+        The __init__ function creates a clock that only moves when told.
+
+        :return: [None]
+        """
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """The current time"""
+        return self.now
+
+
+class TestMaintenanceScheduler:
+    @pytest.fixture
+    def db_instance(self) -> ElevatorDatabase:
+        """
+        Returns an ElevatorDatabase on a new file, with incremental
+        auto_vacuum, holding a few thousand calls.
+
+        :return: [ElevatorDatabase] An instance of the class
+        """
+        path = os.path.join(tempfile.mkdtemp(), "maintenance.db")
+        db_instance = ElevatorDatabase(path, compact=True)
+        db_instance.create_table()
+        db_instance.insert_calls(
+            [(1, 2, 3, "2024-01-01 08:00:00")] * 5000)
+        return db_instance
+
+    def test_runs_only_when_quiet(
+            self, db_instance: ElevatorDatabase) -> None:
+        """
+        Verify maintenance waits for a quiet period and runs the tasks past
+        their threshold
+        """
+        clock = FakeClock()
+        scheduler = MaintenanceScheduler(
+            db_instance, quiet_seconds=10, analyze_writes=1000, clock=clock)
+
+        # The first check sees the writes
+        assert scheduler.tick() == []
+        clock.now = 5
+        assert scheduler.tick() == []
+
+        clock.now = 11
+        actions = scheduler.tick()
+        assert [action["task"] for action in actions] == [
+            "analyze", "optimize"]
+        assert actions[0]["writes"] == 5000
+        assert all(action["duration_ms"] >= 0 for action in actions)
+
+        # Nothing is due until the data changes again
+        clock.now = 20
+        assert scheduler.tick() == []
+
+        db_instance.insert_call(1, 1, 2, "2024-01-01 09:00:00")
+        assert scheduler.tick() == []
+        clock.now = 31
+        assert [action["task"] for action in scheduler.tick()] == [
+            "optimize"]
+
+    def test_incremental_vacuum_after_delete(
+            self, db_instance: ElevatorDatabase) -> None:
+        """
+        Verify the free pages left by a delete are released in steps
+        """
+        db_instance.delete_all_rows()
+        free_pages = db_instance.get_storage_stats()["freelist_count"]
+        assert free_pages > 0
+
+        scheduler = MaintenanceScheduler(
+            db_instance, vacuum_free_fraction=0.01, vacuum_step_pages=4)
+        actions = scheduler.run_once()
+        vacuum = actions[-1]
+
+        assert vacuum["task"] == "incremental_vacuum"
+        assert vacuum["complete"]
+        # ANALYZE reuses a few of the free pages for its statistics
+        assert 0 < vacuum["pages_released"] <= free_pages
+        assert db_instance.get_storage_stats()["freelist_count"] == 0
+
+        status = scheduler.status()
+        assert status["free_fraction"] == 0
+        assert status["incremental_vacuum"]
+        assert status["writes_since_analyze"] == 0
+        assert [action["task"] for action in status["actions"]] == [
+            "analyze", "optimize", "incremental_vacuum"]
+
+    def test_vacuum_yields_to_writes(
+            self, db_instance: ElevatorDatabase) -> None:
+        """
+        Verify the incremental vacuum stops when its time budget is spent
+        """
+        db_instance.delete_all_rows()
+        scheduler = MaintenanceScheduler(
+            db_instance, vacuum_step_pages=1, vacuum_budget_seconds=0)
+
+        vacuum = scheduler.run_once(force=True)[-1]
+        assert vacuum["pages_released"] == 1
+        assert not vacuum["complete"]
+
+    def test_old_database_is_only_reported(self) -> None:
+        """
+        Verify a database created without incremental auto_vacuum is never
+        rewritten by the scheduler, only reported as needing a vacuum
+        """
+        path = os.path.join(tempfile.mkdtemp(), "old.db")
+        with sqlite3.connect(path) as connection:
+            connection.execute("PRAGMA auto_vacuum = NONE")
+            connection.execute("CREATE TABLE old (id INTEGER)")
+        db_instance = ElevatorDatabase(path, compact=True)
+        db_instance.create_table()
+        db_instance.insert_calls([(1, 2, 3, "2024-01-01 08:00:00")] * 5000)
+        db_instance.delete_all_rows()
+        assert db_instance.get_storage_stats()["auto_vacuum"] == 0
+
+        scheduler = MaintenanceScheduler(
+            db_instance, vacuum_free_fraction=0.01)
+        actions = scheduler.run_once(force=True)
+
+        assert "incremental_vacuum" not in [
+            action["task"] for action in actions]
+        assert db_instance.get_storage_stats()["freelist_count"] > 0
+        status = scheduler.status()
+        assert not status["incremental_vacuum"]
+        assert status["vacuum_needed"]
+
+    def test_prunes_change_log(self, db_instance: ElevatorDatabase) -> None:
+        """
+        Verify the change log is pruned down to its retention in steps
+        """
+        version = db_instance.get_data_version()
+        scheduler = MaintenanceScheduler(
+            db_instance, change_log_retention=100, prune_step_rows=1000)
+
+        actions = scheduler.run_once()
+        prune = actions[-2]
+
+        assert prune["task"] == "prune_changes"
+        # The pruned changes leave free pages behind
+        assert actions[-1]["task"] == "incremental_vacuum"
+        assert prune["changes_pruned"] == version - 100
+        assert prune["complete"]
+        assert db_instance.get_pruned_version() == version - 100
+        assert scheduler.status()["pruned_version"] == version - 100
+        assert "prune_changes" not in [
+            action["task"] for action in scheduler.run_once()]
+
+    def test_background_thread(self, db_instance: ElevatorDatabase) -> None:
+        """Verify the scheduler starts and stops its thread"""
+        scheduler = MaintenanceScheduler(db_instance, interval=0.01)
+        scheduler.start()
+        assert scheduler.status()["running"]
+        scheduler.stop()
+        assert not scheduler.status()["running"]
@@ -0,0 +1,76 @@
+import pytest
+
+from src import ElevatorDatabase
+from src.markov_model import MarkovNextCallModel
+from .conftest import TEST_DATABASE_PATH
+
+
+class TestMarkovNextCallModel:
+    @pytest.fixture
+    def db_instance(self) -> ElevatorDatabase:
+        """
+        Returns an ElevatorDatabase with a recreated table and a few calls
+        spread over two hours.
+
+        :return: [ElevatorDatabase] An instance of the class
+        """
+        db_instance = ElevatorDatabase(TEST_DATABASE_PATH)
+        db_instance.recreate_table()
+
+        db_instance.insert_call(1, 1, 5, "2024-01-01 08:00:00")
+        db_instance.insert_call(5, 5, 1, "2024-01-01 08:10:00")
+        db_instance.insert_call(1, 1, 3, "2024-01-01 08:20:00")
+        db_instance.insert_call(3, 5, 1, "2024-01-01 08:30:00")
+        db_instance.insert_call(1, 2, 1, "2024-01-01 09:00:00")
+
+        return db_instance
+
+    def test_rebuild(self, db_instance: ElevatorDatabase) -> None:
+        """Rebuild the model from the table and verify the probabilities"""
+        model = MarkovNextCallModel()
+        model.rebuild(db_instance)
+
+        assert model.observations == 5
+        assert model.last_destination_floor == 1
+
+        probabilities, total = model.probabilities(8, 1, "destination")
+        assert total == 1
+        assert probabilities == {1: 1.0}
+
+        probabilities, total = model.probabilities(8, 1, "demand")
+        assert total == 2
+        assert probabilities == {5: 1.0}
+
+        probabilities, total = model.probabilities(8, 5, "destination")
+        assert total == 1
+        assert probabilities == {5: 1.0}
+
+        assert model.probabilities(9, 1, "destination") == ({2: 1.0}, 1)
+        assert model.probabilities(10, 1, "destination") == ({}, 0)
+
+    def test_observe_matches_rebuild(
+            self, db_instance: ElevatorDatabase) -> None:
+        """
+        Verify the model updated on every insert gives the same results as
+        a model rebuilt from the table
+        """
+        live_model = MarkovNextCallModel()
+        live_model.rebuild(db_instance)
+        db_instance.add_insert_listener(live_model.observe)
+
+        db_instance.insert_call(1, 1, 4, "2024-01-01 09:10:00")
+        db_instance.insert_call(4, 4, 1, "2024-01-01 09:20:00")
+
+        rebuilt_model = MarkovNextCallModel()
+        rebuilt_model.rebuild(db_instance)
+
+        assert live_model.observations == rebuilt_model.observations == 7
+        for source in ("demand", "destination"):
+            for floor in range(1, 6):
+                assert live_model.probabilities(9, floor, source) == (
+                    rebuilt_model.probabilities(9, floor, source))
+
+    def test_invalid_source(self) -> None:
+        """Asking for an unknown source raises an error"""
+        with pytest.raises(ValueError):
+            MarkovNextCallModel().probabilities(8, 1, "current")
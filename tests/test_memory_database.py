@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+
+import pytest
+
+from src import MemoryElevatorDatabase, ElevatorDatabase
+
+
+class TestMemoryElevatorDatabase:
+    @pytest.fixture
+    def checkpoint_path(self, tmp_path) -> str:
+        """
+        Returns the path of the checkpoint file used by the tests.
+
+        :return: [str] Path of the checkpoint file
+        """
+        return str(tmp_path / "elevator_memory.db")
+
+    @pytest.fixture
+    def memory_db(self, checkpoint_path: str) -> MemoryElevatorDatabase:
+        """
+        Returns an in-memory database with a created elevator table, shut
+        down after the test.
+
+        :return: [MemoryElevatorDatabase] An instance of the class
+        """
+        memory_db = MemoryElevatorDatabase(checkpoint_path=checkpoint_path)
+        memory_db.create_table()
+        yield memory_db
+        memory_db.shutdown()
+
+    def test_data_survives_between_queries(
+            self, memory_db: MemoryElevatorDatabase) -> None:
+        """Insert calls and verify they are kept by the shared connection"""
+        memory_db.insert_call(1, 2, 3, "2024-01-01 10:00:00")
+        memory_db.insert_call(3, 4, 5, "2024-01-01 10:05:00")
+
+        rows = memory_db.get_all_rows()
+
+        assert len(rows) == 2
+        assert rows[1][4] == "2024-01-01 10:05:00"
+        assert memory_db.get_last_floor() == 5
+
+    def test_read_snapshot(self, memory_db: MemoryElevatorDatabase) -> None:
+        """Reads of a snapshot go through the shared connection"""
+        memory_db.insert_call(1, 2, 3, "2024-01-01 10:00:00")
+
+        with memory_db.read_snapshot() as snapshot:
+            assert snapshot is memory_db
+            assert len(snapshot.get_all_rows()) == 1
+
+    def test_concurrent_writers(
+            self, memory_db: MemoryElevatorDatabase) -> None:
+        """Insert calls from many threads and verify no call is lost"""
+        def insert_calls() -> None:
+            for _ in range(50):
+                memory_db.insert_call(1, 2, 3)
+
+        threads = [threading.Thread(target=insert_calls) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(memory_db.get_all_rows()) == 400
+
+    def test_checkpoint_and_reload(
+            self,
+            memory_db: MemoryElevatorDatabase,
+            checkpoint_path: str
+    ) -> None:
+        """
+        Write a checkpoint and verify a new instance loads it, and that a
+        checkpoint without changes is skipped
+        """
+        memory_db.insert_call(1, 2, 3, "2024-01-01 10:00:00")
+
+        assert memory_db.checkpoint() is True
+        assert memory_db.checkpoint() is False
+        assert os.path.exists(checkpoint_path)
+
+        file_db = ElevatorDatabase(checkpoint_path)
+        assert file_db.detect_schema() is True
+        assert len(file_db.get_all_rows()) == 1
+
+        reloaded_db = MemoryElevatorDatabase(checkpoint_path=checkpoint_path)
+        try:
+            assert reloaded_db.get_all_rows() == memory_db.get_all_rows()
+        finally:
+            reloaded_db.shutdown()
+
+    def test_interval_and_shutdown_checkpoints(
+            self, checkpoint_path: str) -> None:
+        """
+        Verify the background thread checkpoints periodically and shutdown
+        persists the remaining changes
+        """
+        memory_db = MemoryElevatorDatabase(
+            checkpoint_path=checkpoint_path, checkpoint_interval=0.05)
+        memory_db.create_table()
+        memory_db.insert_call(1, 2, 3)
+
+        deadline = time.time() + 5
+        while memory_db.last_checkpoint is None and time.time() < deadline:
+            time.sleep(0.01)
+        assert memory_db.last_checkpoint is not None
+
+        memory_db.insert_call(3, 4, 5)
+        memory_db.shutdown()
+        memory_db.shutdown()
+
+        assert len(ElevatorDatabase(checkpoint_path).get_all_rows()) == 2
@@ -0,0 +1,92 @@
+import pytest
+
+from src import ElevatorDatabase
+from src.od_matrix import ODMatrix, build_od_cube
+from .conftest import TEST_DATABASE_PATH
+
+
+class TestODMatrix:
+    @pytest.fixture(params=[False, True], ids=["text", "compact"])
+    def db_instance(self, request) -> ElevatorDatabase:
+        """
+        Returns an ElevatorDatabase with morning calls from the lobby on
+        Monday 2024-01-01 and evening calls down on Tuesday 2024-01-02.
+
+        :return: [ElevatorDatabase] An instance of the class
+        """
+        db_instance = ElevatorDatabase(
+            TEST_DATABASE_PATH, compact=request.param)
+        db_instance.recreate_table()
+
+        db_instance.insert_call(1, 1, 5, "2024-01-01 08:05:00")
+        db_instance.insert_call(5, 1, 5, "2024-01-01 08:40:00")
+        db_instance.insert_call(5, 1, 3, "2024-01-01 09:10:00")
+        db_instance.insert_call(3, 5, 1, "2024-01-02 18:00:00")
+
+        yield db_instance
+        db_instance.compact = False
+        db_instance.recreate_table()
+
+    def test_build_od_cube(self) -> None:
+        """
+        Verify the counts land in the cell of their weekday, hour and floors
+        """
+        floors, cube = build_od_cube([(0, 8, 1, 5, 2), (1, 18, 5, 2, 1)])
+
+        assert floors.tolist() == [1, 2, 5]
+        assert cube.shape == (7, 24, 3, 3)
+        assert cube[0, 8, 0, 2] == 2
+        assert cube[1, 18, 2, 1] == 1
+        assert cube.sum() == 3
+
+        assert build_od_cube([]) == (None, None)
+
+    def test_get_od_counts(self, db_instance: ElevatorDatabase) -> None:
+        """
+        Verify the calls are grouped by weekday, hour and floors
+        """
+        assert sorted(db_instance.get_od_counts()) == [
+            (0, 8, 1, 5, 2),
+            (0, 9, 1, 3, 1),
+            (1, 18, 5, 1, 1)
+        ]
+
+    def test_matrix(self, db_instance: ElevatorDatabase) -> None:
+        """
+        Verify the whole matrix and its slices by hour and weekday
+        """
+        od_matrix = ODMatrix()
+
+        assert od_matrix.matrix(db_instance) == {
+            "floors": [1, 3, 5],
+            "matrix": [[0, 1, 2], [0, 0, 0], [1, 0, 0]],
+            "total": 4
+        }
+        assert od_matrix.matrix(db_instance, hours=[8])["matrix"] == [
+            [0, 0, 2], [0, 0, 0], [0, 0, 0]]
+        assert od_matrix.matrix(db_instance, weekdays=[1])["total"] == 1
+        assert od_matrix.matrix(
+            db_instance, hours=[8, 9], weekdays=[1])["total"] == 0
+
+    def test_matrix_cache(self, db_instance: ElevatorDatabase) -> None:
+        """
+        Verify the counts are read again only when the data changed
+        """
+        od_matrix = ODMatrix()
+        calls = []
+        get_od_counts = db_instance.get_od_counts
+
+        def counting_get_od_counts():
+            calls.append(1)
+            return get_od_counts()
+
+        db_instance.get_od_counts = counting_get_od_counts
+        od_matrix.matrix(db_instance)
+        od_matrix.matrix(db_instance, hours=[8])
+        assert len(calls) == 1
+
+        db_instance.insert_call(1, 2, 4, "2024-01-03 10:00:00")
+        result = od_matrix.matrix(db_instance)
+        assert len(calls) == 2
+        assert result["floors"] == [1, 2, 3, 4, 5]
+        assert result["total"] == 5
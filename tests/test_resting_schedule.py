@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+from src import ElevatorDatabase
+from src.elevator_database import to_epoch
+from src.resting_schedule import RestingScheduler, build_profile
+from .conftest import TEST_DATABASE_PATH
+
+
+class TestRestingScheduler:
+    @pytest.fixture
+    def db_instance(self) -> ElevatorDatabase:
+        """
+        Returns an ElevatorDatabase with calls from floor 5 on Monday
+        mornings and from the lobby on Monday evenings.
+
+        :return: [ElevatorDatabase] An instance of the class
+        """
+        db_instance = ElevatorDatabase(TEST_DATABASE_PATH, compact=True)
+        db_instance.recreate_table()
+
+        for day in (1, 8, 15):
+            db_instance.insert_call(1, 5, 1, f"2024-01-{day:02d} 08:05:00")
+            db_instance.insert_call(1, 5, 1, f"2024-01-{day:02d} 08:20:00")
+            db_instance.insert_call(5, 1, 5, f"2024-01-{day:02d} 18:10:00")
+        db_instance.insert_call(5, 2, 5, "2024-01-01 18:12:00")
+
+        yield db_instance
+        db_instance.compact = False
+        db_instance.recreate_table()
+
+    def test_build_profile(self) -> None:
+        """
+        Verify the busiest floor of each slot and the fallbacks for slots
+        without calls
+        """
+        # Monday 2024-01-01 08:05, 08:10 and Tuesday 2024-01-02 08:20
+        history = [
+            (5, 1, to_epoch("2024-01-01 08:05:00")),
+            (3, 1, to_epoch("2024-01-01 08:10:00")),
+            (5, 1, to_epoch("2024-01-01 08:12:00")),
+            (2, 1, to_epoch("2024-01-02 08:20:00")),
+        ]
+
+        profile = build_profile(history, 15)
+
+        assert len(profile) == 672
+        monday_0800 = 8 * 4
+        tuesday_0815 = 96 + 8 * 4 + 1
+        assert profile[monday_0800] == 5
+        assert profile[tuesday_0815] == 2
+        # Empty slot at 08:xx falls back to the busiest floor of that hour
+        assert profile[96 * 3 + 8 * 4] == 5
+        # Empty hour falls back to the busiest floor overall
+        assert profile[96 * 3 + 20 * 4] == 5
+
+        assert build_profile([], 15) is None
+
+    def test_schedule(self, db_instance: ElevatorDatabase) -> None:
+        """Verify the schedule of a Monday and its caching"""
+        scheduler = RestingScheduler()
+
+        floors = scheduler.schedule(
+            db_instance,
+            to_epoch("2024-01-22 08:00:00"),
+            to_epoch("2024-01-22 19:00:00"),
+            60
+        )
+
+        assert len(floors) == 11
+        assert floors[0] == 5
+        assert floors[10] == 1
+
+        profile = scheduler._get_profile(db_instance, 60)
+        assert scheduler._get_profile(db_instance, 60) is profile
+
+        db_instance.insert_call(1, 4, 1, "2024-01-29 08:00:00")
+        assert scheduler._get_profile(db_instance, 60) is not profile
+
+    def test_full_year_schedule(self, db_instance: ElevatorDatabase) -> None:
+        """Verify a full year of 15-minute slots is computed quickly"""
+        scheduler = RestingScheduler()
+        start = to_epoch("2024-01-01 00:00:00")
+        end = to_epoch("2025-01-01 00:00:00")
+
+        scheduler.schedule(db_instance, start, start + 900, 15)
+        started = time.perf_counter()
+        floors = scheduler.schedule(db_instance, start, end, 15)
+        elapsed = time.perf_counter() - started
+
+        assert len(floors) == 366 * 96
+        assert elapsed < 1
@@ -0,0 +1,249 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from src import ElevatorDatabase
+from src.sketches import (
+    CallSketches,
+    CountMinSketch,
+    HeavyHitters,
+    HyperLogLog,
+    QuantileSketch,
+    mix,
+    mix_array,
+    pair_key,
+    unpack_pair
+)
+from .conftest import TEST_DATABASE_PATH
+
+
+class TestSketches:
+    def test_mix_array_matches_mix(self) -> None:
+        """Verify the vectorized hash gives the same hashes as mix"""
+        keys = [0, 1, 42, 2 ** 40, pair_key(3, 6), pair_key(-1, 2)]
+        assert mix_array(np.array(keys, dtype=np.uint64)).tolist() == [
+            mix(key) for key in keys]
+        assert unpack_pair(pair_key(-1, 2)) == (-1, 2)
+
+    def test_count_min_sketch(self) -> None:
+        """Verify estimates never undercount and merge adds up"""
+        sketch = CountMinSketch(width=64, depth=4)
+        keys = np.repeat(np.arange(100, dtype=np.uint64), 3)
+        sketch.add_array(keys)
+        sketch.add(7, 10)
+
+        assert sketch.total == 310
+        assert sketch.estimate(7) >= 13
+        assert all(sketch.estimate(key) >= 3 for key in range(100))
+
+        other = CountMinSketch(width=64, depth=4)
+        other.add(7)
+        sketch.merge(other)
+        assert sketch.estimate(7) >= 14
+
+        with pytest.raises(ValueError):
+            sketch.merge(CountMinSketch(width=32))
+
+    def test_heavy_hitters(self) -> None:
+        """Verify the frequent keys are kept within the error bound"""
+        summary = HeavyHitters(capacity=4)
+        for key in range(20):
+            summary.add(key)
+        summary.add_counts([(100, 50), (200, 30)])
+
+        top = dict(summary.top(2))
+        assert list(top) == [100, 200]
+        assert 50 - summary.error <= top[100] <= 50
+        assert len(summary.counters) <= 4
+
+        other = HeavyHitters(capacity=4)
+        other.add_counts([(200, 40)])
+        summary.merge(other)
+        assert summary.total == 140
+        assert summary.top(1)[0][0] == 200
+
+    def test_quantile_sketch(self) -> None:
+        """Verify quantiles are within the relative accuracy"""
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        values = np.arange(1, 10_001)
+        sketch.add_array(values[:5000])
+        for value in values[5000:].tolist():
+            sketch.add(value)
+        sketch.add(0)
+
+        for fraction in (0.5, 0.9, 0.99):
+            expected = np.quantile(values, fraction)
+            assert abs(sketch.quantile(fraction) - expected) <= (
+                0.011 * expected + 1)
+        assert sketch.quantile(0) == 0.0
+        assert QuantileSketch().quantile(0.5) is None
+
+        collapsed = QuantileSketch(max_buckets=10)
+        collapsed.add_array(values)
+        assert len(collapsed.buckets) == 10
+        assert collapsed.quantile(1) == pytest.approx(10_000, rel=0.01)
+
+    def test_hyper_log_log(self) -> None:
+        """Verify the distinct count estimate and the merge"""
+        first = HyperLogLog()
+        first.add_array(np.arange(20_000, dtype=np.uint64))
+        second = HyperLogLog()
+        for key in range(10_000, 30_000):
+            second.add(key)
+
+        assert first.estimate() == pytest.approx(20_000, rel=0.05)
+        first.merge(second)
+        assert first.estimate() == pytest.approx(30_000, rel=0.05)
+
+        few = HyperLogLog()
+        for key in (1, 2, 3, 3):
+            few.add(key)
+        assert few.estimate() == 3
+
+
+class TestCallSketches:
+    @pytest.fixture
+    def db_instance(self) -> ElevatorDatabase:
+        """
+        Returns an ElevatorDatabase with a recreated table and calls over
+        three hours.
+
+        :return: [ElevatorDatabase] An instance of the class
+        """
+        db_instance = ElevatorDatabase(TEST_DATABASE_PATH)
+        db_instance.recreate_table()
+
+        db_instance.insert_calls([
+            (1, 1, 5, "2024-01-01 08:00:00"),
+            (5, 1, 5, "2024-01-01 08:00:30"),
+            (5, 1, 5, "2024-01-01 08:01:30"),
+            (5, 5, 1, "2024-01-01 09:00:00"),
+            (1, 2, 3, "2024-01-01 10:00:00")
+        ])
+
+        return db_instance
+
+    def test_observe_matches_rebuild(
+            self, db_instance: ElevatorDatabase) -> None:
+        """
+        Verify the sketches fed on every insert match sketches rebuilt in
+        batches from the table
+        """
+        live_sketches = CallSketches()
+        live_sketches.rebuild(db_instance, batch_size=2)
+        db_instance.add_insert_listener(live_sketches.observe)
+        db_instance.insert_call(3, 1, 5, "2024-01-01 10:00:10")
+
+        rebuilt_sketches = CallSketches()
+        rebuilt_sketches.rebuild(db_instance, batch_size=4)
+
+        assert live_sketches.to_dict() == rebuilt_sketches.to_dict()
+
+        summary = live_sketches.summary(2, [0, 0.5, 1])
+        assert summary["observations"] == 6
+        assert summary["busiest_pairs"][0] == {
+            "demand_floor": 1,
+            "destination_floor": 5,
+            "count": 4,
+            "min_count": 4
+        }
+        assert summary["distinct_active_hours"] == 3
+        assert summary["inter_arrival_seconds"]["0"] == pytest.approx(
+            10, rel=0.02)
+        assert summary["inter_arrival_seconds"]["1"] == pytest.approx(
+            3570, rel=0.02)
+        assert live_sketches.pair_count(5, 1) == 1
+
+    def test_save_load_and_refresh(
+            self, db_instance: ElevatorDatabase) -> None:
+        """
+        Verify saved sketches are loaded only for the same data version
+        """
+        path = os.path.join(tempfile.mkdtemp(), "sketches.json")
+        sketches = CallSketches()
+        assert not sketches.refresh(db_instance, path)
+        assert os.path.exists(path)
+
+        loaded = CallSketches()
+        assert loaded.refresh(db_instance, path)
+        assert loaded.to_dict() == sketches.to_dict()
+
+        db_instance.insert_call(1, 6, 1, "2024-01-01 11:00:00")
+        assert not loaded.refresh(db_instance, path)
+        assert loaded.observations == 6
+
+    def test_current_version(self, db_instance: ElevatorDatabase) -> None:
+        """
+        Verify the sketches follow the data version through the inserts
+        they observe, and match none once a row is updated
+        """
+        sketches = CallSketches()
+        assert sketches.current_version(db_instance) is None
+        sketches.refresh(db_instance)
+        db_instance.add_insert_listener(sketches.observe)
+        assert sketches.current_version(
+            db_instance) == db_instance.get_data_version()
+
+        row_id = db_instance.insert_call(1, 6, 1, "2024-01-01 11:00:00")
+        assert sketches.current_version(
+            db_instance) == db_instance.get_data_version()
+
+        db_instance.update_column(row_id, "demand_floor", 2)
+        assert sketches.current_version(db_instance) is None
+
+    @pytest.mark.parametrize("method", ["refresh", "rebuild"])
+    def test_inserts_during_rebuild(
+            self, db_instance: ElevatorDatabase, method: str) -> None:
+        """
+        Verify the calls inserted while the table is read are counted once
+        on the new sketches, whether the scan read them or not
+        """
+        sketches = CallSketches()
+        sketches.refresh(db_instance)
+        db_instance.add_insert_listener(sketches.observe)
+        build = CallSketches._build
+
+        def insert_while_building(*args, **kwargs) -> CallSketches:
+            db_instance.insert_call(1, 6, 1, "2024-01-01 11:00:00")
+            built = build(*args, **kwargs)
+            db_instance.insert_call(1, 6, 2, "2024-01-01 11:00:10")
+            return built
+
+        with patch.object(
+                CallSketches, "_build", staticmethod(insert_while_building)):
+            getattr(sketches, method)(db_instance)
+
+        assert sketches.observations == 7
+        assert sketches.pair_count(6, 1) == 1
+        assert sketches.pair_count(6, 2) == 1
+        if method == "refresh":
+            assert sketches.current_version(
+                db_instance) == db_instance.get_data_version()
+
+    def test_merge_shards(self, db_instance: ElevatorDatabase) -> None:
+        """Verify sketches of two shards merge into the sketches of both"""
+        first = CallSketches()
+        first.rebuild(db_instance)
+        second, _ = CallSketches.load(self._saved(first))
+
+        first.merge(second)
+        summary = first.summary(1, [0.5])
+        assert summary["observations"] == 10
+        assert summary["busiest_pairs"][0]["min_count"] == 6
+        assert summary["distinct_active_hours"] == 3
+
+    @staticmethod
+    def _saved(sketches: CallSketches) -> str:
+        """
+        Saves sketches to a temporary file.
+
+        :param sketches: [CallSketches] The sketches
+
+        :return: [str] Path of the file
+        """
+        path = os.path.join(tempfile.mkdtemp(), "shard.json")
+        sketches.save(path)
+        return path
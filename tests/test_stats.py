@@ -0,0 +1,14 @@
+from src.stats import percentile
+
+
+class TestStats:
+    def test_percentile(self) -> None:
+        """
+        Test the nearest-rank percentile.
+        """
+        values = [float(value) for value in range(1, 101)]
+
+        assert percentile(values, 0.5) == 50.0
+        assert percentile(values, 0.99) == 99.0
+        assert percentile(values, 1.0) == 100.0
+        assert percentile([], 0.5) is None
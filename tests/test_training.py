@@ -0,0 +1,119 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src import ElevatorDatabase
+from src.training import (
+    KEEP_ARTIFACTS,
+    ModelTrainer,
+    artifact_path,
+    artifact_paths,
+    extract_features,
+    train_model
+)
+from .conftest import TEST_DATABASE_PATH
+
+
+class TestModelTrainer:
+    @pytest.fixture
+    def db_instance(self) -> ElevatorDatabase:
+        """
+        Returns an ElevatorDatabase where, every day, calls at 08:00 come
+        from floor 5 and calls at 18:00 come from the lobby, each one
+        leaving the elevator on the floor of the other.
+
+        :return: [ElevatorDatabase] An instance of the class
+        """
+        db_instance = ElevatorDatabase(TEST_DATABASE_PATH)
+        db_instance.recreate_table()
+
+        for day in range(1, 15):
+            db_instance.insert_call(
+                1, 5, 1, f"2024-01-{day:02d} 08:00:00")
+            db_instance.insert_call(
+                5, 1, 5, f"2024-01-{day:02d} 18:00:00")
+
+        return db_instance
+
+    def test_extract_features(self) -> None:
+        """Verify the features and labels built from the call history"""
+        # 2024-01-01 08:00:00 (Monday) and 2024-01-02 18:00:00 (Tuesday)
+        history = [(5, 1, 1704096000), (1, 5, 1704218400), (2, 3, 1704218460)]
+
+        features, labels = extract_features(history)
+
+        assert features.tolist() == [[18, 1, 1], [18, 1, 5]]
+        assert labels.tolist() == [1, 2]
+
+    def test_train_and_predict(
+            self, db_instance: ElevatorDatabase, tmp_path) -> None:
+        """
+        Train in the background, verify the predictions, the cached
+        artifact and the reuse of the artifact on the same data
+        """
+        trainer = ModelTrainer(str(tmp_path), executor=ThreadPoolExecutor())
+
+        assert trainer.predict("2024-01-20 08:00:00", 1) is None
+        assert trainer.train_async(db_instance) == "started"
+        trainer.wait()
+
+        assert trainer.last_error is None
+        artifact = trainer.current()
+        assert artifact["data_version"] == db_instance.get_data_version()
+        assert artifact["samples"] == 27
+        assert os.path.exists(
+            artifact_path(str(tmp_path), artifact["data_version"]))
+
+        assert trainer.predict("2024-01-20 08:00:00", 5) == 5
+        assert trainer.predict("2024-01-20 18:00:00", 1) == 1
+
+        assert trainer.train_async(db_instance) == "cached"
+
+        # A new trainer serves the latest artifact from disk
+        reloaded = ModelTrainer(str(tmp_path))
+        assert reloaded.predict("2024-01-20 08:00:00", 5) == 5
+
+    def test_old_artifacts_are_deleted(
+            self, db_instance: ElevatorDatabase, tmp_path) -> None:
+        """
+        Train on successive data versions and verify only the latest
+        artifacts stay on disk
+        """
+        history = db_instance.get_call_history()
+        for data_version in range(1, KEEP_ARTIFACTS + 3):
+            path = train_model(history, data_version, str(tmp_path))
+
+        assert artifact_paths(str(tmp_path)) == [
+            artifact_path(str(tmp_path), data_version)
+            for data_version in range(3, KEEP_ARTIFACTS + 3)
+        ]
+
+        # The artifact just saved is kept, even on an older data version
+        train_model(history, 1, str(tmp_path))
+        assert os.path.exists(artifact_path(str(tmp_path), 1))
+        assert len(artifact_paths(str(tmp_path))) == KEEP_ARTIFACTS
+        assert os.path.exists(path)
+
+    def test_train_in_process_pool(
+            self, db_instance: ElevatorDatabase, tmp_path) -> None:
+        """Train in the default process pool and hot-swap the model"""
+        trainer = ModelTrainer(str(tmp_path))
+
+        assert trainer.train_async(db_instance) == "started"
+        trainer.wait(timeout=120)
+
+        assert trainer.last_error is None
+        assert trainer.predict("2024-01-20 18:00:00", 1) == 1
+
+    def test_not_enough_calls(self, tmp_path) -> None:
+        """Training on an empty table reports an error"""
+        db_instance = ElevatorDatabase(TEST_DATABASE_PATH)
+        db_instance.recreate_table()
+        trainer = ModelTrainer(str(tmp_path), executor=ThreadPoolExecutor())
+
+        trainer.train_async(db_instance)
+        trainer.wait()
+
+        assert trainer.last_error == "Not enough calls to train a model"
+        assert trainer.current() is None